@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Affectation.py
+==============
+
+FR: Affectation nominative des conducteurs de test et des locomotives aux trains de type Testing.
+EN: Named assignment of test drivers and locomotives to Testing trains.
+FR: Partitionnement d'intervalles avec un tas-min des ressources classées par heure de libération :
+    chaque train reprend la ressource libérée le plus tôt si le battement (et l'éventuel transfert) le permet,
+    sinon une nouvelle ressource est créée. Le nombre de ressources créées est la taille de flotte.
+EN: Interval partitioning with a min-heap of resources keyed by release time:
+    each train reuses the earliest released resource if the turnaround (and any transfer) allows it,
+    otherwise a new resource is created. The number of resources created is the fleet size.
+
+Auteur : andre
+"""
+
+import heapq
+from datetime import timedelta
+from Stats import BESOINS_TESTING
+
+# FR: Localité des ressources / EN: Resource locality
+#   None       : FR: Libre circulation entre dépôts. / EN: Free movement between depots.
+#   "stricte"  : FR: Une ressource reste dans son dépôt. / EN: A resource stays at its depot.
+#   "transfert": FR: Changer de dépôt coûte un temps de transfert. / EN: Moving depot costs a transfer time.
+LOCALITES = (None, "stricte", "transfert")
+
+PREFIXES = {"test_drivers": "TD", "locomotives": "LOC"}
+
+
+def affecter_ressource(trains, ressource, quantite, battement=timedelta(0), localite=None, temps_transfert=timedelta(0)):
+    """
+    FR: Affecte `quantite` unités d'une ressource à chaque train, en O(n log n) (× nombre de dépôts en mode transfert).
+    EN: Assign `quantite` units of a resource to each train, in O(n log n) (× number of depots in transfer mode).
+
+    Args:
+        trains (list[Train]): FR: Trains à servir. / EN: Trains to serve.
+        ressource (str): FR: Nom de la ressource ("test_drivers", "locomotives"). / EN: Resource name.
+        quantite (int): FR: Unités nécessaires par train. / EN: Units needed per train.
+        battement (timedelta): FR: Temps minimal entre deux trains pour une même ressource. / EN: Minimum turnaround between two trains for one resource.
+        localite (str|None): FR: Voir LOCALITES. / EN: See LOCALITES.
+        temps_transfert (timedelta): FR: Durée d'un changement de dépôt (mode "transfert"). / EN: Depot change duration ("transfert" mode).
+
+    Returns:
+        tuple: FR: (lignes du roster, nombre de ressources par dépôt d'attache). / EN: (roster rows, resource count per home depot).
+    """
+    prefixe = PREFIXES.get(ressource, ressource)
+    tas = {}  # FR: Dépôt (ou None) -> tas de (libre_a, numero) / EN: Depot (or None) -> heap of (free_at, number)
+    attaches = []  # FR: Dépôt d'attache de chaque ressource créée / EN: Home depot of each created resource
+    roster = []
+
+    for train in sorted(trains, key=lambda train: (train.arrivee, train.depart)):
+        cle = None if localite is None else train.depot
+        tas_depot = tas.setdefault(cle, [])
+        for _ in range(quantite):
+            transfert = None
+            if tas_depot and tas_depot[0][0] + battement <= train.arrivee:
+                _, numero = heapq.heappop(tas_depot)
+            else:
+                numero = None
+                if localite == "transfert":
+                    # FR: Ressource libre dans un autre dépôt, transfert compris / EN: Free resource at another depot, transfer included
+                    candidats = [
+                        (autre_tas[0][0], autre)
+                        for autre, autre_tas in tas.items()
+                        if autre != cle and autre_tas and autre_tas[0][0] + battement + temps_transfert <= train.arrivee
+                    ]
+                    if candidats:
+                        _, transfert = min(candidats)
+                        _, numero = heapq.heappop(tas[transfert])
+                if numero is None:
+                    numero = len(attaches)
+                    attaches.append(train.depot)
+            heapq.heappush(tas_depot, (train.depart, numero))
+            roster.append({
+                "Ressource": f"{prefixe}{numero + 1:03d}",
+                "Type": ressource,
+                "Train": train.nom,
+                "Depot": train.depot,
+                "Début": train.arrivee,
+                "Fin": train.depart,
+                "Transfert": transfert or "",
+            })
+
+    flotte = {}
+    for depot in attaches:
+        flotte[depot] = flotte.get(depot, 0) + 1
+    return roster, flotte
+
+
+def calculer_roster(trains, battement=timedelta(0), localite=None, temps_transfert=timedelta(0)):
+    """
+    FR: Calcule le roster des conducteurs de test et des locomotives pour les trains Testing.
+        Les conducteurs circulent librement ; la localité s'applique aux locomotives.
+    EN: Compute the test driver and locomotive roster for Testing trains.
+        Drivers move freely; locality applies to locomotives.
+
+    Returns:
+        dict: FR: {"roster": lignes triées par ressource, "flotte": taille par ressource, "par_depot": taille par dépôt d'attache}
+              EN: {"roster": rows sorted by resource, "flotte": size per resource, "par_depot": size per home depot}
+    """
+    testing = [train for train in trains if train.type == "testing"]
+    resultat = {"roster": [], "flotte": {}, "par_depot": {}}
+    for ressource, quantite in BESOINS_TESTING.items():
+        localite_ressource = localite if ressource == "locomotives" else None
+        roster, flotte = affecter_ressource(testing, ressource, quantite, battement, localite_ressource, temps_transfert)
+        resultat["roster"].extend(roster)
+        resultat["flotte"][ressource] = sum(flotte.values())
+        resultat["par_depot"][ressource] = flotte
+    resultat["roster"].sort(key=lambda ligne: (ligne["Type"], ligne["Ressource"], ligne["Début"]))
+    return resultat
@@ -9,8 +9,8 @@ import streamlit as st
 import folium
 from streamlit_folium import st_folium
 import pandas as pd
-from folium.plugins import MarkerCluster
-from datetime import datetime
+from folium.plugins import MarkerCluster, TimestampedGeoJson
+from folium.features import GeoJsonPopup, GeoJsonTooltip
 from folium.features import CustomIcon
 
 def get_depots_dataframe(simulation):
@@ -37,63 +37,156 @@ def get_train_icon():
         icon_anchor=(19, 19),
         popup_anchor=(0, -15)
     )
+DECALAGE = 0.001  # Décalage en degrés pour ne pas superposer les trains sur le dépôt
+
+
+def _features_trains(trains, positions, t, lang):
+    """
+    FR : Points GeoJSON des trains, en un seul passage ; le i-ème train d'un dépôt est décalé de i × DECALAGE.
+         Les propriétés servent aux popups et infobulles (pas de HTML par train).
+    EN : GeoJSON points of the trains, in a single pass; the i-th train of a depot is shifted by i × DECALAGE.
+         Properties drive the popups and tooltips (no HTML per train).
+    """
+    compteurs = dict.fromkeys(positions, 0)
+    types = {}  # FR : Traduction une fois par type / EN : Translation once per type
+    features = []
+    for train in trains:
+        position = positions.get(train.depot)
+        if position is None:
+            continue
+        compteurs[train.depot] += 1
+        i = compteurs[train.depot]
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [position[1] + i * DECALAGE, position[0] + i * DECALAGE]},
+            "properties": {
+                "nom": "" if train.nom is None else str(train.nom),
+                "type": types[train.type] if train.type in types else types.setdefault(train.type, t(train.type, lang)),
+                "arrivee": train.arrivee.strftime('%Y-%m-%d %H:%M'),
+                "depart": train.depart.strftime('%Y-%m-%d %H:%M'),
+                "depot": train.depot,
+                # FR : Présence [arrivée, départ] pour l'animation / EN : Presence [arrival, departure] for the animation
+                "times": [train.arrivee.isoformat(), train.depart.isoformat()],
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def couches_carte(simulation, t, lang):
+    """
+    FR : Couches GeoJSON des dépôts et des trains, mises en cache selon l'empreinte de la simulation
+         (et les coordonnées des dépôts) : un rerun sans modification ne reparcourt pas les trains.
+    EN : GeoJSON layers of depots and trains, cached against the simulation fingerprint
+         (and the depot coordinates): a rerun without changes does not walk the trains again.
+
+    Returns:
+        dict : {"positions": {dépôt: (lat, lon)}, "depots": FeatureCollection, "trains": FeatureCollection}
+    """
+    positions = {
+        nom: (conf["lat"], conf["lon"])
+        for nom, conf in simulation.depots.items()
+        if conf.get("lat") is not None and conf.get("lon") is not None
+    }
+    cle = ("carte", lang)
+    empreinte = (simulation.empreinte(), tuple(positions.items()))
+    en_cache = simulation.cache.get(cle)
+    if en_cache is not None and en_cache[0] == empreinte:
+        return en_cache[1]
+    couches = {
+        "positions": positions,
+        "depots": {"type": "FeatureCollection", "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": {"Depot": nom}}
+            for nom, (lat, lon) in positions.items()
+        ]},
+        "trains": _features_trains(simulation.trains, positions, t, lang),
+    }
+    simulation.cache[cle] = (empreinte, couches)
+    return couches
+
+
+# FR : Style commun des trains animés / EN : Common style of the animated trains
+STYLE_TRAIN_ANIME = {"radius": 6, "color": "#d32f2f", "fillColor": "#ffffff", "fillOpacity": 1, "weight": 3}
+
+
+def couche_animee(simulation, t, lang):
+    """
+    FR : Présences des trains au format TimestampedGeoJson, précalculées une fois à partir des couches en cache
+         (même empreinte) : le défilement du temps se fait ensuite dans le navigateur.
+    EN : Train presences in TimestampedGeoJson format, precomputed once from the cached layers
+         (same fingerprint): scrubbing through time then happens in the browser.
+    """
+    couches = couches_carte(simulation, t, lang)
+    cle = ("carte_animee", lang)
+    empreinte = simulation.cache[("carte", lang)][0]
+    en_cache = simulation.cache.get(cle)
+    if en_cache is not None and en_cache[0] == empreinte:
+        return en_cache[1]
+    etiquettes = [t(cle_texte, lang) for cle_texte in ("train_type", "arrival_time", "departure_time")]
+    features = []
+    for feature in couches["trains"]["features"]:
+        proprietes = feature["properties"]
+        features.append({
+            "type": "Feature",
+            "geometry": feature["geometry"],
+            "properties": {
+                "times": proprietes["times"],
+                "icon": "circle",
+                "iconstyle": STYLE_TRAIN_ANIME,
+                "tooltip": proprietes["nom"],
+                "popup": f"<b>{proprietes['nom']}</b><br>{etiquettes[0]}: {proprietes['type']}"
+                         f"<br>{etiquettes[1]}: {proprietes['arrivee']}<br>{etiquettes[2]}: {proprietes['depart']}",
+            },
+        })
+    couche = {"type": "FeatureCollection", "features": features}
+    simulation.cache[cle] = (empreinte, couche)
+    return couche
+
+
+def _carte(couches, trains, t, lang):
+    """
+    FR : Carte folium : une couche GeoJSON pour les dépôts, une pour les trains (regroupés en clusters).
+    EN : Folium map: one GeoJSON layer for the depots, one for the trains (clustered).
+    """
+    latitudes = [lat for lat, _ in couches["positions"].values()]
+    longitudes = [lon for _, lon in couches["positions"].values()]
+    m = folium.Map(location=[sum(latitudes) / len(latitudes), sum(longitudes) / len(longitudes)], zoom_start=6)
+
+    # Marqueurs de dépôts (fixes) : le texte du popup est le nom du dépôt (sélection au clic)
+    folium.GeoJson(
+        couches["depots"],
+        marker=folium.Marker(icon=folium.Icon(color="blue", icon="train", prefix="fa")),
+        popup=GeoJsonPopup(fields=["Depot"], labels=False),
+        tooltip=GeoJsonTooltip(fields=["Depot"], labels=False),
+    ).add_to(m)
+
+    # Cluster pour les trains
+    if trains["features"]:
+        marker_cluster = MarkerCluster().add_to(m)
+        folium.GeoJson(
+            trains,
+            marker=folium.Marker(icon=get_train_icon()),
+            popup=GeoJsonPopup(
+                fields=["nom", "type", "arrivee", "depart", "depot"],
+                aliases=[t(cle, lang) for cle in ("train_name", "train_type", "arrival_time", "departure_time", "depot")],
+            ),
+            tooltip=GeoJsonTooltip(fields=["nom"], labels=False),
+        ).add_to(marker_cluster)
+    return m
+
+
 def afficher_carte_depots(simulation, t, lang):
-    df_depots = get_depots_dataframe(simulation)
-    if df_depots.empty:
+    couches = couches_carte(simulation, t, lang)
+    if not couches["positions"]:
         st.info(t("no_depot_coords", lang) if "no_depot_coords" in t.__code__.co_varnames else "Aucun dépôt géolocalisé à afficher.")
         return
 
-    lat_centre = df_depots["lat"].mean()
-    lon_centre = df_depots["lon"].mean()
-    m = folium.Map(location=[lat_centre, lon_centre], zoom_start=6)
-
-    # Marqueurs de dépôts (fixes)
-    for _, row in df_depots.iterrows():
-        folium.Marker(
-            location=[row["lat"], row["lon"]],
-            popup=folium.Popup(f"<b>{row['Depot']}</b>", max_width=200),
-            tooltip=row["Depot"],
-            icon=folium.Icon(color="blue", icon="train", prefix="fa"),
-        ).add_to(m)
-
-    # Cluster pour les trains
-    marker_cluster = MarkerCluster().add_to(m)
-    decalage = 0.001  # Décalage en degrés pour ne pas superposer les trains sur le dépôt
-
-    for depot_name in df_depots["Depot"]:
-        trains = [train for train in simulation.trains if train.depot == depot_name]
-        depot_info = df_depots[df_depots["Depot"] == depot_name].iloc[0]
-        lat0, lon0 = depot_info["lat"], depot_info["lon"]
-        for i, train in enumerate(trains):
-            lat = lat0 + (i + 1) * decalage
-            lon = lon0 + (i + 1) * decalage
-            popup_html = f"""
-            <div style='font-family:sans-serif;min-width:180px'>
-                <div style='font-weight:bold;font-size:16px;color:#1976d2'>{t('train_name', lang)}: {train.nom}</div>
-                <div style='margin-top:4px'>
-                    <span style='background:#eee;border-radius:4px;padding:2px 6px;font-size:12px;color:#555'>{t('train_type', lang)}: {t(train.type, lang)}</span>
-                </div>
-                <div style='margin-top:8px'>
-                    <span style='color:#333'>{t('arrival_time', lang)}:</span> <b>{train.arrivee.strftime('%Y-%m-%d %H:%M')}</b><br>
-                    <span style='color:#333'>{t('departure_time', lang)}:</span> <b>{train.depart.strftime('%Y-%m-%d %H:%M')}</b>
-                </div>
-                <div style='margin-top:8px;color:#888;font-size:12px'>
-                    {t('depot', lang)}: {train.depot}
-                </div>
-            </div>
-            """
-            folium.Marker(
-                location=[lat, lon],
-                popup=folium.Popup(popup_html, max_width=300),
-                tooltip=train.nom,
-                icon=get_train_icon(),
-            ).add_to(marker_cluster)
+    m = _carte(couches, couches["trains"], t, lang)
 
     with st.spinner(t("loading_map", lang) if "loading_map" in t.__code__.co_varnames else "Chargement de la carte..."):
         folium_output = st_folium(m, width=1200, height=700, key="carte_depots")
     depot_selectionne = None
     if folium_output and folium_output.get("last_object_clicked_popup"):
-        depot_selectionne = folium_output["last_object_clicked_popup"]
+        depot_selectionne = folium_output["last_object_clicked_popup"].strip()
 
     if depot_selectionne:
         trains = [train for train in simulation.trains if train.depot == depot_selectionne]
@@ -114,21 +207,34 @@ def afficher_carte_depots(simulation, t, lang):
         st.info(t("select_depot", lang))
 
 def afficher_carte_etat_trains_heure(simulation, t, lang):
-    # Récupère toutes les heures d'arrivée et de départ pour bornes du slider
-    heures = []
-    for train in simulation.trains:
-        # Conversion explicite en datetime si besoin
-        try:
-            arr = pd.to_datetime(train.arrivee)
-            dep = pd.to_datetime(train.depart)
-        except Exception:
-            continue
-        if pd.notnull(arr) and pd.notnull(dep):
-            heures.append(arr.to_pydatetime() if hasattr(arr, "to_pydatetime") else arr)
-            heures.append(dep.to_pydatetime() if hasattr(dep, "to_pydatetime") else dep)
-    # Filtre pour ne garder que des datetime
-    heures = [h for h in heures if isinstance(h, datetime)]
-    heures = sorted(list(set(heures)))
+    # Mode animé : présences précalculées, le curseur de temps tourne dans le navigateur (aucun rerun)
+    if st.toggle(t("map_animation", lang), help=t("map_animation_tooltip", lang), key="carte_animee"):
+        couches = couches_carte(simulation, t, lang)
+        if not couches["positions"]:
+            st.info(t("no_depot_coords", lang) if "no_depot_coords" in t.__code__.co_varnames else "Aucun dépôt géolocalisé à afficher.")
+            return
+        couche = couche_animee(simulation, t, lang)
+        if not couche["features"]:
+            st.info(t("no_time_data", lang) if "no_time_data" in t.__code__.co_varnames else "Aucune donnée horaire disponible.")
+            return
+        m = _carte(couches, {"type": "FeatureCollection", "features": []}, t, lang)
+        TimestampedGeoJson(
+            couche,
+            period="PT1H",
+            duration="PT1M",  # FR : Visible de l'arrivée au départ / EN : Visible from arrival to departure
+            add_last_point=False,
+            auto_play=False,
+            loop=False,
+            date_options="YYYY-MM-DD HH:mm",
+            time_slider_drag_update=True,
+        ).add_to(m)
+        with st.spinner(t("loading_map", lang) if "loading_map" in t.__code__.co_varnames else "Chargement de la carte..."):
+            st_folium(m, width=1200, height=700, key="carte_etat_trains_anime", returned_objects=[])
+        return
+
+    # Bornes du slider : première arrivée et dernier départ, triés une fois par l'index de présence (en cache)
+    presence = simulation.index_presence()
+    heures = [h.to_pydatetime() if hasattr(h, "to_pydatetime") else h for h in presence.instants[:1] + presence.instants[-1:]]
     if not heures:
         st.info(t("no_time_data", lang) if "no_time_data" in t.__code__.co_varnames else "Aucune donnée horaire disponible.")
         return
@@ -142,58 +248,14 @@ def afficher_carte_etat_trains_heure(simulation, t, lang):
         key="slider_etat_trains_heure"
     )
 
-    df_depots = get_depots_dataframe(simulation)
-    if df_depots.empty:
+    couches = couches_carte(simulation, t, lang)
+    if not couches["positions"]:
         st.info(t("no_depot_coords", lang) if "no_depot_coords" in t.__code__.co_varnames else "Aucun dépôt géolocalisé à afficher.")
         return
 
-    lat_centre = df_depots["lat"].mean()
-    lon_centre = df_depots["lon"].mean()
-    m = folium.Map(location=[lat_centre, lon_centre], zoom_start=6)
-
-    # Marqueurs de dépôts (fixes)
-    for _, row in df_depots.iterrows():
-        folium.Marker(
-            location=[row["lat"], row["lon"]],
-            popup=folium.Popup(f"<b>{row['Depot']}</b>", max_width=200),
-            tooltip=row["Depot"],
-            icon=folium.Icon(color="blue", icon="train", prefix="fa"),
-        ).add_to(m)
-
-    # Cluster pour les trains présents à l'heure choisie
-    marker_cluster = MarkerCluster().add_to(m)
-    decalage = 0.001
-    for depot_name in df_depots["Depot"]:
-        trains = [
-            train for train in simulation.trains
-            if train.depot == depot_name and train.arrivee <= heure_select <= train.depart
-        ]
-        depot_info = df_depots[df_depots["Depot"] == depot_name].iloc[0]
-        lat0, lon0 = depot_info["lat"], depot_info["lon"]
-        for i, train in enumerate(trains):
-            lat = lat0 + (i + 1) * decalage
-            lon = lon0 + (i + 1) * decalage
-            popup_html = f"""
-            <div style='font-family:sans-serif;min-width:180px'>
-                <div style='font-weight:bold;font-size:16px;color:#1976d2'>{t('train_name', lang)}: {train.nom}</div>
-                <div style='margin-top:4px'>
-                    <span style='background:#eee;border-radius:4px;padding:2px 6px;font-size:12px;color:#555'>{t('train_type', lang)}: {t(train.type, lang)}</span>
-                </div>
-                <div style='margin-top:8px'>
-                    <span style='color:#333'>{t('arrival_time', lang)}:</span> <b>{train.arrivee.strftime('%Y-%m-%d %H:%M')}</b><br>
-                    <span style='color:#333'>{t('departure_time', lang)}:</span> <b>{train.depart.strftime('%Y-%m-%d %H:%M')}</b>
-                </div>
-                <div style='margin-top:8px;color:#888;font-size:12px'>
-                    {t('depot', lang)}: {train.depot}
-                </div>
-            </div>
-            """
-            folium.Marker(
-                location=[lat, lon],
-                popup=folium.Popup(popup_html, max_width=300),
-                tooltip=train.nom,
-                icon=get_train_icon(),
-            ).add_to(marker_cluster)
+    # Trains présents à l'heure choisie : requête de l'arbre d'intervalles en O(log n + k)
+    presents = presence.presents(heure_select)
+    m = _carte(couches, _features_trains(presents, couches["positions"], t, lang), t, lang)
 
     with st.spinner(t("loading_map", lang) if "loading_map" in t.__code__.co_varnames else "Chargement de la carte..."):
         st_folium(m, width=1200, height=700, key="carte_etat_trains_heure")
\ No newline at end of file
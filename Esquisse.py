@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Esquisse.py
+===========
+
+FR: Esquisse de quantiles KLL : résumé compact et fusionnable d'un flux de valeurs (temps d'attente, etc.).
+EN: KLL quantile sketch: compact, mergeable summary of a stream of values (waiting times, etc.).
+FR: La mémoire reste bornée (environ 3 × k valeurs) quel que soit le nombre d'échantillons, et deux esquisses
+    (dépôts différents, simulations Monte-Carlo différentes) se fusionnent sans garder les échantillons.
+EN: Memory stays bounded (about 3 × k values) whatever the number of samples, and two sketches
+    (different depots, different Monte Carlo runs) merge without keeping the samples.
+
+Auteur : andre
+"""
+
+from bisect import bisect_right
+
+
+class EsquisseKLL:
+    """
+    FR: Esquisse KLL (Karnin, Lang, Liberty) à compacteurs empilés.
+    EN: KLL sketch (Karnin, Lang, Liberty) with stacked compactors.
+
+    Attributs / Attributes :
+        k (int) : FR: Paramètre de précision (erreur de rang ~ 1.7 / k). / EN: Accuracy parameter (rank error ~ 1.7 / k).
+        n (int) : FR: Nombre de valeurs vues. / EN: Number of values seen.
+        compacteurs (list[list[float]]) : FR: Niveau h : valeurs de poids 2**h. / EN: Level h: values of weight 2**h.
+    """
+
+    C = 2 / 3  # FR: Facteur de décroissance des capacités / EN: Capacity decay factor
+
+    def __init__(self, k=200):
+        self.k = k
+        self.n = 0
+        self.compacteurs = [[]]
+        self.minimum = None
+        self.maximum = None
+        self._decalages = [0]  # FR: Alternance déterministe des éléments promus / EN: Deterministic alternation of promoted items
+
+    def __len__(self):
+        return self.n
+
+    def _capacite(self, niveau):
+        hauteur = len(self.compacteurs)
+        return max(2, int(self.k * self.C ** (hauteur - niveau - 1)) + 1)
+
+    def _taille(self):
+        return sum(len(c) for c in self.compacteurs)
+
+    def _taille_max(self):
+        return sum(self._capacite(h) for h in range(len(self.compacteurs)))
+
+    def _compresser(self):
+        """
+        FR: Compacte le premier niveau trop plein : tri, puis promotion d'un élément sur deux au niveau supérieur.
+        EN: Compact the first overfull level: sort, then promote every other item to the next level.
+        """
+        while self._taille() > self._taille_max():
+            for h, compacteur in enumerate(self.compacteurs):
+                if len(compacteur) >= self._capacite(h):
+                    if h + 1 == len(self.compacteurs):
+                        self.compacteurs.append([])
+                        self._decalages.append(0)
+                    compacteur.sort()
+                    # FR: Un élément impair reste au niveau courant, le poids total reste égal à n
+                    # EN: An odd item stays at the current level, so the total weight stays equal to n
+                    reste = [compacteur.pop()] if len(compacteur) % 2 else []
+                    decalage = self._decalages[h]
+                    self._decalages[h] = 1 - decalage
+                    self.compacteurs[h + 1].extend(compacteur[decalage::2])
+                    self.compacteurs[h] = reste
+                    break
+
+    def ajouter(self, valeur):
+        """
+        FR: Ajoute une valeur à l'esquisse (O(1) amorti).
+        EN: Add a value to the sketch (amortised O(1)).
+        """
+        self.compacteurs[0].append(valeur)
+        self.n += 1
+        self.minimum = valeur if self.minimum is None else min(self.minimum, valeur)
+        self.maximum = valeur if self.maximum is None else max(self.maximum, valeur)
+        if len(self.compacteurs[0]) >= self._capacite(0):
+            self._compresser()
+
+    def fusionner(self, autre):
+        """
+        FR: Fusionne une autre esquisse dans celle-ci (l'autre n'est pas modifiée).
+        EN: Merge another sketch into this one (the other one is left unchanged).
+        """
+        while len(self.compacteurs) < len(autre.compacteurs):
+            self.compacteurs.append([])
+            self._decalages.append(0)
+        for h, compacteur in enumerate(autre.compacteurs):
+            self.compacteurs[h].extend(compacteur)
+        self.n += autre.n
+        if autre.minimum is not None:
+            self.minimum = autre.minimum if self.minimum is None else min(self.minimum, autre.minimum)
+            self.maximum = autre.maximum if self.maximum is None else max(self.maximum, autre.maximum)
+        self._compresser()
+        return self
+
+    def _valeurs_ponderees(self):
+        """
+        FR: Valeurs triées et poids cumulés.
+        EN: Sorted values and cumulative weights.
+        """
+        paires = sorted((v, 2 ** h) for h, c in enumerate(self.compacteurs) for v in c)
+        valeurs, cumuls, total = [], [], 0
+        for valeur, poids in paires:
+            total += poids
+            valeurs.append(valeur)
+            cumuls.append(total)
+        return valeurs, cumuls
+
+    def quantiles(self, qs):
+        """
+        FR: Estime plusieurs quantiles (q entre 0 et 1).
+        EN: Estimate several quantiles (q between 0 and 1).
+
+        Returns:
+            list: FR: Valeurs estimées (None si l'esquisse est vide). / EN: Estimated values (None if the sketch is empty).
+        """
+        if not self.n:
+            return [None for _ in qs]
+        valeurs, cumuls = self._valeurs_ponderees()
+        total = cumuls[-1]
+        resultats = []
+        for q in qs:
+            if q <= 0:
+                resultats.append(self.minimum)
+            elif q >= 1:
+                resultats.append(self.maximum)
+            else:
+                i = bisect_right(cumuls, q * total)
+                resultats.append(valeurs[min(i, len(valeurs) - 1)])
+        return resultats
+
+    def histogramme(self, bornes):
+        """
+        FR: Estime le nombre de valeurs dans chaque intervalle [bornes[i], bornes[i+1]).
+        EN: Estimate the number of values in each interval [bornes[i], bornes[i+1]).
+        """
+        comptes = [0] * (len(bornes) - 1)
+        if not self.n:
+            return comptes
+        for h, compacteur in enumerate(self.compacteurs):
+            for valeur in compacteur:
+                i = bisect_right(bornes, valeur) - 1
+                if 0 <= i < len(comptes):
+                    comptes[i] += 2 ** h
+                elif valeur == bornes[-1]:
+                    comptes[-1] += 2 ** h
+        return comptes
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+Export.py
+=========
+
+FR: Exports de la simulation. Diagramme de Gantt PDF dessiné directement en primitives vectorielles reportlab
+    (voies en lignes, occupations en rectangles, libellés, légende), sans figure Plotly ni Kaleido.
+EN: Simulation exports. Gantt PDF drawn directly with reportlab vector primitives
+    (tracks as rows, occupations as rectangles, labels, legend), without a Plotly figure or Kaleido.
+FR: Pagination automatique par dépôt, par fenêtre de temps (alignée sur minuit) et par paquet de voies.
+EN: Automatic pagination by depot, by time window (aligned on midnight) and by batch of tracks.
+FR: PDF de figures Plotly (raster) : les rendus Kaleido tournent dans un pool de processus, chaque processus
+    ayant sa propre instance Kaleido (le verrou de Kaleido est par processus).
+EN: PDF of Plotly figures (raster): Kaleido renders run in a process pool, each process having
+    its own Kaleido instance (Kaleido's lock is per process).
+FR: Exports des occupations (CSV, JSON, Excel) de tous les dépôts, en flux : les lignes viennent d'un générateur
+    et sont écrites par blocs dans un fichier (mémoire ou disque), sans DataFrame intermédiaire.
+EN: Occupation exports (CSV, JSON, Excel) for every depot, streamed: rows come from a generator
+    and are written in chunks to a file (memory or disk), without an intermediate DataFrame.
+
+Auteur : andre
+"""
+
+import csv
+import io
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from itertools import islice
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+# FR: Couleurs par type de train (mêmes que la légende de l'onglet Graphiques)
+# EN: Colours per train type (same as the Graphs tab legend)
+COULEURS_TYPES = {
+    "testing": colors.HexColor("#e53935"),
+    "storage": colors.HexColor("#1e88e5"),
+    "pit": colors.HexColor("#43a047"),
+}
+COULEUR_AUTRE = colors.HexColor("#9e9e9e")
+
+MARGE = 36  # FR: Marge de page (pt) / EN: Page margin (pt)
+LARGEUR_LIBELLES = 70  # FR: Colonne des noms de voies (pt) / EN: Track name column (pt)
+HAUTEUR_LIGNE_MIN = 16  # FR: Hauteur minimale d'une voie (pt) / EN: Minimum track row height (pt)
+HAUTEUR_LIGNE_MAX = 40  # FR: Hauteur maximale d'une voie (pt) / EN: Maximum track row height (pt)
+
+
+def _fenetres(debut, fin, duree):
+    """
+    FR: Découpe [debut, fin] en fenêtres consécutives de `duree`, la première alignée sur minuit.
+    EN: Split [debut, fin] into consecutive windows of `duree`, the first aligned on midnight.
+    """
+    courant = datetime.combine(debut.date(), datetime.min.time())
+    while courant < fin:
+        yield courant, courant + duree
+        courant += duree
+
+
+def _pas_graduation(duree):
+    """
+    FR: Pas des graduations de l'axe du temps selon la largeur de fenêtre.
+    EN: Time axis tick step depending on the window width.
+    """
+    heures = duree.total_seconds() / 3600
+    for pas in (1, 2, 3, 6, 12, 24, 48, 168):
+        if heures / pas <= 16:
+            return timedelta(hours=pas)
+    return timedelta(days=14)
+
+
+def _dessiner_legende(c, t, lang, x, y):
+    """
+    FR: Légende des couleurs par type et du motif des trains électriques.
+    EN: Legend of type colours and of the electric train pattern.
+    """
+    c.setFont("Helvetica", 9)
+    for type_train, couleur in COULEURS_TYPES.items():
+        c.setFillColor(couleur)
+        c.rect(x, y, 10, 10, stroke=0, fill=1)
+        c.setFillColor(colors.black)
+        libelle = t(type_train, lang)
+        c.drawString(x + 14, y + 2, libelle)
+        x += 24 + stringWidth(libelle, "Helvetica", 9)
+    c.setFillColor(colors.white)
+    c.rect(x, y, 10, 10, stroke=1, fill=1)
+    _hachurer(c, x, y, 10, 10)
+    c.setFillColor(colors.black)
+    c.drawString(x + 14, y + 2, t("electric_train", lang))
+
+
+def _hachurer(c, x, y, largeur, hauteur):
+    """
+    FR: Hachures diagonales limitées au rectangle (trains électriques).
+    EN: Diagonal hatching clipped to the rectangle (electric trains).
+    """
+    c.saveState()
+    chemin = c.beginPath()
+    chemin.rect(x, y, largeur, hauteur)
+    c.clipPath(chemin, stroke=0, fill=0)
+    c.setStrokeColor(colors.black)
+    c.setLineWidth(0.4)
+    pas = 4
+    position = x - hauteur
+    while position < x + largeur:
+        c.line(position, y, position + hauteur, y + hauteur)
+        position += pas
+    c.restoreState()
+
+
+def _dessiner_page(c, t, lang, depot, numeros_voies, voies, occupations, debut, fin, taille):
+    """
+    FR: Dessine une page : titre, axe du temps, lignes de voies et rectangles d'occupation découpés à la fenêtre.
+    EN: Draw one page: title, time axis, track rows and occupation rectangles clipped to the window.
+    """
+    largeur_page, hauteur_page = taille
+    x0 = MARGE + LARGEUR_LIBELLES
+    x1 = largeur_page - MARGE
+    y_haut = hauteur_page - MARGE - 40
+    y_bas = MARGE + 40
+    hauteur_ligne = min(HAUTEUR_LIGNE_MAX, (y_haut - y_bas) / max(1, len(voies)))
+    secondes = (fin - debut).total_seconds()
+
+    def abscisse(instant):
+        return x0 + (x1 - x0) * (instant - debut).total_seconds() / secondes
+
+    # FR: Titre / EN: Title
+    c.setFont("Helvetica-Bold", 14)
+    c.setFillColor(colors.black)
+    c.drawString(MARGE, hauteur_page - MARGE - 14,
+                 f"{t('Planning', lang)} - {depot} : {debut:%Y-%m-%d %H:%M} - {fin:%Y-%m-%d %H:%M}")
+
+    # FR: Graduations et grille / EN: Ticks and grid
+    y_grille_bas = y_haut - hauteur_ligne * len(voies)
+    pas = _pas_graduation(fin - debut)
+    c.setFont("Helvetica", 7)
+    c.setStrokeColor(colors.HexColor("#cfd8dc"))
+    c.setLineWidth(0.3)
+    instant = debut
+    while instant <= fin:
+        x = abscisse(instant)
+        c.line(x, y_grille_bas, x, y_haut)
+        c.drawCentredString(x, y_haut + 4, instant.strftime("%d/%m %H:%M" if pas < timedelta(days=1) else "%d/%m"))
+        instant += pas
+
+    # FR: Lignes de voies / EN: Track rows
+    rang = {}
+    for i, voie_idx in enumerate(voies):
+        rang[voie_idx] = i
+        y = y_haut - (i + 1) * hauteur_ligne
+        c.setStrokeColor(colors.HexColor("#90a4ae"))
+        c.line(x0, y, x1, y)
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica", 9)
+        c.drawRightString(x0 - 6, y + hauteur_ligne / 2 - 3, f"{t('Track', lang)} {numeros_voies[voie_idx]}")
+
+    # FR: Occupations / EN: Occupations
+    for voie_idx, occ_debut, occ_fin, train in occupations:
+        if voie_idx not in rang or occ_fin <= debut or occ_debut >= fin or occ_fin <= occ_debut:
+            continue
+        xa = abscisse(max(occ_debut, debut))
+        xb = abscisse(min(occ_fin, fin))
+        y = y_haut - (rang[voie_idx] + 1) * hauteur_ligne + hauteur_ligne * 0.15
+        h = hauteur_ligne * 0.7
+        c.setFillColor(COULEURS_TYPES.get(str(train.type).lower(), COULEUR_AUTRE))
+        c.setStrokeColor(colors.black)
+        c.setLineWidth(0.5)
+        c.rect(xa, y, xb - xa, h, stroke=1, fill=1)
+        if getattr(train, "electrique", False):
+            _hachurer(c, xa, y, xb - xa, h)
+        # FR: Nom du train s'il tient dans le rectangle / EN: Train name if it fits in the rectangle
+        taille_police = min(8, h * 0.6)
+        if stringWidth(train.nom, "Helvetica", taille_police) + 4 <= xb - xa:
+            c.setFillColor(colors.white)
+            c.setFont("Helvetica", taille_police)
+            c.drawString(xa + 2, y + h / 2 - taille_police / 3, train.nom)
+
+    _dessiner_legende(c, t, lang, MARGE, MARGE)
+
+
+def gantt_pdf_vectoriel(simulation, t, lang, depots=None, fenetre=timedelta(days=7), taille=landscape(A4)):
+    """
+    FR: Génère le planning Gantt en PDF vectoriel, une page par (dépôt, fenêtre de temps, paquet de voies).
+        Seules les fenêtres contenant au moins une occupation produisent une page.
+    EN: Generate the Gantt plan as a vector PDF, one page per (depot, time window, batch of tracks).
+        Only windows holding at least one occupation produce a page.
+
+    Args:
+        simulation (Simulation): FR: Simulation à exporter. / EN: Simulation to export.
+        t: FR: Fonction de traduction. / EN: Translation function.
+        lang (str): FR: Langue. / EN: Language.
+        depots (list[str]|None): FR: Dépôts à inclure (None = tous). / EN: Depots to include (None = all).
+        fenetre (timedelta): FR: Durée couverte par une page. / EN: Time span covered by one page.
+        taille (tuple): FR: Format de page reportlab. / EN: reportlab page size.
+
+    Returns:
+        io.BytesIO: FR: Contenu du PDF. / EN: PDF content.
+    """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=taille)
+    c.setTitle("Planning Gantt")
+    lignes_par_page = max(1, int((taille[1] - 2 * MARGE - 80) // HAUTEUR_LIGNE_MIN))
+    pages = 0
+
+    for depot in depots or list(simulation.depots):
+        depot_data = simulation.depots[depot]
+        # FR: Index d'intervalles : chaque fenêtre ne lit que ses occupations / EN: Interval index: each window only reads its occupations
+        index = simulation.index_presence(depot, occupations=True)
+        if not index.instants:
+            continue
+        numeros_voies = depot_data["numeros_voies"]
+        toutes_voies = list(range(len(numeros_voies)))
+        for debut, fin in _fenetres(index.instants[0], index.instants[-1], fenetre):
+            dans_fenetre = [occ for occ in index.chevauchant(debut, fin) if occ[1] < fin and occ[2] > debut]
+            if not dans_fenetre:
+                continue
+            for i in range(0, len(toutes_voies), lignes_par_page):
+                voies = toutes_voies[i:i + lignes_par_page]
+                _dessiner_page(c, t, lang, depot, numeros_voies, voies, dans_fenetre, debut, fin, taille)
+                c.showPage()
+                pages += 1
+
+    if not pages:
+        c.setFont("Helvetica", 12)
+        c.drawString(MARGE, taille[1] - MARGE - 12, t("no_trains", lang))
+        c.showPage()
+    c.save()
+    buffer.seek(0)
+    return buffer
+
+
+# FR: Résolution cible des images du PDF raster (points par pouce) et taille de mise en page des figures
+# EN: Target resolution of raster PDF images (dots per inch) and layout size of the figures
+PDF_DPI = 200
+PDF_FIG_LARGEUR, PDF_FIG_HAUTEUR = 1200, 600
+
+
+def _rendre_figure_png(figure_json, largeur_pt):
+    """
+    FR: Rend une figure (JSON Plotly) en PNG directement à sa résolution d'affichage dans le PDF.
+        Exécutée dans un processus du pool : Kaleido y démarre une fois puis sert les figures suivantes.
+    EN: Render a figure (Plotly JSON) as PNG directly at its display resolution in the PDF.
+        Run in a pool process: Kaleido starts there once and then serves the following figures.
+    """
+    import plotly.io as pio
+    scale = largeur_pt / 72 * PDF_DPI / PDF_FIG_LARGEUR
+    return pio.from_json(figure_json).to_image(format="png", width=PDF_FIG_LARGEUR, height=PDF_FIG_HAUTEUR, scale=scale)
+
+
+def _rendus_png(figures_json, largeur_pt, max_workers=None):
+    """
+    FR: Génère les PNG dans l'ordre des figures, rendus en parallèle quand plusieurs processus sont disponibles.
+    EN: Yield the PNGs in figure order, rendered in parallel when several processes are available.
+    """
+    processus = min(len(figures_json), max_workers or os.cpu_count() or 1)
+    if processus > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=processus) as pool:
+                yield from pool.map(_rendre_figure_png, figures_json, [largeur_pt] * len(figures_json))
+            return
+        except (OSError, BrokenProcessPool):
+            # FR: Pool indisponible (environnement restreint) : rendu séquentiel
+            # EN: Pool unavailable (restricted environment): sequential rendering
+            pass
+    for figure_json in figures_json:
+        yield _rendre_figure_png(figure_json, largeur_pt)
+
+
+def plotly_multi_fig_to_pdf(figs, legends_html, max_workers=None):
+    """
+    FR: Assemble des figures Plotly dans un PDF A4, deux par page avec leur légende. Les rendus PNG tournent dans
+        un pool de processus ; chaque image est dessinée dans l'ordre dès qu'elle est prête, puis libérée.
+    EN: Assemble Plotly figures into an A4 PDF, two per page with their legend. PNG renders run in a
+        process pool; each image is drawn in order as soon as it is ready, then released.
+
+    Args:
+        figs (list): FR: Figures Plotly. / EN: Plotly figures.
+        legends_html (list[str]): FR: Légende (HTML simple) de chaque figure. / EN: Legend (simple HTML) of each figure.
+        max_workers (int|None): FR: Processus du pool (défaut : nombre de CPU). / EN: Pool processes (default: CPU count).
+
+    Returns:
+        io.BytesIO: FR: Contenu du PDF. / EN: PDF content.
+    """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    y_offset = height - 40
+
+    # FR: Taille de dessin fixe : toutes les figures ont le même rapport largeur/hauteur
+    # EN: Fixed drawing size: every figure has the same aspect ratio
+    aspect = PDF_FIG_LARGEUR / PDF_FIG_HAUTEUR
+    img_width = width - 40
+    img_height = img_width / aspect
+    if img_height > (height - 120) / 2:
+        img_height = (height - 120) / 2
+        img_width = img_height * aspect
+
+    # FR: Les figures partent vers les processus en JSON / EN: Figures are sent to the processes as JSON
+    rendus = _rendus_png([fig.to_json() for fig in figs], img_width, max_workers)
+    for img_bytes, legend_html in zip(rendus, legends_html):
+        c.drawImage(ImageReader(io.BytesIO(img_bytes)), 20, y_offset - img_height, width=img_width, height=img_height)
+        legend_text = re.sub('<[^<]+?>', '', legend_html)
+        y = y_offset - img_height - 20
+        for line in simpleSplit(legend_text, "Helvetica", 12, width - 40):
+            c.drawString(30, y, line)
+            y -= 15
+        y_offset = y - 40
+        if y_offset < 100:
+            c.showPage()
+            y_offset = height - 40
+    c.showPage()
+    c.save()
+    buffer.seek(0)
+    return buffer
+
+
+# FR: Colonnes des exports d'occupation / EN: Occupation export columns
+COLONNES_OCCUPATION = ["Depot", "Track", "Train", "Type", "Arrival", "Departure", "Electric"]
+TAILLE_BLOC = 10000  # FR: Lignes écrites par bloc / EN: Rows written per chunk
+
+
+def iterer_occupations(simulation, depots=None):
+    """
+    FR: Génère une ligne (voir COLONNES_OCCUPATION) par occupation, pour tous les dépôts (ou ceux demandés).
+    EN: Yield one row (see COLONNES_OCCUPATION) per occupation, for every depot (or the requested ones).
+    """
+    for depot in depots or list(simulation.depots):
+        depot_data = simulation.depots[depot]
+        numeros_voies = depot_data["numeros_voies"]
+        for voie_idx, debut, fin, train in depot_data["occupation"]:
+            yield (
+                depot,
+                numeros_voies[voie_idx],
+                train.nom,
+                train.type,
+                debut.strftime("%Y-%m-%d %H:%M"),
+                fin.strftime("%Y-%m-%d %H:%M"),
+                bool(train.electrique),
+            )
+
+
+def _blocs(lignes, taille=TAILLE_BLOC):
+    lignes = iter(lignes)
+    while True:
+        bloc = list(islice(lignes, taille))
+        if not bloc:
+            return
+        yield bloc
+
+
+def exporter_csv(simulation, fichier=None, depots=None, sep=";"):
+    """
+    FR: Écrit les occupations en CSV, bloc par bloc.
+    EN: Write occupations as CSV, chunk by chunk.
+
+    Args:
+        fichier: FR: Fichier binaire de destination (None = io.BytesIO). / EN: Binary target file (None = io.BytesIO).
+
+    Returns:
+        file: FR: Le fichier, rembobiné. / EN: The file, rewound.
+    """
+    fichier = fichier if fichier is not None else io.BytesIO()
+    texte = io.TextIOWrapper(fichier, encoding="utf-8", newline="")
+    writer = csv.writer(texte, delimiter=sep)
+    writer.writerow(COLONNES_OCCUPATION)
+    for bloc in _blocs(iterer_occupations(simulation, depots)):
+        writer.writerows(bloc)
+    texte.flush()
+    texte.detach()
+    fichier.seek(0)
+    return fichier
+
+
+def exporter_json(simulation, fichier=None, depots=None):
+    """
+    FR: Écrit les occupations en tableau JSON d'objets, bloc par bloc.
+    EN: Write occupations as a JSON array of objects, chunk by chunk.
+
+    Args:
+        fichier: FR: Fichier binaire de destination (None = io.BytesIO). / EN: Binary target file (None = io.BytesIO).
+
+    Returns:
+        file: FR: Le fichier, rembobiné. / EN: The file, rewound.
+    """
+    fichier = fichier if fichier is not None else io.BytesIO()
+    fichier.write(b"[")
+    premier = True
+    for bloc in _blocs(iterer_occupations(simulation, depots)):
+        morceau = ",".join(json.dumps(dict(zip(COLONNES_OCCUPATION, ligne)), ensure_ascii=False) for ligne in bloc)
+        fichier.write(("" if premier else ",").encode("utf-8") + morceau.encode("utf-8"))
+        premier = False
+    fichier.write(b"]")
+    fichier.seek(0)
+    return fichier
+
+
+def exporter_excel(simulation, fichier=None, depots=None):
+    """
+    FR: Écrit les occupations en Excel avec openpyxl en mode write_only (mémoire constante pendant l'écriture).
+    EN: Write occupations as Excel with openpyxl in write_only mode (constant memory while writing).
+
+    Args:
+        fichier: FR: Fichier binaire de destination (None = io.BytesIO). / EN: Binary target file (None = io.BytesIO).
+
+    Returns:
+        file: FR: Le fichier, rembobiné. / EN: The file, rewound.
+    """
+    from openpyxl import Workbook
+
+    classeur = Workbook(write_only=True)
+    feuille = classeur.create_sheet("Occupation")
+    feuille.append(COLONNES_OCCUPATION)
+    for ligne in iterer_occupations(simulation, depots):
+        feuille.append(ligne)
+    fichier = fichier if fichier is not None else io.BytesIO()
+    classeur.save(fichier)
+    fichier.seek(0)
+    return fichier
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+Importation.py
+==============
+
+FR: Lecture rapide des fichiers d'horaires importés (CSV ou Excel).
+EN: Fast reading of imported timetable files (CSV or Excel).
+FR: Le séparateur CSV est détecté une seule fois sur un échantillon, puis le moteur C de pandas lit le fichier
+    avec des types explicites (texte) et les colonnes d'horaires converties en dates. Les gros fichiers sont lus
+    par blocs. Le résultat est mis en cache selon l'empreinte du contenu : l'aperçu et l'import ne relisent pas le fichier.
+EN: The CSV delimiter is sniffed once on a sample, then pandas' C engine reads the file
+    with explicit (text) dtypes and the schedule columns parsed as dates. Large files are read
+    in chunks. The result is cached by content hash: preview and import do not re-parse the file.
+FR: Plusieurs fichiers sont lus en parallèle dans un pool de processus puis fusionnés en un seul lot
+    (aussi en ligne de commande : python Importation.py fichiers... --simulation sim.pkl).
+EN: Several files are read in parallel in a process pool, then merged into a single batch
+    (also from the command line: python Importation.py files... --simulation sim.pkl).
+
+Auteur : andre
+"""
+
+import csv
+import io
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from hashlib import blake2b
+import pandas as pd
+
+# FR: Noms de colonnes acceptés (français, anglais, danois) pour chaque champ d'un train
+# EN: Accepted column names (French, English, Danish) for each train field
+ALIAS_COLONNES = {
+    "nom": ("Nom", "Nom du train", "Train name", "Tog navn", "Train", "Train Nom"),
+    "wagons": ("Nombre de wagons", "Number of wagons", "Number of coaches", "Antal vogne", "wagons"),
+    "locomotives": ("Nombre de locomotives", "Number of locomotives", "Antal lokomotiver", "locomotives"),
+    "arrivee": ("Heure d'arrivée", "Arrival time", "Ankomsttid", "Arrival"),
+    "depart": ("Heure de départ", "Departure time", "Afgangstid", "Departure"),
+    "depot": ("Dépôt", "Depot"),
+    "type": ("Type de train", "Train type", "Togtype", "Type"),
+    "electrique": ("Électrique", "Electric", "Elektrisk"),
+    "locomotive_cote": ("Côté sans locomotive", "Locomotive opposite side", "Lokomotivens side"),
+}
+CHAMPS_DATES = ("arrivee", "depart")
+
+TAILLE_ECHANTILLON = 64 * 1024  # FR: Octets lus pour détecter le séparateur / EN: Bytes read to sniff the delimiter
+SEUIL_BLOCS = 20 * 1024 * 1024  # FR: Au-delà, lecture par blocs / EN: Beyond this, read in chunks
+TAILLE_BLOC = 200000  # FR: Lignes par bloc / EN: Rows per chunk
+TAILLE_CACHE = 8  # FR: Fichiers gardés en cache / EN: Files kept in cache
+
+_cache = OrderedDict()
+_cache_lots = OrderedDict()  # FR: Fichiers déjà normalisés (lecture multiple) / EN: Already normalised files (multi-file read)
+
+
+def resoudre_colonnes(colonnes):
+    """
+    FR: Associe chaque champ à la première colonne du fichier qui correspond à un de ses alias (une fois par fichier).
+    EN: Map each field to the first file column matching one of its aliases (once per file).
+
+    Returns:
+        dict: FR: {champ: nom de colonne} pour les champs trouvés. / EN: {field: column name} for the fields found.
+    """
+    colonnes = [str(colonne) for colonne in colonnes]
+    presentes = {colonne.strip(): colonne for colonne in colonnes}
+    correspondances = {}
+    for champ, alias in ALIAS_COLONNES.items():
+        for nom in alias:
+            if nom in presentes:
+                correspondances[champ] = presentes[nom]
+                break
+    return correspondances
+
+
+def detecter_separateur(echantillon):
+    """
+    FR: Détecte le séparateur CSV sur un échantillon de texte (virgule par défaut).
+    EN: Sniff the CSV delimiter on a text sample (comma by default).
+    """
+    try:
+        return csv.Sniffer().sniff(echantillon, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def _convertir_dates(df):
+    """
+    FR: Convertit les colonnes d'horaires en dates (vectorisé). Le format est déduit de la colonne ;
+        les valeurs qui ne le suivent pas sont relues au format libre, les autres deviennent NaT.
+    EN: Parse schedule columns as dates (vectorised). The format is inferred from the column;
+        values not following it are re-read in free format, the rest become NaT.
+    """
+    correspondances = resoudre_colonnes(df.columns)
+    for champ in CHAMPS_DATES:
+        colonne = correspondances.get(champ)
+        if colonne is None:
+            continue
+        brutes = df[colonne]
+        dates = pd.to_datetime(brutes, errors="coerce")
+        a_relire = dates.isna() & brutes.notna()
+        if a_relire.any():
+            dates[a_relire] = pd.to_datetime(brutes[a_relire], errors="coerce", format="mixed")
+        df[colonne] = dates
+    return df
+
+
+def _lire_csv(contenu):
+    echantillon = contenu[:TAILLE_ECHANTILLON].decode("utf-8-sig", errors="ignore")
+    options = dict(sep=detecter_separateur(echantillon), engine="c", dtype=str, encoding="utf-8-sig", skipinitialspace=True)
+    if len(contenu) <= SEUIL_BLOCS:
+        return _convertir_dates(pd.read_csv(io.BytesIO(contenu), **options))
+    blocs = pd.read_csv(io.BytesIO(contenu), chunksize=TAILLE_BLOC, **options)
+    return pd.concat([_convertir_dates(bloc) for bloc in blocs], ignore_index=True)
+
+
+def est_excel(nom_fichier):
+    return nom_fichier.lower().endswith((".xlsx", ".xls"))
+
+
+def _cle_fichier(contenu, nom_fichier):
+    return blake2b(contenu, digest_size=16).hexdigest(), est_excel(nom_fichier)
+
+
+def _lire(contenu, excel):
+    if excel:
+        return _convertir_dates(pd.read_excel(io.BytesIO(contenu), dtype=str))
+    return _lire_csv(contenu)
+
+
+def _analyser_fichier(contenu, excel, depots_connus, depot_defaut):
+    """
+    FR: Lecture et normalisation d'un fichier, exécutées dans un processus du pool ; retourne aussi la durée (s).
+    EN: Read and normalisation of one file, run in a pool process; also returns the duration (s).
+    """
+    debut = time.perf_counter()
+    trains, erreurs = normaliser_import(_lire(contenu, excel), depots_connus, depot_defaut)
+    return trains, erreurs, time.perf_counter() - debut
+
+
+def _mettre_en_cache(cle, valeur, cache=_cache):
+    cache[cle] = valeur
+    while len(cache) > TAILLE_CACHE:
+        cache.popitem(last=False)
+
+
+def lire_fichier_import(contenu, nom_fichier, cache=True):
+    """
+    FR: Lit un fichier d'horaires (CSV ou Excel) en DataFrame, avec cache selon l'empreinte du contenu.
+        Les colonnes gardent leur nom d'origine ; les horaires sont des dates, le reste du texte.
+        Le DataFrame retourné est partagé par le cache : ne pas le modifier en place.
+    EN: Read a timetable file (CSV or Excel) into a DataFrame, cached by content hash.
+        Columns keep their original names; schedules are dates, everything else text.
+        The returned DataFrame is shared by the cache: do not modify it in place.
+
+    Args:
+        contenu (bytes): FR: Contenu du fichier. / EN: File content.
+        nom_fichier (str): FR: Nom du fichier (l'extension choisit le lecteur). / EN: File name (the extension selects the reader).
+        cache (bool): FR: False pour un contenu lu une seule fois (ex. : lignes ajoutées à un fichier surveillé).
+                      EN: False for content read only once (e.g. rows appended to a watched file).
+
+    Returns:
+        pandas.DataFrame
+    """
+    if not cache:
+        return _lire(contenu, est_excel(nom_fichier))
+    cle = _cle_fichier(contenu, nom_fichier)
+    if cle in _cache:
+        _cache.move_to_end(cle)
+        return _cache[cle]
+    df = _lire(contenu, cle[1])
+    _mettre_en_cache(cle, df)
+    return df
+
+
+# FR: Valeurs reconnues comme vraies pour la colonne électrique / EN: Values read as true for the electric column
+VRAI = {"true", "1", "yes", "oui", "ja", "vrai", "1.0"}
+COLONNES_TRAINS = ["nom", "wagons", "locomotives", "arrivee", "depart", "depot", "type", "electrique", "locomotive_cote"]
+LONGUEUR_WAGON, LONGUEUR_LOCOMOTIVE = 14, 19  # FR: Comme Train.calculer_longueur / EN: Same as Train.calculer_longueur
+
+
+def normaliser_import(df, depots_connus, depot_defaut="Glostrup"):
+    """
+    FR: Convertit un fichier lu en trains typés, colonne par colonne (vectorisé), puis valide par masques :
+        départ après l'arrivée, longueur positive, nombres valides, dépôt connu.
+    EN: Convert a read file into typed trains, column by column (vectorised), then validate with masks:
+        departure after arrival, positive length, valid numbers, known depot.
+
+    Args:
+        df (pandas.DataFrame): FR: Résultat de lire_fichier_import. / EN: Result of lire_fichier_import.
+        depots_connus (iterable): FR: Dépôts de la simulation. / EN: Simulation depots.
+        depot_defaut (str): FR: Dépôt utilisé si la colonne est absente ou vide. / EN: Depot used when the column is missing or empty.
+
+    Returns:
+        tuple: FR: (trains valides avec les colonnes COLONNES_TRAINS, rapport d'erreurs {"Ligne", "Erreur"}).
+                   "Ligne" est le numéro de ligne dans le fichier (l'en-tête est la ligne 1).
+               EN: (valid trains with the COLONNES_TRAINS columns, error report {"Ligne", "Erreur"}).
+                   "Ligne" is the line number in the file (the header is line 1).
+    """
+    correspondances = resoudre_colonnes(df.columns)
+    n = len(df)
+
+    def colonne(champ):
+        nom = correspondances.get(champ)
+        return df[nom].reset_index(drop=True) if nom is not None else pd.Series([None] * n, dtype=object)
+
+    def texte(champ):
+        return colonne(champ).astype("string").str.strip()
+
+    def entier(champ, defaut):
+        brut = texte(champ)
+        valeurs = pd.to_numeric(brut, errors="coerce")
+        invalides = brut.notna() & (brut != "") & valeurs.isna()
+        return valeurs.fillna(defaut), invalides
+
+    wagons, wagons_invalides = entier("wagons", 1)
+    locomotives, locomotives_invalides = entier("locomotives", 1)
+    arrivee = pd.to_datetime(colonne("arrivee"), errors="coerce")
+    depart = pd.to_datetime(colonne("depart"), errors="coerce")
+    depot = texte("depot").fillna(depot_defaut).replace("", depot_defaut)
+    cote = texte("locomotive_cote").str.lower()
+    trains = pd.DataFrame({
+        "nom": texte("nom").fillna("").astype(object),
+        "wagons": wagons,
+        "locomotives": locomotives,
+        "arrivee": arrivee,
+        "depart": depart,
+        "depot": depot.astype(object),
+        "type": texte("type").str.lower().fillna("storage").replace("", "storage").astype(object),
+        "electrique": texte("electrique").str.lower().isin(VRAI).fillna(False).astype(bool),
+        # FR: Côté retenu seulement pour une locomotive unique / EN: Side kept only for a single locomotive
+        "locomotive_cote": cote.astype(object).where(cote.isin(["left", "right"]).fillna(False) & (locomotives == 1), None),
+    })
+
+    # FR: Validation par masques (un message par règle violée) / EN: Mask validation (one message per broken rule)
+    regles = [
+        (wagons_invalides | locomotives_invalides, "Nombre de wagons ou de locomotives invalide."),
+        (arrivee.isna() | depart.isna(), "Heure d'arrivée ou de départ invalide."),
+        (arrivee.notna() & depart.notna() & (depart <= arrivee), "L'heure d'arrivée doit être antérieure à l'heure de départ."),
+        ((wagons < 0) | (locomotives < 0) | (wagons * LONGUEUR_WAGON + locomotives * LONGUEUR_LOCOMOTIVE <= 0),
+         "La longueur du train doit être positive."),
+        (~depot.isin(list(depots_connus)), "Dépôt inconnu."),
+    ]
+    erreurs = [
+        pd.DataFrame({"Ligne": masque[masque].index + 2, "Erreur": message})
+        for masque, message in regles if masque.any()
+    ]
+    rapport = pd.concat(erreurs, ignore_index=True).sort_values("Ligne", kind="stable") if erreurs else pd.DataFrame(columns=["Ligne", "Erreur"])
+    valides = ~pd.concat([masque for masque, _ in regles], axis=1).any(axis=1) if n else pd.Series([], dtype=bool)
+
+    trains = trains[valides].copy()
+    trains["wagons"] = trains["wagons"].astype(int)
+    trains["locomotives"] = trains["locomotives"].astype(int)
+    return trains.reset_index(drop=True), rapport.reset_index(drop=True)
+
+
+def lire_fichiers_import(fichiers, depots_connus, depot_defaut="Glostrup", max_workers=None):
+    """
+    FR: Lit plusieurs fichiers d'horaires en parallèle (pool de processus), les normalise et les fusionne en un lot.
+        Les fichiers identiques ne sont lus qu'une fois, les fichiers déjà en cache ne sont pas relus,
+        et une ligne présente dans plusieurs fichiers n'est gardée qu'une fois.
+    EN: Read several timetable files in parallel (process pool), normalise them and merge them into one batch.
+        Identical files are read once, files already cached are not re-read,
+        and a row found in several files is kept once.
+
+    Args:
+        fichiers (list[tuple]): FR: (nom du fichier, contenu en octets). / EN: (file name, content bytes).
+        depots_connus (iterable): FR: Dépôts de la simulation. / EN: Simulation depots.
+        depot_defaut (str): FR: Voir normaliser_import. / EN: See normaliser_import.
+        max_workers (int|None): FR: Processus du pool (défaut : nombre de CPU). / EN: Pool processes (default: CPU count).
+
+    Returns:
+        tuple: FR: (trains valides, rapport d'erreurs avec la colonne "Fichier",
+                    rapport par fichier {"Fichier", "Lignes", "Valides", "Erreurs", "Doublons", "Secondes"}).
+               EN: (valid trains, error report with a "Fichier" column,
+                    per-file report {"Fichier", "Lignes", "Valides", "Erreurs", "Doublons", "Secondes"}).
+    """
+    depots_connus = list(depots_connus)
+    cles = [_cle_fichier(contenu, nom) + (tuple(depots_connus), depot_defaut) for nom, contenu in fichiers]
+    lus = {}
+    for cle in cles:
+        if cle in _cache_lots:
+            _cache_lots.move_to_end(cle)
+            trains, erreurs_fichier, _ = _cache_lots[cle]
+            lus[cle] = (trains, erreurs_fichier, 0.0)
+    a_lire = {cle: contenu for cle, (_, contenu) in zip(cles, fichiers) if cle not in lus}
+
+    processus = min(len(a_lire), max_workers or os.cpu_count() or 1)
+    if processus > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=processus) as pool:
+                futurs = {cle: pool.submit(_analyser_fichier, contenu, cle[1], depots_connus, depot_defaut)
+                          for cle, contenu in a_lire.items()}
+                for cle, futur in futurs.items():
+                    lus[cle] = futur.result()
+        except (OSError, BrokenProcessPool):
+            # FR: Pool indisponible (environnement restreint) : lecture séquentielle
+            # EN: Pool unavailable (restricted environment): sequential read
+            pass
+    for cle, contenu in a_lire.items():
+        if cle not in lus:
+            lus[cle] = _analyser_fichier(contenu, cle[1], depots_connus, depot_defaut)
+        _mettre_en_cache(cle, lus[cle], _cache_lots)
+
+    lots, erreurs, rapport, vus = [], [], [], set()
+    for (nom, _), cle in zip(fichiers, cles):
+        trains, erreurs_fichier, duree = lus[cle]
+        lignes = len(trains) + erreurs_fichier["Ligne"].nunique()
+        if cle in vus:
+            # FR: Contenu identique à un fichier précédent / EN: Same content as a previous file
+            rapport.append({"Fichier": nom, "Lignes": lignes, "Valides": 0, "Erreurs": 0, "Doublons": lignes, "Secondes": 0.0})
+            continue
+        vus.add(cle)
+        lots.append(trains.assign(Fichier=nom))
+        erreurs.append(erreurs_fichier.assign(Fichier=nom)[["Fichier", "Ligne", "Erreur"]])
+        rapport.append({"Fichier": nom, "Lignes": lignes, "Valides": len(trains),
+                        "Erreurs": erreurs_fichier["Ligne"].nunique(), "Doublons": 0, "Secondes": round(duree, 3)})
+
+    if not lots:
+        return (pd.DataFrame(columns=COLONNES_TRAINS + ["Fichier"]), pd.DataFrame(columns=["Fichier", "Ligne", "Erreur"]),
+                pd.DataFrame(rapport, columns=["Fichier", "Lignes", "Valides", "Erreurs", "Doublons", "Secondes"]))
+    trains = pd.concat(lots, ignore_index=True)
+    doublons = trains.duplicated(COLONNES_TRAINS)
+    if doublons.any():
+        par_fichier = trains.loc[doublons, "Fichier"].value_counts()
+        for ligne in rapport:
+            if ligne["Fichier"] in par_fichier and not ligne["Doublons"]:
+                ligne["Doublons"] = int(par_fichier[ligne["Fichier"]])
+                ligne["Valides"] -= ligne["Doublons"]
+        trains = trains[~doublons].reset_index(drop=True)
+    return trains, pd.concat(erreurs, ignore_index=True), pd.DataFrame(rapport)
+
+
+def creer_trains(trains, premier_id):
+    """
+    FR: Crée les objets Train d'un lot normalisé, avec des identifiants consécutifs à partir de premier_id.
+    EN: Build the Train objects of a normalised batch, with consecutive ids starting at premier_id.
+    """
+    from Simulation import Train
+    resultat = []
+    for id_train, ligne in enumerate(trains[COLONNES_TRAINS].itertuples(index=False), start=premier_id):
+        train = Train(
+            id=id_train,
+            nom=ligne.nom,
+            wagons=int(ligne.wagons),
+            locomotives=int(ligne.locomotives),
+            arrivee=ligne.arrivee,
+            depart=ligne.depart,
+            depot=ligne.depot,
+            type=ligne.type
+        )
+        train.electrique = bool(ligne.electrique)
+        train.locomotive_cote = ligne.locomotive_cote
+        resultat.append(train)
+    return resultat
+
+
+def main(arguments=None):
+    """
+    FR: Import sans interface : lit les fichiers en parallèle, place le lot et sauvegarde la simulation (pickle).
+    EN: Headless import: read the files in parallel, place the batch and save the simulation (pickle).
+    """
+    import argparse
+    import pickle
+    from contextlib import redirect_stdout
+    from Simulation import Simulation
+
+    parser = argparse.ArgumentParser(description="Import de fichiers d'horaires / Timetable file import")
+    parser.add_argument("fichiers", nargs="+", help="CSV / Excel")
+    parser.add_argument("--simulation", help="FR: Simulation (pickle) à compléter / EN: Simulation (pickle) to extend")
+    parser.add_argument("--sortie", help="FR: Fichier de sortie (défaut : --simulation) / EN: Output file (default: --simulation)")
+    parser.add_argument("--processus", type=int, default=None, help="FR: Taille du pool / EN: Pool size")
+    args = parser.parse_args(arguments)
+
+    simulation = Simulation()
+    if args.simulation and os.path.exists(args.simulation):
+        with open(args.simulation, "rb") as f:
+            simulation = pickle.load(f)
+    fichiers = []
+    for chemin in args.fichiers:
+        with open(chemin, "rb") as f:
+            fichiers.append((os.path.basename(chemin), f.read()))
+
+    trains, erreurs, rapport = lire_fichiers_import(fichiers, simulation.depots, max_workers=args.processus)
+    premier_id = max((train.id for train in simulation.trains), default=-1) + 1
+    # FR: recalculer affiche un journal de débogage / EN: recalculer prints a debug log
+    with open(os.devnull, "w") as muet, redirect_stdout(muet):
+        resume = simulation.fusionner_trains(creer_trains(trains, premier_id))
+    print(rapport.to_string(index=False))
+    if not erreurs.empty:
+        print(erreurs.to_string(index=False))
+    print(f"Trains ajoutés / added: {resume['ajoutes']}, modifiés / updated: {resume['modifies']}, "
+          f"déjà présents / already present: {resume['doublons']}")
+
+    sortie = args.sortie or args.simulation
+    if sortie:
+        with open(sortie, "wb") as f:
+            pickle.dump(simulation, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ Created on Fri May  2 10:54:24 2025
 import streamlit as st
 from datetime import datetime
 from Simulation import Train
+from Importation import lire_fichiers_import, creer_trains
 import pandas as pd
 
 def afficher_formulaire_ajout(simulation, lang, t):
@@ -106,72 +107,44 @@ def afficher_formulaire_ajout(simulation, lang, t):
     # --- FR : Import de trains depuis un fichier CSV ou Excel ---
     # --- EN : Import trains from a CSV or Excel file ---
     st.markdown("### " + t("import_trains", lang))
-    uploaded_file = st.file_uploader(t("import_file", lang), type=["csv", "xlsx"], help=t("import_file_tooltip",lang))
-    if uploaded_file:
-        if uploaded_file.name.endswith(".csv"):
-            df_import = pd.read_csv(uploaded_file, sep=None, engine="python")
-        else:
-            df_import = pd.read_excel(uploaded_file)
+    uploaded_files = st.file_uploader(t("import_file", lang), type=["csv", "xlsx"], help=t("import_file_tooltip",lang), accept_multiple_files=True)
+    if uploaded_files:
+        # FR : Fichiers lus en parallèle et mis en cache selon le contenu (pas de relecture à chaque rerun),
+        #      colonnes résolues et converties une seule fois, lignes invalides écartées par masques.
+        # EN : Files read in parallel and cached by content (no re-parse on each rerun),
+        #      columns resolved and converted once, invalid rows dropped by masks.
+        trains_import, erreurs_import, rapport_import = lire_fichiers_import(
+            [(fichier.name, fichier.getvalue()) for fichier in uploaded_files], simulation.depots
+        )
         st.markdown("#### " + t("file_preview", lang))
-        st.dataframe(df_import.head(), use_container_width=True)
+        st.dataframe(rapport_import, use_container_width=True, hide_index=True)
+        st.dataframe(trains_import.head(), use_container_width=True)
         if "import_done" not in st.session_state:
             st.session_state.import_done = False
         if st.button(t("add_imported_trains", lang)):
-            # FR : Calculer l'ID max avant la boucle d'import.
-            # EN : Compute max ID before import loop.
+            # FR : Calculer l'ID max avant l'import.
+            # EN : Compute max ID before import.
             if simulation.trains:
                 next_id = max(train.id for train in simulation.trains) + 1
             else:
                 next_id = 0
-            for _, row in df_import.iterrows():
-                try:
-                    def get_col(*names):
-                        for name in names:
-                            if name in row:
-                                return row[name]
-                        return None
-
-                    # FR : Récupère et nettoie le côté de la locomotive si présent.
-                    # EN : Get and clean locomotive side if present.
-                    locomotive_cote = get_col("Côté sans locomotive", "Locomotive opposite side", "Lokomotivens side")
-                    if isinstance(locomotive_cote, str):
-                        locomotive_cote = locomotive_cote.strip().lower()
-                        if locomotive_cote not in ["left", "right"]:
-                            locomotive_cote = None
-
-                    train = Train(
-                        id=next_id,
-                        nom=get_col("Nom", "Train name", "Tog navn", "Train"),
-                        wagons=int(get_col("Nombre de wagons", "Number of wagons", "Antal vogne", "wagons") or 1),
-                        locomotives=int(get_col("Nombre de locomotives", "Number of locomotives", "Antal lokomotiver", "locomotives") or 1),
-                        arrivee=pd.to_datetime(get_col("Heure d'arrivée", "Arrival time", "Ankomsttid", "Arrival")),
-                        depart=pd.to_datetime(get_col("Heure de départ", "Departure time", "Afgangstid", "Departure")),
-                        depot=get_col("Dépôt", "Depot", "Depot") or "Glostrup",
-                        type=(get_col("Type de train", "Train type", "Togtype", "Type") or "storage").lower()
-                    )
-                    next_id += 1  # FR : Incrémente pour le prochain train / EN : Increment for next train
-
-                    # FR : Conversion robuste pour le booléen électrique.
-                    # EN : Robust conversion for electric boolean.
-                    val = get_col("Électrique", "Electric", "Elektrisk", False)
-                    if isinstance(val, str):
-                        val = val.strip().lower() in ["true", "1", "yes", "oui"]
-                    train.electrique = bool(val)
-
-                    # FR : Attribue le côté de la locomotive uniquement si 1 locomotive.
-                    # EN : Assign locomotive side only if 1 locomotive.
-                    if train.locomotives == 1:
-                        train.locomotive_cote = locomotive_cote
-                    else:
-                        train.locomotive_cote = None
-                    simulation.ajouter_train(train, train.depot)
-                except Exception as e:
-                    st.warning(f"{t('import_error_row', lang)} {row.to_dict()}: {e}")
+            # FR : Un seul placement pour tout le lot ; les trains déjà présents ne sont pas ajoutés à nouveau
+            # EN : A single placement for the whole batch; trains already present are not added again
+            st.session_state.import_summary = simulation.fusionner_trains(creer_trains(trains_import, next_id))
+            st.session_state.import_errors = erreurs_import
             st.session_state.import_done = True
             st.success(t("import_success", lang))
             st.rerun()
         elif st.session_state.import_done:
             st.info(t("import_success", lang))
+            resume = st.session_state.get("import_summary")
+            if resume:
+                st.caption(t("import_summary", lang, ajoutes=resume["ajoutes"], modifies=resume["modifies"], doublons=resume["doublons"]))
+        # FR : Rapport des lignes écartées (conservé après le rerun) / EN : Report of the dropped rows (kept across the rerun)
+        erreurs_import = st.session_state.get("import_errors")
+        if erreurs_import is not None and not erreurs_import.empty:
+            st.warning(f"{t('import_error_row', lang)} : {len(erreurs_import.drop_duplicates(['Fichier', 'Ligne']))}")
+            st.dataframe(erreurs_import, use_container_width=True, hide_index=True)
             
         st.markdown("#### " + t("import_example_title", lang))
         st.info(t("import_example_help", lang))
@@ -261,27 +234,12 @@ def afficher_modification_train(trains, simulation, t, lang):
                 new_departure = datetime.combine(new_departure_date, new_departure_time)
 
                 if new_departure > new_arrival:
-                    etat_avant = train.__dict__.copy()
-                    # FR : Retire le train avant modification pour éviter les conflits.
-                    # EN : Remove train before modification to avoid conflicts.
-                    simulation.trains.remove(train)
-                    train.arrivee = new_arrival
-                    train.depart = new_departure
-                    erreur = simulation.ajouter_train(train, train.depot, optimiser=True)
+                    # FR : Replace le train avec ses nouveaux horaires ; l'ancien état est restauré si conflit.
+                    # EN : Re-place the train with its new schedule; previous state is restored on conflict.
+                    erreur = simulation.modifier_train(train.id, new_arrival, new_departure)
                     if erreur:
-                        # FR : Restaure l'ancien état si conflit.
-                        # EN : Restore previous state if conflict.
-                        for k, v in etat_avant.items():
-                            setattr(train, k, v)
-                        simulation.trains.append(train)
-                        st.error("Modification impossible : conflit détecté.")
+                        st.error(erreur)
                     else:
-                        simulation.historique.append({
-                            "action": "modification",
-                            "train_id": train.id,
-                            "etat_avant": etat_avant,
-                            "etat_apres": train.__dict__.copy()
-                        })
                         st.success(t("train_schedule_updated", lang, name=train.nom))
                         st.rerun()
                 else:
@@ -298,27 +256,8 @@ def afficher_suppression_train(trains, simulation, t, lang):
         train_id = int(selected_option.split("(T")[1][:-1])  # FR : Extrait l'ID numérique du train / EN : Extract numeric train ID
         if st.button(t("remove", lang)):
             
-            # FR : Récupère l'état avant suppression pour l'historique.
-            # EN : Get state before deletion for history.
-            train_suppr = next((train for train in simulation.trains if train.id == train_id), None)
-            etat_avant = train_suppr.__dict__.copy() if train_suppr else None
-            
-            # FR : Supprime le train des occupations de voies.
-            # EN : Remove train from track occupations.
-            for occupation in [simulation.occupation_a, simulation.occupation_b]:
-                occupation[:] = [entry for entry in occupation if entry[3].id != train_id]
-
-            # FR : Supprime le train de la liste des trains.
-            # EN : Remove train from train list.
-            simulation.trains = [train for train in simulation.trains if train.id != train_id]
-            simulation.historique.append({
-                "action": "suppression",
-                "train_id": train_id,
-                "etat_avant": etat_avant,
-                "etat_apres": None
-            })
-            # FR : Recalcule la simulation après suppression.
-            # EN : Recalculate simulation after deletion.
-            simulation.recalculer()
+            # FR : Supprime le train de toutes les voies et de la liste, puis recalcule la simulation.
+            # EN : Remove the train from every track and from the list, then recalculate the simulation.
+            simulation.supprimer_train(train_id)
             st.success(t("train_removed", lang, name=selected_option))
             st.rerun()
\ No newline at end of file
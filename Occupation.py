@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+Occupation.py
+=============
+
+FR: Structures indexées pour interroger rapidement les occupations de voies.
+EN: Indexed structures to query track occupations quickly.
+FR: Chaque voie garde ses occupations triées par début et un tableau de temps occupé cumulé (sommes préfixes).
+EN: Each track keeps its occupations sorted by start and a cumulative busy-time array (prefix sums).
+
+Auteur : andre
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+class IndexVoie:
+    """
+    FR: Index des occupations d'une voie, mis à jour à chaque insertion ou suppression.
+    EN: Index of the occupations of one track, updated on every insert or delete.
+
+    FR: Les occupations d'une même voie ne se chevauchent pas (délai de sécurité), donc les fins sont
+        triées comme les débuts et le temps occupé sur une fenêtre se calcule en O(log n).
+        Une mise à jour à la position i coûte O(log n + n - i) (listes triées et sommes préfixes à décaler) :
+        O(log n) en fin de liste, O(n) au milieu.
+    EN: Occupations of a single track never overlap (safety margin), so ends are sorted like starts
+        and the busy time over a window is computed in O(log n).
+        An update at position i costs O(log n + n - i) (sorted lists and prefix sums to shift):
+        O(log n) at the end of the list, O(n) in the middle.
+
+    Attributs / Attributes :
+        debuts (list[datetime]) : FR: Débuts triés. / EN: Sorted starts.
+        fins (list[datetime]) : FR: Fins correspondantes. / EN: Matching ends.
+        cumul (list[float]) : FR: cumul[i] = durée totale (s) des i premières occupations. / EN: cumul[i] = total duration (s) of the first i occupations.
+    """
+
+    def __init__(self):
+        self.debuts = []
+        self.fins = []
+        self.cumul = [0.0]
+
+    def __len__(self):
+        return len(self.debuts)
+
+    def _recalculer_cumul(self, depuis):
+        """
+        FR: Met à jour les sommes préfixes à partir de l'indice donné.
+        EN: Update prefix sums from the given index.
+        """
+        del self.cumul[depuis + 1:]
+        total = self.cumul[depuis]
+        for debut, fin in zip(self.debuts[depuis:], self.fins[depuis:]):
+            total += (fin - debut).total_seconds()
+            self.cumul.append(total)
+
+    def inserer(self, debut, fin):
+        """
+        FR: Ajoute une occupation. Une occupation de durée nulle ou inversée (fin <= début) est ignorée.
+            Coût O(log n + n - i) pour une insertion à la position i : O(log n) en fin de liste
+            (cas courant, insertions chronologiques), O(n) au milieu.
+        EN: Add an occupation. A zero-length or inverted occupation (end <= start) is ignored.
+            Cost O(log n + n - i) for an insert at position i: O(log n) at the end of the list
+            (common case, chronological inserts), O(n) in the middle.
+        """
+        if fin <= debut:
+            return
+        i = bisect_right(self.debuts, debut)
+        self.debuts.insert(i, debut)
+        self.fins.insert(i, fin)
+        self._recalculer_cumul(i)
+
+    def retirer(self, debut, fin):
+        """
+        FR: Retire une occupation existante, en O(log n + n - i) pour la position i.
+        EN: Remove an existing occupation, in O(log n + n - i) for position i.
+
+        Returns:
+            bool: FR: True si l'occupation a été trouvée. / EN: True if the occupation was found.
+        """
+        i = bisect_left(self.debuts, debut)
+        while i < len(self.debuts) and self.debuts[i] == debut:
+            if self.fins[i] == fin:
+                del self.debuts[i]
+                del self.fins[i]
+                self._recalculer_cumul(i)
+                return True
+            i += 1
+        return False
+
+    def vider(self):
+        """
+        FR: Efface toutes les occupations de la voie.
+        EN: Clear every occupation of the track.
+        """
+        self.debuts.clear()
+        self.fins.clear()
+        self.cumul[:] = [0.0]
+
+    def temps_occupe(self, debut, fin):
+        """
+        FR: Temps occupé (en secondes) sur la fenêtre [debut, fin], en O(log n).
+        EN: Busy time (in seconds) over the window [debut, fin], in O(log n).
+        """
+        if fin <= debut:
+            return 0.0
+        # FR: Occupations i..j-1 : celles qui finissent après le début et commencent avant la fin
+        # EN: Occupations i..j-1: those ending after the start and starting before the end
+        i = bisect_right(self.fins, debut)
+        j = bisect_left(self.debuts, fin)
+        if j <= i:
+            return 0.0
+        total = self.cumul[j] - self.cumul[i]
+        # FR: Retire les parties qui débordent de la fenêtre / EN: Remove the parts outside the window
+        if self.debuts[i] < debut:
+            total -= (debut - self.debuts[i]).total_seconds()
+        if self.fins[j - 1] > fin:
+            total -= (self.fins[j - 1] - fin).total_seconds()
+        return total
+
+
+class IndexRessource:
+    """
+    FR: Index de l'utilisation d'un pool de ressources (conducteurs de test, locomotives) d'un dépôt.
+    EN: Index of the usage of a depot's resource pool (test drivers, locomotives).
+
+    FR: Les événements (+q au début, -q à la fin) sont triés, avec le niveau d'utilisation après chacun
+        (sommes préfixes, comme IndexVoie). Les fins passent avant les débuts à instant égal.
+    EN: Events (+q at start, -q at end) are kept sorted, with the usage level after each one
+        (prefix sums, like IndexVoie). Ends come before starts at equal times.
+
+    Attributs / Attributes :
+        capacite (int|None) : FR: Taille du pool (None = illimitée). / EN: Pool size (None = unlimited).
+        evenements (list[tuple]) : FR: (instant, delta) triés. / EN: Sorted (instant, delta).
+        instants (list[datetime]) : FR: Instants des événements. / EN: Event instants.
+        niveaux (list[int]) : FR: Utilisation après chaque événement. / EN: Usage after each event.
+    """
+
+    def __init__(self, capacite=None):
+        self.capacite = capacite
+        self.evenements = []
+        self.instants = []
+        self.niveaux = []
+
+    def _recalculer_niveaux(self, depuis):
+        del self.niveaux[depuis:]
+        niveau = self.niveaux[-1] if self.niveaux else 0
+        for _, delta in self.evenements[depuis:]:
+            niveau += delta
+            self.niveaux.append(niveau)
+
+    def _inserer_evenement(self, instant, delta):
+        i = bisect_right(self.evenements, (instant, delta))
+        self.evenements.insert(i, (instant, delta))
+        self.instants.insert(i, instant)
+        return i
+
+    def _retirer_evenement(self, instant, delta):
+        i = bisect_left(self.evenements, (instant, delta))
+        if i < len(self.evenements) and self.evenements[i] == (instant, delta):
+            del self.evenements[i]
+            del self.instants[i]
+            return i
+        return None
+
+    def inserer(self, debut, fin, quantite):
+        """
+        FR: Enregistre l'utilisation de `quantite` unités sur [debut, fin).
+        EN: Record the use of `quantite` units over [debut, fin).
+        """
+        if fin <= debut or quantite <= 0:
+            return
+        i = self._inserer_evenement(debut, quantite)
+        self._inserer_evenement(fin, -quantite)
+        self._recalculer_niveaux(i)
+
+    def retirer(self, debut, fin, quantite):
+        """
+        FR: Retire une utilisation enregistrée.
+        EN: Remove a recorded usage.
+        """
+        if fin <= debut or quantite <= 0:
+            return
+        positions = [self._retirer_evenement(fin, -quantite), self._retirer_evenement(debut, quantite)]
+        positions = [i for i in positions if i is not None]
+        if positions:
+            self._recalculer_niveaux(min(positions))
+
+    def vider(self):
+        """
+        FR: Efface toutes les utilisations.
+        EN: Clear every usage.
+        """
+        self.evenements.clear()
+        self.instants.clear()
+        self.niveaux.clear()
+
+    def pic(self, debut, fin):
+        """
+        FR: Utilisation maximale sur [debut, fin), en O(log n + k) où k est le nombre d'événements de la fenêtre.
+        EN: Peak usage over [debut, fin), in O(log n + k) where k is the number of events in the window.
+        """
+        i = bisect_right(self.instants, debut)
+        j = bisect_left(self.instants, fin)
+        niveau = self.niveaux[i - 1] if i > 0 else 0
+        return max([niveau] + self.niveaux[i:j])
+
+    def premier_debut_possible(self, debut, fin, quantite):
+        """
+        FR: Premier instant s >= debut tel que `quantite` unités restent libres sur tout [s, fin),
+            en O(log n + k).
+        EN: Earliest instant s >= debut such that `quantite` units stay free over the whole [s, fin),
+            in O(log n + k).
+
+        Returns:
+            datetime|None: FR: Instant trouvé, ou None si impossible avant `fin`. / EN: Instant found, or None if impossible before `fin`.
+        """
+        if self.capacite is None or fin <= debut:
+            return debut
+        if quantite > self.capacite:
+            return None
+        i = bisect_right(self.instants, debut)
+        j = bisect_left(self.instants, fin)
+        limite = self.capacite - quantite
+        # FR: Dernier niveau saturé de la fenêtre : on repart à l'événement suivant
+        # EN: Last saturated level in the window: restart at the following event
+        for k in range(j - 1, i - 2, -1):
+            niveau = self.niveaux[k] if k >= 0 else 0
+            if niveau > limite:
+                if k + 1 >= j:
+                    return None
+                return self.instants[k + 1]
+        return debut
+
+
+class IndexIntervalles:
+    """
+    FR: Arbre d'intervalles centré (statique) : « quels éléments sont présents à l'instant T » ou
+        « chevauchent la fenêtre [a, b] » en O(log n + k). Construit en O(n log n) à partir des listes
+        triées des débuts et des fins ; à reconstruire quand les données changent (voir Simulation.index_presence).
+    EN: Static centred interval tree: "which items are present at time T" or "overlap the window [a, b]"
+        in O(log n + k). Built in O(n log n) from the sorted start and end lists;
+        rebuild when the data changes (see Simulation.index_presence).
+
+    Attributs / Attributes :
+        elements (list) : FR: Éléments indexés, dans l'ordre fourni. / EN: Indexed items, in the given order.
+        instants (list) : FR: Débuts et fins distincts, triés. / EN: Distinct starts and ends, sorted.
+    """
+
+    def __init__(self, intervalles):
+        """
+        Args:
+            intervalles (iterable): FR: Triplets (debut, fin, element), bornes incluses. Un intervalle inversé
+                                    (fin < debut) n'est jamais présent et n'est pas indexé.
+                                EN: (debut, fin, element) triples, bounds included. An inverted interval
+                                    (fin < debut) is never present and is not indexed.
+        """
+        self.elements = []
+        debuts, fins = [], []
+        for debut, fin, element in intervalles:
+            if fin < debut:
+                continue
+            debuts.append(debut)
+            fins.append(fin)
+            self.elements.append(element)
+        self.debuts, self.fins = debuts, fins
+        self.instants = sorted(set(debuts) | set(fins))
+        self._racine = self._construire(sorted(range(len(debuts)), key=debuts.__getitem__))
+
+    def __len__(self):
+        return len(self.elements)
+
+    def _construire(self, positions):
+        """
+        FR: Nœud = (centre, positions triées par début, positions triées par fin décroissante, gauche, droite).
+            Le centre est la médiane des débuts ; `positions` arrive trié par début.
+        EN: Node = (centre, positions sorted by start, positions sorted by decreasing end, left, right).
+            The centre is the median start; `positions` comes sorted by start.
+        """
+        if not positions:
+            return None
+        centre = self.debuts[positions[len(positions) // 2]]
+        gauche, ici, droite = [], [], []
+        for i in positions:
+            if self.fins[i] < centre:
+                gauche.append(i)
+            elif self.debuts[i] > centre:
+                droite.append(i)
+            else:
+                ici.append(i)
+        par_fin = sorted(ici, key=self.fins.__getitem__, reverse=True)
+        return (centre, ici, par_fin, self._construire(gauche), self._construire(droite))
+
+    def chevauchant(self, debut, fin):
+        """
+        FR: Éléments dont l'intervalle coupe [debut, fin] (bornes incluses), dans l'ordre d'origine.
+        EN: Items whose interval meets [debut, fin] (bounds included), in the original order.
+        """
+        trouves = []
+        pile = [self._racine]
+        while pile:
+            noeud = pile.pop()
+            if noeud is None:
+                continue
+            centre, par_debut, par_fin, gauche, droite = noeud
+            if fin < centre:
+                # FR: Les intervalles du nœud finissent après le centre : seul le début compte
+                # EN: Node intervals end after the centre: only the start matters
+                for i in par_debut:
+                    if self.debuts[i] > fin:
+                        break
+                    trouves.append(i)
+                pile.append(gauche)
+            elif debut > centre:
+                for i in par_fin:
+                    if self.fins[i] < debut:
+                        break
+                    trouves.append(i)
+                pile.append(droite)
+            else:
+                trouves.extend(par_debut)
+                pile.append(gauche)
+                pile.append(droite)
+        trouves.sort()
+        return [self.elements[i] for i in trouves]
+
+    def presents(self, instant):
+        """
+        FR: Éléments présents à l'instant donné (debut <= instant <= fin).
+        EN: Items present at the given instant (debut <= instant <= fin).
+        """
+        return self.chevauchant(instant, instant)
@@ -33,6 +33,9 @@ Date de création : 02/05/2025
 import streamlit as st
 from datetime import datetime, timedelta
 from Simulation import Simulation
+from Affectation import calculer_roster, LOCALITES
+from Export import gantt_pdf_vectoriel, plotly_multi_fig_to_pdf, exporter_csv, exporter_excel, exporter_json
+from Surveillance import SurveillanceDossier
 from Traduction import t, get_translation
 from streamlit_option_menu import option_menu
 from Interface import (
@@ -46,58 +49,32 @@ from Stats import (
     calculer_taux_occupation, 
     calculer_statistiques_globales, 
     calculer_requirements, 
-    regrouper_requirements_par_jour
+    regrouper_requirements_par_jour,
+    profil_occupation,
+    interroger_profil,
+    periodes_saturation,
+    calculer_taux_par_periode,
+    calculer_percentiles_attente,
+    calculer_histogramme_attente,
+    calculer_matrice_utilisation,
+    calculer_pics_requirements
 )
 from Plots import (
     creer_graphique_occupation_depot,
     creer_graphique_requirements_par_jour,
     creer_graphique_trains_par_longueur_detaille,
-    creer_gantt_occupation_depot
+    creer_gantt_occupation_depot,
+    creer_graphique_profil_occupation,
+    creer_graphique_pics_utilisation,
+    creer_graphique_taux_par_periode,
+    creer_histogramme_attente,
+    creer_heatmap_utilisation,
+    CacheFigures,
+    cle_figure
 )
 import pandas as pd
 import io
-import re
-from PIL import Image
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
-
-def plotly_multi_fig_to_pdf(figs, legends_html):
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    y_offset = height - 40
-
-    for fig, legend_html in zip(figs, legends_html):
-        img_bytes = fig.to_image(format="png", width=1200, height=600, scale=2)
-        img = Image.open(io.BytesIO(img_bytes))
-        aspect = img.width / img.height
-        img_width = width - 40
-        img_height = img_width / aspect
-        if img_height > (height - 120) / 2:
-            img_height = (height - 120) / 2
-            img_width = img_height * aspect
-        img = img.resize((int(img_width), int(img_height)))
-        img_io = io.BytesIO()
-        img.save(img_io, format="PNG")
-        img_io.seek(0)
-        c.drawImage(ImageReader(img_io), 20, y_offset - img_height, width=img_width, height=img_height)
-        # Ajoute la légende si fournie
-        from reportlab.lib.utils import simpleSplit
-        legend_text = re.sub('<[^<]+?>', '', legend_html)
-        legend_lines = simpleSplit(legend_text, "Helvetica", 12, width-40)
-        y = y_offset - img_height - 20
-        for line in legend_lines:
-            c.drawString(30, y, line)
-            y -= 15
-        y_offset = y - 40
-        if y_offset < 100:
-            c.showPage()
-            y_offset = height - 40
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-    return buffer
+import os
 
 #----------------------------------------------------
 # FR : CONFIGURATION DE LA PAGE ET INITIALISATION DE LA SIMULATION
@@ -334,6 +311,10 @@ st.markdown(
 if 'simulation' not in st.session_state:
     st.session_state.simulation = Simulation()
     st.session_state.base_time = datetime.combine(datetime.now().date(), datetime.min.time())
+# FR : Cache LRU des figures (dépôt, graphique, langue, empreinte de l'état)
+# EN : LRU figure cache (depot, chart, language, state fingerprint)
+if 'cache_figures' not in st.session_state:
+    st.session_state.cache_figures = CacheFigures()
 
 # ---------------------------------------------------------------------------
 # FR : GESTION DE LA LANGUE
@@ -392,6 +373,78 @@ delai_securite = st.sidebar.slider(
 )
 st.session_state.simulation.delai_securite = delai_securite
 
+# FR : Pools de conducteurs de test et de locomotives par dépôt (0 = illimité)
+# EN : Test driver and locomotive pools per depot (0 = unlimited)
+def _appliquer_pools(depot_nom):
+    """
+    FR : Callback des saisies de pools : seule une modification par l'utilisateur change la simulation.
+    EN : Pool input callback: only a change made by the user updates the simulation.
+    """
+    st.session_state.simulation.definir_ressources(depot_nom, {
+        "test_drivers": st.session_state[f"pool_td_{depot_nom}"] or None,
+        "locomotives": st.session_state[f"pool_loc_{depot_nom}"] or None,
+    })
+
+with st.sidebar.expander(t("resource_pools", lang)):
+    st.caption(t("resource_pools_tooltip", lang))
+    for depot_nom, depot_data in st.session_state.simulation.depots.items():
+        ressources = depot_data["ressources"]
+        # FR : Les saisies reflètent toujours la simulation courante (chargée, réinitialisée ou remplacée)
+        # EN : Inputs always reflect the current simulation (loaded, reset or replaced)
+        st.session_state[f"pool_td_{depot_nom}"] = ressources["test_drivers"].capacite or 0
+        st.session_state[f"pool_loc_{depot_nom}"] = ressources["locomotives"].capacite or 0
+        col_td, col_loc = st.columns(2)
+        col_td.number_input(
+            f"{depot_nom} - {t('test_drivers', lang)}", min_value=0, step=1,
+            key=f"pool_td_{depot_nom}", on_change=_appliquer_pools, args=(depot_nom,)
+        )
+        col_loc.number_input(
+            f"{depot_nom} - {t('locomotives', lang)}", min_value=0, step=1,
+            key=f"pool_loc_{depot_nom}", on_change=_appliquer_pools, args=(depot_nom,)
+        )
+
+# FR : Dossier surveillé : un thread lit les fichiers déposés, les lots sont placés ici (fil principal)
+# EN : Watched folder: a thread reads dropped files, batches are placed here (main thread)
+with st.sidebar.expander(t("watch_folder", lang)):
+    dossier_surveille = st.text_input(t("watch_folder_path", lang), help=t("watch_folder_tooltip", lang), key="dossier_surveille")
+    surveillance = st.session_state.get("surveillance")
+    if st.toggle(t("watch_folder_active", lang), key="surveillance_active", disabled=not os.path.isdir(dossier_surveille)):
+        if surveillance is None or surveillance.dossier != dossier_surveille:
+            if surveillance is not None:
+                surveillance.arreter()
+            surveillance = st.session_state.surveillance = SurveillanceDossier(dossier_surveille, st.session_state.simulation.depots)
+        surveillance.demarrer()
+    elif surveillance is not None:
+        surveillance.arreter()
+
+    @st.fragment(run_every=5)
+    def _ingerer_depots():
+        """
+        FR : Vide la file toutes les 5 s sans rerun complet ; rerun de l'application seulement si des trains arrivent.
+        EN : Drain the queue every 5 s without a full rerun; rerun the app only when trains arrive.
+        """
+        surveillance = st.session_state.get("surveillance")
+        if surveillance is None:
+            return
+        lots, resume, erreurs = surveillance.vider(st.session_state.simulation)
+        if lots:
+            st.session_state.surveillance_resume = resume or {"ajoutes": 0, "modifies": 0, "doublons": 0}
+            # FR : Lignes écartées des derniers lots, conservées après le rerun / EN : Dropped rows of the last batches, kept across the rerun
+            st.session_state.surveillance_erreurs = erreurs
+        resume = st.session_state.get("surveillance_resume")
+        if resume:
+            st.caption(t("import_summary", lang, ajoutes=resume["ajoutes"], modifies=resume["modifies"], doublons=resume["doublons"]))
+        erreurs = st.session_state.get("surveillance_erreurs")
+        if erreurs is not None and not erreurs.empty:
+            st.warning(f"{t('import_error_row', lang)} : {len(erreurs.drop_duplicates(['Fichier', 'Ligne']))}")
+            st.dataframe(erreurs, use_container_width=True, hide_index=True)
+        for fichier, message in list(surveillance.erreurs)[-3:]:
+            st.caption(f"⚠️ {fichier} : {message}")
+        if resume and lots and (resume["ajoutes"] or resume["modifies"]):
+            st.rerun(scope="app")
+
+    _ingerer_depots()
+
 # FR : Bouton pour réinitialiser la simulation
 # EN : Button to reset the simulation
 if st.sidebar.button(t("reset", lang)):
@@ -424,18 +477,11 @@ if uploaded_sim:
             simulation_importee = pickle.load(uploaded_sim)
             st.session_state.simulation = simulation_importee
             st.success(t("import_success_sim", lang))
-            st.experimental_set_query_params(imported="1")
+            st.query_params["imported"] = "1"
             st.rerun()
         except Exception as e:
             st.error(t("import_error_sim", lang, e=e))
 
-# ---------------------------------------------------------------------------
-# FR : CALCUL DES STATISTIQUES GLOBALES
-# EN : GLOBAL STATISTICS CALCULATION
-# ---------------------------------------------------------------------------
-
-stats = calculer_statistiques_globales(st.session_state.simulation)
-
 # ---------------------------------------------------------------------------
 # FR : ORGANISATION EN ONGLETS PRINCIPAUX
 # EN : MAIN TABS ORGANIZATION
@@ -502,63 +548,49 @@ elif selected_tab == "📋 " + t("train_list", lang):
 # ---------------------------------------------------------------------------
 elif selected_tab == "📊 " + t("graph_title", lang):
     depot_names = list(st.session_state.simulation.depots.keys())
-    sous_tabs = [t("graph_title", lang), "Export", t("train_length_by_track", lang), "Gantt"]
+    sous_tabs = [t("graph_title", lang), "Export", t("train_length_by_track", lang), "Gantt", t("utilisation_heatmap", lang)]
     sous_tabs_objs = st.tabs(sous_tabs)
-    sous_tab_occ, sous_tab_export, sous_tab_instant, sous_tab_gantt = sous_tabs_objs
+    sous_tab_occ, sous_tab_export, sous_tab_instant, sous_tab_gantt, sous_tab_heatmap = sous_tabs_objs
     
     # FR : Visualisation occupation des voies pour chaque dépôt
     # EN : Occupation visualization for each depot
+    simulation = st.session_state.simulation
+    cache_figures = st.session_state.cache_figures
     with sous_tab_occ:
         for depot in depot_names:
             st.subheader(depot)
-            fig = creer_graphique_occupation_depot(
-                st.session_state.simulation, depot, st.session_state.base_time, t, lang
+            fig = cache_figures.obtenir(
+                cle_figure(simulation, depot, "occupation", lang, st.session_state.base_time),
+                lambda: creer_graphique_occupation_depot(simulation, depot, st.session_state.base_time, t, lang)
             )
             st.plotly_chart(fig, use_container_width=True)
             st.divider() 
         
     # FR : Export des occupations (CSV, Excel, JSON)
     # EN : Export occupation data (CSV, Excel, JSON)
+    # FR : Les fichiers ne sont produits qu'au clic (données différées), pour tous les dépôts
+    # EN : Files are only produced on click (deferred data), for every depot
     with sous_tab_export:
-        def occupation_to_df(simulation):
-            data = []
-            for depot, occupation, numeros_voies in [
-                ("Glostrup", simulation.occupation_a, simulation.numeros_voies_a),
-                ("Naestved", simulation.occupation_b, simulation.numeros_voies_b),
-            ]:
-                for voie_idx, debut, fin, train in occupation:
-                    data.append({
-                        "Depot": depot,
-                        "Track": numeros_voies[voie_idx],
-                        "Train": train.nom,
-                        "Type": train.type,
-                        "Arrival": debut.strftime("%Y-%m-%d %H:%M"),
-                        "Departure": fin.strftime("%Y-%m-%d %H:%M"),
-                        "Electric": train.electrique,
-                    })
-            return pd.DataFrame(data)
-        
-        df_occ = occupation_to_df(st.session_state.simulation)
-        csv = df_occ.to_csv(index=False, sep=";").encode('utf-8')
         st.download_button(
             label="📥 Télécharger l'occupation des voies (CSV)",
-            data=csv,
+            data=lambda: exporter_csv(simulation),
             file_name="occupation_voies.csv",
-            mime="text/csv"
+            mime="text/csv",
+            on_click="ignore"
         )
-        output = io.BytesIO()
-        df_occ.to_excel(output, index=False)
         st.download_button(
             label="📥 Télécharger l'occupation des voies (Excel)",
-            data=output.getvalue(),
+            data=lambda: exporter_excel(simulation),
             file_name="occupation_voies.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click="ignore"
         )
         st.download_button(
             label="📥 Télécharger l'occupation des voies (JSON)",
-            data=df_occ.to_json(orient="records"),
+            data=lambda: exporter_json(simulation),
             file_name="occupation_voies.json",
-            mime="application/json"
+            mime="application/json",
+            on_click="ignore"
         )
     
     # FR : Visualisation instantanée de la composition des trains
@@ -573,16 +605,18 @@ elif selected_tab == "📊 " + t("graph_title", lang):
         # Ajout du selectbox pour choisir le dépôt à afficher
         depot_select = st.selectbox("Dépôt à afficher", depot_names, key="depot_select_longueur")
         st.subheader(depot_select)
-        fig_trains_instant = creer_graphique_trains_par_longueur_detaille(
-            st.session_state.simulation, t, instant, lang, depot=depot_select
+        fig_trains_instant = cache_figures.obtenir(
+            cle_figure(simulation, depot_select, "longueur_detaille", lang, instant),
+            lambda: creer_graphique_trains_par_longueur_detaille(simulation, t, instant, lang, depot=depot_select)
         )
         st.plotly_chart(fig_trains_instant, use_container_width=True) 
 
     with sous_tab_gantt:
         depot_gantt = st.selectbox("Dépôt à afficher", depot_names, key="depot_select_gantt")
         st.markdown(f"### {t('Planning', lang)} - {depot_gantt}")
-        fig_gantt = creer_gantt_occupation_depot(
-            st.session_state.simulation, depot_gantt, t, lang
+        fig_gantt = cache_figures.obtenir(
+            cle_figure(simulation, depot_gantt, "gantt", lang),
+            lambda: creer_gantt_occupation_depot(simulation, depot_gantt, t, lang)
         )
         st.plotly_chart(fig_gantt, use_container_width=True)
         # Export Gantt
@@ -606,6 +640,25 @@ elif selected_tab == "📊 " + t("graph_title", lang):
             file_name=f"planning_gantt_{depot_gantt.lower()}.csv",
             mime="text/csv"
         )
+
+
+    # FR : Heatmap dépôt × heure/jour (agrégation NumPy, mise en cache selon l'état de la simulation)
+    # EN : Depot × hour/day heatmap (NumPy aggregation, cached against the simulation state)
+    with sous_tab_heatmap:
+        pas_heatmap = st.radio(
+            t("rate_period", lang), ["hour", "day"],
+            format_func=lambda x: t(x, lang), horizontal=True, key="pas_heatmap"
+        )
+        depots_heatmap, bornes_heatmap, matrice_heatmap = calculer_matrice_utilisation(
+            st.session_state.simulation, pas_heatmap
+        )
+        st.plotly_chart(
+            cache_figures.obtenir(
+                cle_figure(simulation, None, "heatmap", lang, pas_heatmap),
+                lambda: creer_heatmap_utilisation(depots_heatmap, bornes_heatmap, matrice_heatmap, t, lang)
+            ),
+            use_container_width=True
+        )
             
     legend_items = [
         (t("testing", lang), "red"),
@@ -629,15 +682,34 @@ elif selected_tab == "📊 " + t("graph_title", lang):
             
     if 'pdf_gantt_both' not in st.session_state:
         st.session_state.pdf_gantt_both = None
-        
-    figs_gantt = []
-    legends_html = []
-    for depot in depot_names:
-        fig = creer_gantt_occupation_depot(st.session_state.simulation, depot, t, lang)
-        figs_gantt.append(fig)
-        legends_html.append(make_legend_html(legend_items))
+
+    # FR : Moteur PDF : vectoriel (reportlab, sans Kaleido) ou images des figures Plotly
+    # EN : PDF engine: vector (reportlab, no Kaleido) or images of the Plotly figures
+    col_moteur, col_fenetre = st.columns(2)
+    with col_moteur:
+        moteur_pdf = st.radio(
+            t("pdf_engine", lang), ["vectoriel", "image"],
+            format_func=lambda x: t(f"pdf_engine_{x}", lang), horizontal=True, key="moteur_pdf"
+        )
+    with col_fenetre:
+        jours_par_page = st.number_input(
+            t("pdf_days_per_page", lang), min_value=1, max_value=31, value=7, step=1,
+            disabled=moteur_pdf != "vectoriel", key="jours_par_page_pdf"
+        )
         
     def generate_pdf():
+        if moteur_pdf == "vectoriel":
+            return gantt_pdf_vectoriel(simulation, t, lang, depot_names, fenetre=timedelta(days=jours_par_page))
+        # FR : Les figures du PDF ne sont construites (ou lues dans le cache) qu'au clic
+        # EN : PDF figures are only built (or read from the cache) on click
+        figs_gantt = [
+            cache_figures.obtenir(
+                cle_figure(simulation, depot, "gantt", lang),
+                lambda depot=depot: creer_gantt_occupation_depot(simulation, depot, t, lang)
+            )
+            for depot in depot_names
+        ]
+        legends_html = [make_legend_html(legend_items) for _ in depot_names]
         try:
             return plotly_multi_fig_to_pdf(figs_gantt, legends_html)
         except Exception as e:
@@ -667,6 +739,9 @@ elif selected_tab == "📊 " + t("graph_title", lang):
 
 elif selected_tab == "📈 " + t("Statistiques", lang):
     st.subheader(t("Statistiques globales", lang))
+    # FR : Lecture des agrégats tenus à jour par la simulation (uniquement dans cet onglet)
+    # EN : Read the aggregates kept up to date by the simulation (only in this tab)
+    stats = calculer_statistiques_globales(st.session_state.simulation)
 
     # FR : Affichage sous forme de colonnes de métriques
     # EN : Display as metric columns
@@ -676,6 +751,7 @@ elif selected_tab == "📈 " + t("Statistiques", lang):
         st.metric(label=t("electric_train", lang), value=stats['trains_electriques'])
     with col2:
         st.metric(label=t("average_wait", lang), value=f"{stats['temps_moyen_attente']} min")
+        st.metric(label=t("resource_wait", lang), value=f"{stats['temps_moyen_attente_ressources']} min")
         st.metric(label=t("occupancy_rate", lang), value=f"{stats['taux_occupation_global']}%")
     with col3:
         for depot, depot_stats in stats['stats_par_depot'].items():
@@ -700,9 +776,10 @@ elif selected_tab == "📈 " + t("Statistiques", lang):
     st.divider()
     # Bar chart by train type
     type_counts = {}
-    for train in st.session_state.simulation.trains:
-        type_label = t(train.type, lang)
-        type_counts[type_label] = type_counts.get(type_label, 0) + 1
+    for type_train, nombre in stats["trains_par_type"].items():
+        if nombre:
+            type_label = t(type_train, lang)
+            type_counts[type_label] = type_counts.get(type_label, 0) + nombre
     if type_counts:
         fig_type = px.bar(
             x=list(type_counts.keys()),
@@ -740,6 +817,83 @@ elif selected_tab == "📈 " + t("Statistiques", lang):
                 ),
             )
         st.plotly_chart(fig_type, use_container_width=True)   
+    st.divider()
+    # FR : Quantiles et distribution des temps d'attente (esquisses KLL)
+    # EN : Waiting-time quantiles and distribution (KLL sketches)
+    st.subheader(t("waiting_distribution", lang))
+    percentiles = calculer_percentiles_attente(st.session_state.simulation)
+    lignes_percentiles = [{"": t("all", lang), **percentiles["global"]}]
+    lignes_percentiles += [{"": depot, **resume} for depot, resume in percentiles["par_depot"].items()]
+    lignes_percentiles += [{"": t(type_train, lang), **resume} for type_train, resume in percentiles["par_type"].items()]
+    st.dataframe(pd.DataFrame(lignes_percentiles), use_container_width=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        depot_attente = st.selectbox(
+            t("select_depot", lang), [None] + list(st.session_state.simulation.depots.keys()),
+            format_func=lambda x: t("all", lang) if x is None else x, key="depot_attente"
+        )
+    with col2:
+        type_attente = st.selectbox(
+            t("train_type", lang), [None] + list(percentiles["par_type"].keys()),
+            format_func=lambda x: t("all", lang) if x is None else t(x, lang), key="type_attente"
+        )
+    bornes, comptes = calculer_histogramme_attente(st.session_state.simulation, depot_attente, type_attente)
+    st.plotly_chart(creer_histogramme_attente(bornes, comptes, t, lang), use_container_width=True)
+    st.divider()
+    # FR : Profil d'occupation (balayage) sur une fenêtre choisie
+    # EN : Occupancy profile (sweep line) over a chosen window
+    st.subheader(t("occupancy_profile", lang))
+    simulation = st.session_state.simulation
+    if simulation.trains:
+        fenetre_min = min(train.arrivee for train in simulation.trains)
+        fenetre_max = max(train.depart for train in simulation.trains)
+    else:
+        fenetre_min = st.session_state.base_time
+        fenetre_max = fenetre_min + timedelta(days=1)
+    col1, col2 = st.columns(2)
+    with col1:
+        fenetre_debut = st.date_input(t("window_start", lang), fenetre_min.date(), key="fenetre_debut")
+    with col2:
+        fenetre_fin = st.date_input(t("window_end", lang), fenetre_max.date(), key="fenetre_fin")
+    fenetre_debut = datetime.combine(fenetre_debut, datetime.min.time())
+    fenetre_fin = datetime.combine(fenetre_fin, datetime.min.time()) + timedelta(days=1)
+
+    pics = []
+    profils = {}
+    for depot, depot_data in simulation.depots.items():
+        nb_voies = len(depot_data["numeros_voies"])
+        profil = profil_occupation(simulation, depot)
+        resume = interroger_profil(profil, fenetre_debut, fenetre_fin)
+        saturations = periodes_saturation(profil, nb_voies, fenetre_debut, fenetre_fin)
+        heures_saturees = sum((fin - debut).total_seconds() for debut, fin in saturations) / 3600
+        pics.append({
+            "Depot": depot,
+            "Pic": round(100 * resume["pic_voies"] / nb_voies, 1) if nb_voies else 0,
+            "Saturation": round(heures_saturees, 1),
+        })
+        profils[depot] = (profil, nb_voies, saturations)
+    st.plotly_chart(creer_graphique_pics_utilisation(pics, t, lang), use_container_width=True)
+
+    # FR : Taux d'occupation par jour, semaine ou poste (requêtes sur sommes préfixes)
+    # EN : Occupancy rate per day, week or shift (prefix-sum queries)
+    periode = st.radio(
+        t("rate_period", lang), ["day", "week", "shift"],
+        format_func=lambda x: t(x, lang), horizontal=True, key="periode_taux"
+    )
+    taux_periodes = calculer_taux_par_periode(simulation, fenetre_debut, fenetre_fin, periode)
+    st.plotly_chart(creer_graphique_taux_par_periode(taux_periodes, t, lang), use_container_width=True)
+
+    depot_profil = st.selectbox(t("select_depot", lang), list(profils.keys()), key="depot_select_profil")
+    profil, nb_voies, saturations = profils[depot_profil]
+    fig_profil = creer_graphique_profil_occupation(profil, nb_voies, depot_profil, saturations, t, lang)
+    fig_profil.update_xaxes(range=[fenetre_debut, fenetre_fin])
+    st.plotly_chart(fig_profil, use_container_width=True)
+    if saturations:
+        st.markdown("#### " + t("saturation_periods", lang))
+        st.dataframe(pd.DataFrame([
+            {t("from", lang): debut.strftime("%Y-%m-%d %H:%M"), t("to", lang): fin.strftime("%Y-%m-%d %H:%M")}
+            for debut, fin in saturations
+        ]), use_container_width=True)
 # ---------------------------------------------------------------------------
 # FR : ONGLET 5 : REQUIREMENTS (BESOINS EN RESSOURCES)
 # EN : TAB 5: REQUIREMENTS (RESOURCE NEEDS)
@@ -749,19 +903,34 @@ elif selected_tab == "🛠️ " + t("requirements", lang):
     st.subheader(t("requirements", lang))
     requirements = calculer_requirements(st.session_state.simulation.trains, t, lang)
     requirements_par_jour = regrouper_requirements_par_jour(st.session_state.simulation.trains, t, lang)
+    periode_requirements = st.radio(
+        t("rate_period", lang), ["day", "shift"],
+        format_func=lambda x: t(x, lang), horizontal=True, key="periode_requirements"
+    )
+    # FR : Demande simultanée maximale (balayage), et non la somme des trains
+    # EN : Peak concurrent demand (sweep line), not the sum of trains
+    pics = calculer_pics_requirements(st.session_state.simulation.trains, periode_requirements)
 
     # FR : Affichage global des besoins
     # EN : Global requirements display
     col1, col2 = st.columns(2)
     with col1:
-        st.metric(label=t("test_drivers", lang), value=requirements["test_drivers"])
+        st.metric(
+            label=t("peak_requirements", lang) + " – " + t("test_drivers", lang),
+            value=pics["pic"]["test_drivers"],
+            help=f"{t('total', lang)} : {requirements['test_drivers']}"
+        )
     with col2:
-        st.metric(label=t("locomotives", lang), value=requirements["locomotives"])
+        st.metric(
+            label=t("peak_requirements", lang) + " – " + t("locomotives", lang),
+            value=pics["pic"]["locomotives"],
+            help=f"{t('total', lang)} : {requirements['locomotives']}"
+        )
     st.divider()
-    # Affichage des besoins par dépôt
-    if "by_depot" in requirements and requirements["by_depot"]:
+    # Affichage des besoins simultanés par dépôt
+    if pics["par_depot"]:
         st.markdown("###  " + t("Besoins par dépôt", lang))
-        for depot, besoins in requirements["by_depot"].items():
+        for depot, besoins in pics["par_depot"].items():
             st.write(f"**{depot}** : {besoins['test_drivers']} {t('test_drivers', lang)}, {besoins['locomotives']} {t('locomotives', lang)}")
     # FR : Détail par type de train
     # EN : Details by train type
@@ -786,15 +955,59 @@ elif selected_tab == "🛠️ " + t("requirements", lang):
     else:
         st.info(t("no_requirements", lang))
     st.divider()
+    # FR : Roster nominatif des conducteurs et locomotives (partitionnement d'intervalles)
+    # EN : Named driver and locomotive roster (interval partitioning)
+    if details:
+        st.markdown("### " + t("roster", lang))
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            battement = st.number_input(t("turnaround_minutes", lang), min_value=0, value=30, step=5, key="battement_roster")
+        with col2:
+            localite = st.radio(
+                t("loco_locality", lang), LOCALITES,
+                format_func=lambda x: t(f"locality_{x}", lang), key="localite_roster"
+            )
+        with col3:
+            transfert = st.number_input(
+                t("transfer_minutes", lang), min_value=0, value=60, step=15,
+                disabled=localite != "transfert", key="transfert_roster"
+            )
+        roster = calculer_roster(
+            st.session_state.simulation.trains,
+            battement=timedelta(minutes=battement),
+            localite=localite,
+            temps_transfert=timedelta(minutes=transfert),
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric(label=t("fleet_size", lang) + " – " + t("test_drivers", lang), value=roster["flotte"]["test_drivers"])
+        with col2:
+            st.metric(label=t("fleet_size", lang) + " – " + t("locomotives", lang), value=roster["flotte"]["locomotives"])
+        df_roster = pd.DataFrame(roster["roster"])
+        df_roster["Type"] = df_roster["Type"].map(lambda x: t(x, lang))
+        st.dataframe(df_roster, use_container_width=True)
+        st.download_button(
+            label="📥 " + t("roster", lang) + " (CSV)",
+            data=df_roster.to_csv(index=False, sep=";").encode("utf-8"),
+            file_name="roster.csv",
+            mime="text/csv"
+        )
+        st.divider()
     # FR : Affichage par jour (déjà présent)
     # EN : Display by day (already present)
-    if requirements_par_jour:
+    if not requirements_par_jour.empty:
         st.write(f"### {t('requirements_by_day', lang)}")
-        fig = creer_graphique_requirements_par_jour(requirements_par_jour, t, lang)
+        depot_requirements = st.selectbox(
+            t("select_depot", lang), [None] + list(pics["par_depot"].keys()),
+            format_func=lambda x: t("all", lang) if x is None else x, key="depot_requirements"
+        )
+        fig = creer_graphique_requirements_par_jour(
+            [ligne for ligne in pics["par_periode"] if ligne["Depot"] == depot_requirements], t, lang
+        )
         # Remplace fig_depot.update_layout(...) par fig.update_layout(...)
         fig.update_layout(
             title=dict(
-                text=t("train_list", lang),
+                text=t("peak_requirements", lang),
                 font=dict(size=22, family="Segoe UI, Arial"),
                 x=0.5
             ),
@@ -821,18 +1034,13 @@ elif selected_tab == "🛠️ " + t("requirements", lang):
         st.plotly_chart(fig, use_container_width=True)
         # FR : Tableau exportable par jour
         # EN : Exportable table by day
-        export_data = []
-        for jour, besoins in sorted(requirements_par_jour.items()):
-            for detail in besoins["details"]:
-                export_data.append({
-                    "Date": jour.strftime("%Y-%m-%d"),
-                    t("train_name", lang): detail["train_name"],
-                    t("arrival_time", lang): detail["start_time"],
-                    t("departure_time", lang): detail["end_time"],
-                    t("test_drivers", lang): besoins["test_drivers"],
-                    t("locomotives", lang): besoins["locomotives"]
-                })
-        df_export = pd.DataFrame(export_data)
+        df_export = requirements_par_jour.drop(columns="Depot").rename(columns={
+            "Train": t("train_name", lang),
+            "Début": t("arrival_time", lang),
+            "Fin": t("departure_time", lang),
+            "test_drivers": t("test_drivers", lang),
+            "locomotives": t("locomotives", lang),
+        })
         csv_buffer = io.StringIO()
         df_export.to_csv(csv_buffer, index=False, sep=";", encoding="utf-8")
         st.download_button(
@@ -6,14 +6,87 @@ Created on Fri May  2 11:02:51 2025
 """
 
 import plotly.graph_objects as go
-from datetime import timedelta
+from collections import OrderedDict
+from datetime import datetime, timedelta
 import plotly.express as px
 import pandas as pd
 
+
+class CacheFigures:
+    """
+    FR : Cache LRU de figures Plotly, indexé par (dépôt, graphique, langue, empreinte de l'état, paramètres...).
+         Une figure n'est reconstruite que si l'état du dépôt a changé ; les plus anciennes sont évincées.
+    EN : LRU cache of Plotly figures, keyed by (depot, chart, language, state fingerprint, parameters...).
+         A figure is only rebuilt when the depot state has changed; the least recently used are evicted.
+    """
+
+    def __init__(self, taille_max=32):
+        self.taille_max = taille_max
+        self.figures = OrderedDict()
+
+    def __len__(self):
+        return len(self.figures)
+
+    def obtenir(self, cle, construire):
+        """
+        FR : Retourne la figure de la clé, ou la construit avec `construire()` et la mémorise.
+        EN : Return the figure for the key, or build it with `construire()` and store it.
+        """
+        if cle in self.figures:
+            self.figures.move_to_end(cle)
+            return self.figures[cle]
+        fig = construire()
+        self.figures[cle] = fig
+        while len(self.figures) > self.taille_max:
+            self.figures.popitem(last=False)
+        return fig
+
+    def vider(self):
+        self.figures.clear()
+
+def cle_figure(simulation, depot, graphique, lang, *parametres):
+    """
+    FR : Clé de cache d'une figure : empreinte de contenu du dépôt (ou de toute la simulation si depot est None).
+    EN : Cache key of a figure: content fingerprint of the depot (or of the whole simulation when depot is None).
+    """
+    return (depot, graphique, lang, simulation.empreinte(depot)) + parametres
+
+# FR : Composition des trains : ordre des éléments selon (nombre de locomotives, côté de la locomotive)
+#      "L" = locomotive, "W" = tous les wagons. Les autres cas placent les locomotives en tête.
+# EN : Train consist: element order by (number of locomotives, locomotive side)
+#      "L" = locomotive, "W" = all wagons. Other cases put the locomotives in front.
+COMPOSITIONS = {
+    (0, None): ("W",),
+    (1, "left"): ("L", "W"),
+    (1, None): ("W", "L"),
+    (2, None): ("L", "W", "L"),
+}
+LONGUEUR_WAGON = 14  # FR : Longueur d'un wagon (m) / EN : Wagon length (m)
+LONGUEUR_LOCOMOTIVE = 19  # FR : Longueur d'une locomotive (m) / EN : Locomotive length (m)
+
+def composition_train(train):
+    """
+    FR : Liste des éléments (type, numéro) d'un train dans l'ordre, d'après COMPOSITIONS.
+    EN : List of a train's elements (kind, number) in order, from COMPOSITIONS.
+    """
+    cote = "left" if train.locomotives == 1 and getattr(train, "locomotive_cote", None) == "left" else None
+    schema = COMPOSITIONS.get((train.locomotives, cote), ("L",) * train.locomotives + ("W",))
+    elements = []
+    numero_loco = 0
+    for code in schema:
+        if code == "L":
+            numero_loco += 1
+            elements.append(("locomotive", numero_loco))
+        else:
+            elements.extend(("wagon", i + 1) for i in range(train.wagons))
+    return elements
+
 def creer_graphique_trains_par_longueur_detaille(simulation, t, instant, lang, depot=None):
     """
     FR : Crée un graphique détaillé représentant chaque wagon et locomotive d'un train à un instant donné.
+         Deux traces seulement (wagons, locomotives) avec des tableaux x/base/customdata construits en une passe.
     EN : Create a detailed chart showing each wagon and locomotive of a train at a given instant.
+         Only two traces (wagons, locomotives) with x/base/customdata arrays built in one pass.
 
     Args:
         simulation: FR : Instance Simulation. / EN : Simulation instance.
@@ -27,122 +100,47 @@ def creer_graphique_trains_par_longueur_detaille(simulation, t, instant, lang, d
     """
     fig = go.Figure()
 
-    # FR : Parcourt les occupations des dépôts
-    # EN : Loop through occupations of depots
+    # FR : Occupations présentes à l'instant, via l'index d'intervalles du dépôt (pas de parcours complet)
+    # EN : Occupations present at the instant, through the depot interval index (no full scan)
     depots_to_show = []
     if depot is not None:
         if depot in simulation.depots:
-            depots_to_show = [(depot, simulation.depots[depot]["occupation"], simulation.depots[depot]["numeros_voies"])]
+            depots_to_show = [depot]
     else:
-        depots_to_show = [
-            (d, simulation.depots[d]["occupation"], simulation.depots[d]["numeros_voies"])
-            for d in simulation.depots
-        ]
-
+        depots_to_show = list(simulation.depots)
+    depots_to_show = [
+        (d, simulation.index_presence(d, occupations=True).presents(instant), simulation.depots[d]["numeros_voies"])
+        for d in depots_to_show
+    ]
+
+    # FR : Une série de tableaux par type d'élément / EN : One set of arrays per element kind
+    series = {kind: {"x": [], "y": [], "base": [], "width": [], "customdata": []} for kind in ("wagon", "locomotive")}
+    longueurs = {"wagon": LONGUEUR_WAGON, "locomotive": LONGUEUR_LOCOMOTIVE}
     for depot_name, occupation, numeros_voies in depots_to_show:
         for voie_idx, debut, fin, train in occupation:
-            if debut <= instant <= fin:
-                voie_label = f"{t('Track', lang)} {numeros_voies[voie_idx]} ({depot_name})"
-                position_actuelle = 0
-                # ...existing code for drawing bars...
-                # (copie le code déjà présent ici pour les wagons/locomotives)
-                if train.locomotives == 1:
-                    if getattr(train, "locomotive_cote", None) == "left":
-                        fig.add_trace(go.Bar(
-                            x=[19],
-                            y=[voie_label],
-                            base=position_actuelle,
-                            orientation='h',
-                            marker=dict(color="red", line=dict(color="black", width=1)),
-                            width=0.01,
-                            name=f"{train.nom} - {t('locomotive', lang)} 1",
-                            hovertemplate=f"Train: {train.nom}<br>Type: {train.type}<br>Locomotive<br>Longueur: 19m<extra></extra>"
-                        ))
-                        position_actuelle += 19
-                        for i in range(train.wagons):
-                            fig.add_trace(go.Bar(
-                                x=[14],
-                                y=[voie_label],
-                                base=position_actuelle,
-                                orientation='h',
-                                marker=dict(color="blue", line=dict(color="black", width=1)),
-                                width=0.01,
-                                name=f"{train.nom} - {t('wagon', lang)} {i + 1}",
-                                hovertemplate=f"Train: {train.nom}<br>Type: {train.type}<br>Wagon {i + 1}<br>Longueur: 14m<extra></extra>"
-                            ))
-                            position_actuelle += 14
-                    else:
-                        for i in range(train.wagons):
-                            fig.add_trace(go.Bar(
-                                x=[14],
-                                y=[voie_label],
-                                base=position_actuelle,
-                                orientation='h',
-                                marker=dict(color="blue", line=dict(color="black", width=1)),
-                                width=0.01,
-                                name=f"{train.nom} - {t('wagon', lang)} {i + 1}",
-                                hovertemplate=f"Train: {train.nom}<br>Type: {train.type}<br>Wagon {i + 1}<br>Longueur: 14m<extra></extra>"
-                            ))
-                            position_actuelle += 14
-                        fig.add_trace(go.Bar(
-                            x=[19],
-                            y=[voie_label],
-                            base=position_actuelle,
-                            orientation='h',
-                            marker=dict(color="red", line=dict(color="black", width=1)),
-                            width=0.01,
-                            name=f"{train.nom} - {t('locomotive', lang)} 1",
-                            hovertemplate=f"Train: {train.nom}<br>Type: {train.type}<br>Locomotive<br>Longueur: 19m<extra></extra>"
-                        ))
-                        position_actuelle += 19
-                elif train.locomotives == 2:
-                    fig.add_trace(go.Bar(
-                        x=[19],
-                        y=[voie_label],
-                        base=position_actuelle,
-                        orientation='h',
-                        marker=dict(color="red", line=dict(color="black", width=1)),
-                        width=0.01,
-                        name=f"{train.nom} - {t('locomotive', lang)} 1",
-                        hovertemplate=f"Train: {train.nom}<br>Type: {train.type}<br>Locomotive<br>Longueur: 19m<extra></extra>"
-                    ))
-                    position_actuelle += 19
-                    for i in range(train.wagons):
-                        fig.add_trace(go.Bar(
-                            x=[14],
-                            y=[voie_label],
-                            base=position_actuelle,
-                            orientation='h',
-                            marker=dict(color="blue", line=dict(color="black", width=1)),
-                            width=0.01,
-                            name=f"{train.nom} - {t('wagon', lang)} {i + 1}",
-                            hovertemplate=f"Train: {train.nom}<br>Type: {train.type}<br>Wagon {i + 1}<br>Longueur: 14m<extra></extra>"
-                        ))
-                        position_actuelle += 14
-                    fig.add_trace(go.Bar(
-                        x=[19],
-                        y=[voie_label],
-                        base=position_actuelle,
-                        orientation='h',
-                        marker=dict(color="red", line=dict(color="black", width=1)),
-                        width=0.01,
-                        name=f"{train.nom} - {t('locomotive', lang)} 2",
-                        hovertemplate=f"Train: {train.nom}<br>Type: {train.type}<br>Locomotive<br>Longueur: 19m<extra></extra>"
-                    ))
-                    position_actuelle += 19
-                elif train.locomotives == 0:
-                    for i in range(train.wagons):
-                        fig.add_trace(go.Bar(
-                            x=[14],
-                            y=[voie_label],
-                            base=position_actuelle,
-                            orientation='h',
-                            marker=dict(color="blue", line=dict(color="black", width=1)),
-                            width=0.15,
-                            name=f"{train.nom} - {t('wagon', lang)} {i + 1}",
-                            hovertemplate=f"Train: {train.nom}<br>Type: {train.type}<br>Wagon {i + 1}<br>Longueur: 14m<extra></extra>"
-                        ))
-                        position_actuelle += 14
+            voie_label = f"{t('Track', lang)} {numeros_voies[voie_idx]} ({depot_name})"
+            # FR : Barres plus épaisses pour les rames sans locomotive / EN : Thicker bars for consists without locomotive
+            largeur = 0.15 if train.locomotives == 0 else 0.01
+            position_actuelle = 0
+            for kind, numero in composition_train(train):
+                serie = series[kind]
+                serie["x"].append(longueurs[kind])
+                serie["y"].append(voie_label)
+                serie["base"].append(position_actuelle)
+                serie["width"].append(largeur)
+                serie["customdata"].append((train.nom, train.type, f"{t(kind, lang)} {numero}"))
+                position_actuelle += longueurs[kind]
+
+    couleurs = {"wagon": "blue", "locomotive": "red"}
+    for kind, serie in series.items():
+        if serie["x"]:
+            fig.add_trace(go.Bar(
+                orientation='h',
+                marker=dict(color=couleurs[kind], line=dict(color="black", width=1)),
+                name=t(kind, lang),
+                hovertemplate="Train: %{customdata[0]}<br>Type: %{customdata[1]}<br>%{customdata[2]}<br>Longueur: %{x}m<extra></extra>",
+                **serie
+            ))
 
     fig.update_layout(
         plot_bgcolor="#fff8f8",
@@ -154,40 +152,36 @@ def creer_graphique_trains_par_longueur_detaille(simulation, t, instant, lang, d
         legend_title=t("train_type", lang),
         height=600,
         margin=dict(l=40, r=40, t=40, b=80),
-        barmode='stack',
+        barmode='overlay',
     )
 
     return fig
 
-def creer_graphique_requirements_par_jour(requirements_par_jour, t, lang):
+def creer_graphique_requirements_par_jour(pics_par_periode, t, lang):
     """
-    FR : Crée un graphique en barres groupées des besoins en ressources par jour.
-    EN : Create a grouped bar chart of resource requirements per day.
+    FR : Crée un graphique en barres groupées de la demande simultanée maximale en ressources par période.
+    EN : Create a grouped bar chart of the peak concurrent resource demand per period.
 
     Args:
-        requirements_par_jour: FR : Dictionnaire des besoins par jour. / EN : Requirements per day dict.
+        pics_par_periode: FR : Lignes {"Periode", "test_drivers", "locomotives"} (voir Stats.calculer_pics_requirements).
+                          EN : Rows {"Periode", "test_drivers", "locomotives"} (see Stats.calculer_pics_requirements).
         t: FR : Fonction de traduction. / EN : Translation function.
         lang: FR : Langue. / EN : Language.
 
     Returns:
         FR : Figure Plotly. / EN : Plotly Figure.
     """
-    if not requirements_par_jour:
+    if not pics_par_periode:
         return px.bar(title=t("no_requirements", lang))
 
     # FR : Prépare les données pour le graphique
     # EN : Prepare data for the chart
     data = []
-    for jour, besoins in sorted(requirements_par_jour.items()):
-        data.append({"Date": jour, "Ressource": t("test_drivers", lang), "Quantité": besoins["test_drivers"]})
-        data.append({"Date": jour, "Ressource": t("locomotives", lang), "Quantité": besoins["locomotives"]})
+    for ligne in sorted(pics_par_periode, key=lambda ligne: ligne["Periode"]):
+        data.append({"Date": ligne["Periode"], "Ressource": t("test_drivers", lang), "Quantité": ligne["test_drivers"]})
+        data.append({"Date": ligne["Periode"], "Ressource": t("locomotives", lang), "Quantité": ligne["locomotives"]})
 
     df = pd.DataFrame(data)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
-    df = df.dropna(subset=["Date"])
-
-    if df.empty:
-        return px.bar(title=t("no_requirements", lang))
 
     # FR : Crée le graphique en barres groupées
     # EN : Create grouped bar chart
@@ -196,7 +190,7 @@ def creer_graphique_requirements_par_jour(requirements_par_jour, t, lang):
         x="Date",
         y="Quantité",
         color="Ressource",
-        title=t("requirements_by_day", lang),
+        title=t("peak_requirements", lang),
         labels={"Quantité": t("quantity", lang), "Ressource": t("resource_type", lang)},
         barmode="group",
     )
@@ -211,7 +205,7 @@ def creer_graphique_requirements_par_jour(requirements_par_jour, t, lang):
         yaxis_title=t("quantity", lang),
         legend_title=t("resource_type", lang),
         xaxis=dict(
-            tickformat="%d %b %Y",
+            tickformat="%d %b %Y %H:%M",
             showgrid=True,
             tickangle=45,
         ),
@@ -222,7 +216,7 @@ def creer_graphique_requirements_par_jour(requirements_par_jour, t, lang):
     return fig
 
 
-def creer_gantt_occupation_depot(simulation, depot, t, lang):
+def creer_gantt_occupation_depot(simulation, depot, t, lang, debut=None, fin=None):
     """
     FR : Crée un diagramme de Gantt de l'occupation des voies pour un dépôt.
     EN : Create a Gantt chart of track occupation for a depot.
@@ -232,11 +226,16 @@ def creer_gantt_occupation_depot(simulation, depot, t, lang):
         depot: FR : Nom du dépôt. / EN : Depot name.
         t: FR : Fonction de traduction. / EN : Translation function.
         lang: FR : Langue. / EN : Language.
+        debut, fin: FR : Fenêtre affichée (optionnelle) ; seules les occupations qui la coupent sont lues (index d'intervalles).
+                    EN : Displayed window (optional); only the occupations meeting it are read (interval index).
 
     Returns:
         FR : Figure Plotly. / EN : Plotly Figure.
     """
-    occupation = simulation.depots[depot]["occupation"]
+    if debut is None and fin is None:
+        occupation = simulation.depots[depot]["occupation"]
+    else:
+        occupation = simulation.index_presence(depot, occupations=True).chevauchant(debut or datetime.min, fin or datetime.max)
     numeros_voies = simulation.depots[depot]["numeros_voies"]
 
     # FR : Prépare les données pour le Gantt
@@ -296,10 +295,18 @@ def creer_gantt_occupation_depot(simulation, depot, t, lang):
     )
     return fig
 
-def creer_graphique_occupation_depot(simulation, depot, base_time, t, lang):
+# FR : Au-delà de ce nombre d'occupations, le graphique passe en WebGL (segments Scattergl)
+# EN : Above this number of occupations, the chart switches to WebGL (Scattergl segments)
+SEUIL_WEBGL = 2000
+
+def creer_graphique_occupation_depot(simulation, depot, base_time, t, lang, webgl=None):
     """
     FR : Crée un graphique d'occupation des voies pour un dépôt donné.
+         Les occupations sont groupées par voie en une passe : une seule trace par voie (base, x et customdata
+         en tableaux). Au-delà de SEUIL_WEBGL occupations, chaque voie devient une trace Scattergl de segments.
     EN : Create a track occupation chart for a given depot.
+         Occupations are grouped by track in one pass: a single trace per track (array base, x and customdata).
+         Above SEUIL_WEBGL occupations, each track becomes a Scattergl trace of segments.
 
     Args:
         simulation: Instance Simulation.
@@ -307,43 +314,263 @@ def creer_graphique_occupation_depot(simulation, depot, base_time, t, lang):
         base_time: Heure de base (datetime).
         t: Fonction de traduction.
         lang: Langue.
+        webgl: FR : Force (True/False) le rendu WebGL ; None = automatique. / EN : Force (True/False) WebGL rendering; None = automatic.
 
     Returns:
         Figure Plotly.
     """
-    import plotly.graph_objects as go
     depot_data = simulation.depots[depot]
     occupation = depot_data["occupation"]
     numeros_voies = depot_data["numeros_voies"]
+    if webgl is None:
+        webgl = len(occupation) > SEUIL_WEBGL
 
     fig = go.Figure()
     colors = ["#1976d2", "#e74c3c", "#27ae60", "#f39c12", "#8e44ad", "#34495e", "#9b59b6"]
 
+    # FR : Regroupement en une passe / EN : One-pass grouping
+    par_voie = {idx: {"base": [], "x": [], "customdata": []} for idx in range(len(numeros_voies))}
+    for voie_idx, debut, fin, train in occupation:
+        groupe = par_voie[voie_idx]
+        groupe["base"].append((debut - base_time).total_seconds() / 3600)
+        groupe["x"].append((fin - debut).total_seconds() / 3600)
+        groupe["customdata"].append((train.nom, t(train.type, lang), debut.strftime('%Y-%m-%d %H:%M'), fin.strftime('%Y-%m-%d %H:%M')))
+
+    hovertemplate = "Train: %{customdata[0]}<br>Type: %{customdata[1]}<br>Début: %{customdata[2]}<br>Fin: %{customdata[3]}<extra></extra>"
     for idx, voie in enumerate(numeros_voies):
-        occs = [occ for occ in occupation if occ[0] == idx]
-        for occ in occs:
-            _, debut, fin, train = occ
-            color = colors[idx % len(colors)]
+        groupe = par_voie[idx]
+        if not groupe["x"]:
+            continue
+        label = f"{t('Track', lang)} {voie}"
+        color = colors[idx % len(colors)]
+        if webgl:
+            # FR : Un segment [début, fin] par occupation, séparés par None
+            # EN : One [start, end] segment per occupation, separated by None
+            xs, ys, donnees = [], [], []
+            for base, duree, info in zip(groupe["base"], groupe["x"], groupe["customdata"]):
+                xs += [base, base + duree, None]
+                ys += [label, label, None]
+                donnees += [info, info, None]
+            fig.add_trace(go.Scattergl(
+                x=xs, y=ys, customdata=donnees, mode="lines",
+                line=dict(color=color, width=12),
+                name=label, hovertemplate=hovertemplate,
+            ))
+        else:
             fig.add_trace(go.Bar(
-                x=[(fin - debut).total_seconds() / 3600],
-                y=[f"{t('Track', lang)} {voie}"],
-                base=(debut - base_time).total_seconds() / 3600,
+                x=groupe["x"],
+                y=[label] * len(groupe["x"]),
+                base=groupe["base"],
+                customdata=groupe["customdata"],
                 orientation='h',
                 marker=dict(color=color, line=dict(color="black", width=1)),
-                name=train.nom,
-                hovertemplate=f"Train: {train.nom}<br>Type: {t(train.type, lang)}<br>Début: {debut.strftime('%Y-%m-%d %H:%M')}<br>Fin: {fin.strftime('%Y-%m-%d %H:%M')}<extra></extra>"
+                name=label,
+                hovertemplate=hovertemplate,
             ))
 
     fig.update_layout(
         title=f"{t('graph_title', lang)} - {depot}",
         xaxis_title=t("Time", lang) + " (h)",
         yaxis_title=t("Track", lang),
-        barmode='stack',
+        barmode='overlay',
         plot_bgcolor="#fff8f8",
         paper_bgcolor="#fbe9e7",
         font=dict(family="Segoe UI, Arial", size=14, color="#b71c1c"),
         height=400,
         margin=dict(l=40, r=40, t=40, b=80),
-        legend_title=t("train_name", lang),
+        legend_title=t("Track", lang),
     )
-    return fig
\ No newline at end of file
+    return fig
+
+def creer_graphique_profil_occupation(profil, nb_voies, depot, saturations, t, lang):
+    """
+    FR : Crée un graphique en escalier du nombre de voies occupées au cours du temps, avec les périodes de saturation.
+    EN : Create a step chart of the number of occupied tracks over time, with saturation periods.
+
+    Args:
+        profil: FR : Profil d'occupation (voir Stats.calculer_profil_occupation). / EN : Occupation profile.
+        nb_voies: FR : Nombre de voies du dépôt. / EN : Number of tracks in the depot.
+        depot: FR : Nom du dépôt. / EN : Depot name.
+        saturations: FR : Liste des périodes (début, fin) saturées. / EN : List of saturated (start, end) periods.
+        t: FR : Fonction de traduction. / EN : Translation function.
+        lang: FR : Langue. / EN : Language.
+
+    Returns:
+        FR : Figure Plotly. / EN : Plotly Figure.
+    """
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=profil["temps"].astype("datetime64[ms]"),
+        y=profil["voies_occupees"],
+        mode="lines",
+        line=dict(shape="hv", color="#1976d2", width=2),
+        fill="tozeroy",
+        name=t("occupied_tracks", lang),
+        customdata=profil["longueur_occupee"],
+        hovertemplate="%{x}<br>" + t("occupied_tracks", lang) + ": %{y}<br>" + t("length", lang) + ": %{customdata}<extra></extra>",
+    ))
+    # FR : Capacité du dépôt / EN : Depot capacity
+    fig.add_hline(y=nb_voies, line_dash="dash", line_color="#b71c1c")
+    # FR : Bandes rouges pour les périodes de saturation / EN : Red bands for saturation periods
+    for debut, fin in saturations:
+        fig.add_vrect(x0=debut, x1=fin, fillcolor="#e74c3c", opacity=0.2, line_width=0)
+
+    fig.update_layout(
+        title=f"{t('occupancy_profile', lang)} - {depot}",
+        xaxis_title=t("Time", lang),
+        yaxis_title=t("occupied_tracks", lang),
+        yaxis=dict(range=[0, nb_voies + 0.5], dtick=1),
+        plot_bgcolor="#fff8f8",
+        paper_bgcolor="#fbe9e7",
+        font=dict(family="Segoe UI, Arial", size=14, color="#b71c1c"),
+        height=300,
+        margin=dict(l=40, r=40, t=40, b=40),
+        showlegend=False,
+    )
+    return fig
+
+
+def creer_graphique_pics_utilisation(pics, t, lang):
+    """
+    FR : Crée un graphique en barres du pic d'utilisation (en % des voies) par dépôt.
+    EN : Create a bar chart of peak utilisation (as % of tracks) per depot.
+
+    Args:
+        pics: FR : Liste de dicts {"Depot", "Pic", "Saturation"}. / EN : List of dicts {"Depot", "Pic", "Saturation"}.
+        t: FR : Fonction de traduction. / EN : Translation function.
+        lang: FR : Langue. / EN : Language.
+
+    Returns:
+        FR : Figure Plotly. / EN : Plotly Figure.
+    """
+    df = pd.DataFrame(pics, columns=["Depot", "Pic", "Saturation"])
+    fig = px.bar(
+        df,
+        x="Depot",
+        y="Pic",
+        color="Saturation",
+        color_continuous_scale=["#27ae60", "#f39c12", "#e74c3c"],
+        title=t("peak_utilisation", lang),
+        labels={"Pic": t("peak_utilisation", lang) + " (%)", "Saturation": t("saturated_hours", lang)},
+    )
+    fig.update_layout(
+        plot_bgcolor="#fff8f8",
+        paper_bgcolor="#fbe9e7",
+        font=dict(family="Segoe UI, Arial", size=14, color="#b71c1c"),
+        yaxis=dict(range=[0, 105]),
+        height=400,
+        margin=dict(l=40, r=40, t=40, b=80),
+    )
+    return fig
+
+
+def creer_graphique_taux_par_periode(taux, t, lang):
+    """
+    FR : Crée un graphique en lignes du taux d'occupation par période pour chaque dépôt.
+    EN : Create a line chart of the occupancy rate per period for every depot.
+
+    Args:
+        taux: FR : Liste de dicts {"Depot", "Periode", "Taux"}. / EN : List of dicts {"Depot", "Periode", "Taux"}.
+        t: FR : Fonction de traduction. / EN : Translation function.
+        lang: FR : Langue. / EN : Language.
+
+    Returns:
+        FR : Figure Plotly. / EN : Plotly Figure.
+    """
+    df = pd.DataFrame(taux, columns=["Depot", "Periode", "Taux"])
+    fig = px.line(
+        df,
+        x="Periode",
+        y="Taux",
+        color="Depot",
+        markers=True,
+        line_shape="hv",
+        title=t("occupancy_rate", lang),
+        labels={"Periode": t("Time", lang), "Taux": t("occupancy_rate", lang) + " (%)"},
+    )
+    fig.update_layout(
+        plot_bgcolor="#fff8f8",
+        paper_bgcolor="#fbe9e7",
+        font=dict(family="Segoe UI, Arial", size=14, color="#b71c1c"),
+        yaxis=dict(range=[0, 105]),
+        height=400,
+        margin=dict(l=40, r=40, t=40, b=80),
+    )
+    return fig
+
+
+def creer_histogramme_attente(bornes, comptes, t, lang):
+    """
+    FR : Crée l'histogramme des temps d'attente à partir des classes calculées par l'esquisse.
+    EN : Create the waiting-time histogram from the bins computed by the sketch.
+
+    Args:
+        bornes: FR : Bornes des classes (min). / EN : Bin edges (min).
+        comptes: FR : Effectifs par classe. / EN : Count per bin.
+        t: FR : Fonction de traduction. / EN : Translation function.
+        lang: FR : Langue. / EN : Language.
+
+    Returns:
+        FR : Figure Plotly. / EN : Plotly Figure.
+    """
+    fig = go.Figure()
+    if comptes:
+        fig.add_trace(go.Bar(
+            x=[(a + b) / 2 for a, b in zip(bornes[:-1], bornes[1:])],
+            y=comptes,
+            width=[b - a for a, b in zip(bornes[:-1], bornes[1:])],
+            marker=dict(color="#1976d2", line=dict(color="black", width=1)),
+            customdata=list(zip(bornes[:-1], bornes[1:])),
+            hovertemplate="%{customdata[0]:.0f} - %{customdata[1]:.0f} min<br>%{y} trains<extra></extra>",
+        ))
+    fig.update_layout(
+        title=t("waiting_distribution", lang),
+        xaxis_title=t("waiting_minutes", lang),
+        yaxis_title=t("train_list", lang),
+        plot_bgcolor="#fff8f8",
+        paper_bgcolor="#fbe9e7",
+        font=dict(family="Segoe UI, Arial", size=14, color="#b71c1c"),
+        height=350,
+        margin=dict(l=40, r=40, t=40, b=40),
+        bargap=0,
+    )
+    return fig
+
+
+def creer_heatmap_utilisation(depots, bornes, matrice, t, lang):
+    """
+    FR : Crée une heatmap de l'utilisation (%) par dépôt (lignes) et par heure ou jour (colonnes).
+    EN : Create a heatmap of utilisation (%) per depot (rows) and per hour or day (columns).
+
+    Args:
+        depots: FR : Noms des dépôts. / EN : Depot names.
+        bornes: FR : Bornes des classes (datetime64). / EN : Bin edges (datetime64).
+        matrice: FR : Matrice n_depots × n_classes en %. / EN : n_depots × n_classes matrix in %.
+        t: FR : Fonction de traduction. / EN : Translation function.
+        lang: FR : Langue. / EN : Language.
+
+    Returns:
+        FR : Figure Plotly. / EN : Plotly Figure.
+    """
+    fig = go.Figure(go.Heatmap(
+        z=matrice,
+        x=bornes[:-1].astype("datetime64[ms]") if len(bornes) else [],
+        y=depots,
+        zmin=0,
+        zmax=100,
+        colorscale=[[0, "#fff8f8"], [0.5, "#f39c12"], [1, "#b71c1c"]],
+        colorbar=dict(title="%"),
+        hovertemplate="%{y}<br>%{x}<br>%{z:.1f}%<extra></extra>",
+    ))
+    fig.update_layout(
+        title=t("utilisation_heatmap", lang),
+        xaxis_title=t("Time", lang),
+        yaxis_title=t("Dépôt", lang),
+        yaxis=dict(autorange="reversed"),
+        plot_bgcolor="#fff8f8",
+        paper_bgcolor="#fbe9e7",
+        font=dict(family="Segoe UI, Arial", size=14, color="#b71c1c"),
+        height=max(300, 50 * len(depots) + 120),
+        margin=dict(l=40, r=40, t=40, b=80),
+    )
+    return fig
@@ -16,7 +16,12 @@ Date de création : 02/05/2025
 """
 
 from datetime import datetime, timedelta
+from hashlib import blake2b
+import numpy as np
 from UTILES import verifier_conflit
+from Occupation import IndexVoie, IndexRessource, IndexIntervalles
+from Stats import BESOINS_TESTING
+from Esquisse import EsquisseKLL
 
 class Train:
     """
@@ -72,6 +77,7 @@ class Train:
         self.type = type
         self.locomotive_cote = None
         self.type_wagon = None
+        self.attente_ressources = 0  # FR: Part de l'attente (min) due aux ressources / EN: Share of the wait (min) caused by resources
 
     def calculer_longueur(self):
         """
@@ -85,6 +91,10 @@ class Train:
         longueur_locomotive = 19  # FR: Longueur d'une locomotive en mètres / EN: Locomotive length in meters
         return self.wagons * longueur_wagon + self.locomotives * longueur_locomotive
 
+# FR: Les empreintes de voie sont des sommes de hachages modulo 2**64 / EN: Track fingerprints are hash sums modulo 2**64
+MODULE_EMPREINTE = 2 ** 64
+RAYON_TERRE_KM = 6371.0  # FR: Rayon moyen pour la formule de haversine / EN: Mean radius for the haversine formula
+
 class Simulation:
     """
     FR: Gère l'ensemble de la simulation ferroviaire.
@@ -121,14 +131,163 @@ class Simulation:
                 "numeros_voies": conf["numeros_voies"],
                 "longueurs_voies": conf["longueurs_voies"],
                 "occupation": [],  # FR: Liste des tuples (voie_idx, debut, fin, train) / EN: List of tuples (track_idx, start, end, train)
+                "index": [IndexVoie() for _ in conf["numeros_voies"]],  # FR: Index par voie (sommes préfixes) / EN: Per-track index (prefix sums)
+                "ressources": self._index_ressources(conf.get("ressources")),  # FR: Pools conducteurs/locomotives / EN: Driver/locomotive pools
                 "lat": conf.get("lat"),
                 "lon": conf.get("lon"),
             }
 
         self.trains = []  # FR: Liste de tous les trains / EN: List of all trains
         self.delai_securite = 10  # FR: Délai de sécurité en minutes / EN: Safety margin in minutes
+        self.vitesse_transfert = 60  # FR: Vitesse moyenne (km/h) d'un transfert entre dépôts / EN: Average speed (km/h) of a depot transfer
         self.historique = []  # FR: Liste des actions (ajout, suppression, modification) / EN: List of actions (add, remove, modify)
-        
+        self.versions = {nom: 0 for nom in self.depots}  # FR: Compteur de modifications par dépôt / EN: Modification counter per depot
+        self.cache = {}  # FR: Résultats dérivés (profils, etc.) indexés par empreinte / EN: Derived results (profiles, etc.) keyed by fingerprint
+        self.agregats = self._agregats_vides()  # FR: Statistiques tenues à jour à chaque mutation / EN: Statistics kept up to date on each mutation
+        self.esquisses = {}  # FR: Esquisses KLL des attentes par (dépôt, type) / EN: KLL sketches of waiting times per (depot, type)
+        self.esquisses_perimees = set()  # FR: Dépôts dont les esquisses sont à reconstruire / EN: Depots whose sketches must be rebuilt
+        self.empreintes = {nom: [0] * len(d["numeros_voies"]) for nom, d in self.depots.items()}  # FR: Empreinte par voie / EN: Per-track fingerprint
+        self.empreinte_trains = 0  # FR: Empreinte de la liste des trains / EN: Fingerprint of the train list
+        self.index_naturel = {}  # FR: Clé naturelle -> trains (doublons d'import) / EN: Natural key -> trains (import duplicates)
+        self.index_identite = {}  # FR: (nom, dépôt, arrivée) -> trains (lignes modifiées) / EN: (name, depot, arrival) -> trains (changed rows)
+
+    def __getstate__(self):
+        """
+        FR: État sauvegardé (pickle) sans le cache : figures, couches de carte et index dérivés sont reconstruits à la demande.
+        EN: Saved (pickled) state without the cache: figures, map layers and derived indexes are rebuilt on demand.
+        """
+        etat = self.__dict__.copy()
+        etat.pop("cache", None)
+        return etat
+
+    def __setstate__(self, etat):
+        """
+        FR: Restaure une simulation sauvegardée (pickle), y compris celles créées avant l'ajout des caches.
+        EN: Restore a saved (pickled) simulation, including those created before caches were added.
+        """
+        self.__dict__.update(etat)
+        self.__dict__.setdefault("versions", {nom: 0 for nom in self.depots})
+        self.__dict__.setdefault("cache", {})
+        self.__dict__.setdefault("vitesse_transfert", 60)
+        for depot in self.depots.values():
+            if "index" not in depot:
+                depot["index"] = [IndexVoie() for _ in depot["numeros_voies"]]
+                for voie, debut, fin, _ in depot["occupation"]:
+                    depot["index"][voie].inserer(debut, fin)
+            if "ressources" not in depot:
+                depot["ressources"] = self._index_ressources()
+                for _, debut, fin, train in depot["occupation"]:
+                    for ressource, quantite in self._ressources_requises(train).items():
+                        depot["ressources"][ressource].inserer(debut, fin, quantite)
+        if "index_naturel" not in etat:
+            self.index_naturel, self.index_identite = {}, {}
+            for train in self.trains:
+                self._indexer_train(train, 1)
+        if "agregats" not in etat or "attente_ressources_par_depot" not in etat["agregats"]:
+            self._reconstruire_agregats()
+        if "esquisses" not in etat:
+            self.esquisses = {}
+            self.esquisses_perimees = set(self.depots)
+        if "empreintes" not in etat:
+            self.empreintes = {nom: [0] * len(d["numeros_voies"]) for nom, d in self.depots.items()}
+            for nom, depot in self.depots.items():
+                for entree in depot["occupation"]:
+                    self._empreinte_voie(nom, entree, 1)
+            self.empreinte_trains = 0
+            for train in self.trains:
+                self.empreinte_trains = (self.empreinte_trains + self._hacher(self._contenu_train(train))) % MODULE_EMPREINTE
+
+    @staticmethod
+    def _agregats_vides():
+        return {
+            "trains_par_depot": {},  # FR: Nombre de trains par dépôt / EN: Train count per depot
+            "trains_par_type": {},  # FR: Nombre de trains par type / EN: Train count per type
+            "trains_electriques": 0,  # FR: Nombre de trains électriques / EN: Electric train count
+            "attente_par_depot": {},  # FR: Somme des attentes (min) par dépôt / EN: Sum of waiting times (min) per depot
+            "attente_ressources_par_depot": {},  # FR: Part due aux ressources / EN: Share caused by resources
+        }
+
+    @staticmethod
+    def _index_ressources(capacites=None):
+        """
+        FR: Crée les index des pools de ressources d'un dépôt (capacité absente = illimitée).
+        EN: Create the resource pool indexes of a depot (missing capacity = unlimited).
+        """
+        capacites = capacites or {}
+        return {ressource: IndexRessource(capacites.get(ressource)) for ressource in BESOINS_TESTING}
+
+    @staticmethod
+    def _ressources_requises(train):
+        """
+        FR: Ressources mobilisées par un train pendant son séjour (seuls les trains Testing en demandent).
+        EN: Resources held by a train during its stay (only Testing trains need any).
+        """
+        return BESOINS_TESTING if train.type == "testing" else {}
+
+    # --- Empreintes (hachage de Merkle : occupations -> voies -> dépôts -> simulation) ---
+    # --- Fingerprints (Merkle hashing: occupations -> tracks -> depots -> simulation) ---
+    @staticmethod
+    def _hacher(contenu):
+        """
+        FR: Hachage stable entre processus (contrairement à hash()) d'un contenu représentable.
+        EN: Process-stable hash (unlike hash()) of a representable content.
+        """
+        return int.from_bytes(blake2b(repr(contenu).encode("utf-8"), digest_size=8).digest(), "big")
+
+    @staticmethod
+    def _contenu_train(train):
+        return (train.id, train.nom, train.type, train.depot, train.arrivee, train.depart,
+                train.wagons, train.locomotives, train.electrique, getattr(train, "locomotive_cote", None))
+
+    def _empreinte_voie(self, depot, entree, signe):
+        """
+        FR: Ajoute (signe=1) ou retire (signe=-1) une occupation de l'empreinte de sa voie, en O(1).
+            La somme modulo 2**64 des hachages ne dépend que du contenu, pas de l'ordre des mutations.
+        EN: Add (signe=1) or remove (signe=-1) an occupation from its track fingerprint, in O(1).
+            The sum modulo 2**64 of hashes only depends on content, not on the order of mutations.
+        """
+        voie, debut, fin, train = entree
+        h = self._hacher((voie, debut, fin, self._contenu_train(train)))
+        empreintes = self.empreintes[depot]
+        empreintes[voie] = (empreintes[voie] + signe * h) % MODULE_EMPREINTE
+
+    def empreinte(self, depot=None, voie=None):
+        """
+        FR: Empreinte de l'état : d'une voie, d'un dépôt (voies + configuration) ou de toute la simulation
+            (dépôts + trains). Deux états de même contenu ont la même empreinte ; à utiliser comme clé de cache.
+        EN: State fingerprint: of a track, a depot (tracks + configuration) or the whole simulation
+            (depots + trains). Two states with the same content share a fingerprint; use it as a cache key.
+
+        Returns:
+            int: FR: Empreinte sur 64 bits. / EN: 64-bit fingerprint.
+        """
+        if depot is None:
+            return self._hacher((
+                tuple((nom, self.empreinte(nom)) for nom in sorted(self.depots)),
+                self.empreinte_trains,
+            ))
+        if voie is not None:
+            return self.empreintes[depot][voie]
+        depot_data = self.depots[depot]
+        capacites = tuple((r, i.capacite) for r, i in sorted(depot_data["ressources"].items()))
+        return self._hacher((depot, tuple(depot_data["numeros_voies"]), tuple(depot_data["longueurs_voies"]),
+                             capacites, tuple(self.empreintes[depot])))
+
+    def _reconstruire_agregats(self):
+        """
+        FR: Recalcule entièrement les agrégats (uniquement pour les simulations restaurées sans agrégats).
+        EN: Fully rebuild the aggregates (only for restored simulations without aggregates).
+        """
+        self.agregats = self._agregats_vides()
+        self.empreinte_trains = 0
+        self.index_naturel, self.index_identite = {}, {}
+        trains, self.trains = self.trains, []
+        for train in trains:
+            self._enregistrer_train(train)
+        for depot, depot_data in self.depots.items():
+            for _, debut, _, train in depot_data["occupation"]:
+                self._compter_attente(depot, train, debut, 1)
+
     # --- Propriétés pratiques pour accès rapide aux données des dépôts ---
     # --- Handy properties for quick depot data access ---
     @property
@@ -157,14 +316,309 @@ class Simulation:
     
     # --- Ajout d'un dépôt dynamiquement ---
     # --- Dynamically add a depot ---
-    def ajouter_depot(self, nom, numeros_voies, longueurs_voies):
+    def ajouter_depot(self, nom, numeros_voies, longueurs_voies, ressources=None, lat=None, lon=None):
        if nom in self.depots:
            return "Ce dépôt existe déjà."  # FR: Le dépôt existe déjà / EN: Depot already exists
        self.depots[nom] = {
            "numeros_voies": numeros_voies,
            "longueurs_voies": longueurs_voies,
-           "occupation": []
+           "occupation": [],
+           "index": [IndexVoie() for _ in numeros_voies],
+           "ressources": self._index_ressources(ressources),
+           "lat": lat,
+           "lon": lon,
        }
+       self.versions[nom] = 0
+       self.empreintes[nom] = [0] * len(numeros_voies)
+
+    # --- Mutations de la liste des trains (point unique pour tenir les agrégats à jour) ---
+    # --- Train list mutations (single point to keep aggregates up to date) ---
+    def _compter_train(self, train, signe):
+        agregats = self.agregats
+        agregats["trains_par_depot"][train.depot] = agregats["trains_par_depot"].get(train.depot, 0) + signe
+        agregats["trains_par_type"][train.type] = agregats["trains_par_type"].get(train.type, 0) + signe
+        if train.electrique:
+            agregats["trains_electriques"] += signe
+        self.empreinte_trains = (self.empreinte_trains + signe * self._hacher(self._contenu_train(train))) % MODULE_EMPREINTE
+        self._indexer_train(train, signe)
+
+    # --- Index de clés naturelles (imports idempotents) ---
+    # --- Natural key indexes (idempotent imports) ---
+    @staticmethod
+    def cle_naturelle(train):
+        """
+        FR: Clé naturelle d'un train : nom, dépôt d'origine, horaires importés et composition (indépendante de l'id).
+        EN: Natural key of a train: name, home depot, imported schedule and composition (independent of the id).
+        """
+        depot = getattr(train, "depot_origine", train.depot)
+        arrivee = getattr(train, "arrivee_origine", train.arrivee)
+        return (train.nom, depot, arrivee, train.depart, train.wagons, train.locomotives)
+
+    @staticmethod
+    def cle_identite(train):
+        """
+        FR: Identité d'un train d'un import à l'autre : une ligne de même identité mais de clé différente est une modification.
+        EN: Identity of a train across imports: a row with the same identity but a different key is a change.
+        """
+        return (train.nom, getattr(train, "depot_origine", train.depot), getattr(train, "arrivee_origine", train.arrivee))
+
+    def _indexer_train(self, train, signe):
+        for index, cle in ((self.index_naturel, self.cle_naturelle(train)), (self.index_identite, self.cle_identite(train))):
+            if signe > 0:
+                index.setdefault(cle, []).append(train)
+            elif cle in index:
+                trains = index[cle]
+                if train in trains:
+                    trains.remove(train)
+                if not trains:
+                    del index[cle]
+
+    def _enregistrer_train(self, train):
+        """
+        FR: Ajoute un train à self.trains et met à jour les compteurs.
+        EN: Append a train to self.trains and update the counters.
+        """
+        self.trains.append(train)
+        self._compter_train(train, 1)
+
+    def _retirer_train(self, train):
+        """
+        FR: Retire un train de self.trains et met à jour les compteurs.
+        EN: Remove a train from self.trains and update the counters.
+        """
+        self.trains.remove(train)
+        self._compter_train(train, -1)
+
+    def _changer_depot(self, train, depot, arrivee=None):
+        """
+        FR: Change le dépôt d'origine (et l'arrivée, décalée du transfert) d'un train déjà enregistré
+            en gardant les compteurs cohérents. Revenir aux valeurs importées efface depot_origine / arrivee_origine.
+        EN: Change the home depot (and the arrival, shifted by the transfer) of an already registered train
+            while keeping counters consistent. Going back to the imported values clears depot_origine / arrivee_origine.
+        """
+        self._compter_train(train, -1)
+        # FR: La clé naturelle garde le dépôt et l'arrivée importés / EN: The natural key keeps the imported depot and arrival
+        for attribut, origine, valeur in (("depot", "depot_origine", depot), ("arrivee", "arrivee_origine", arrivee)):
+            if valeur is None or valeur == getattr(train, attribut):
+                continue
+            if not hasattr(train, origine):
+                setattr(train, origine, getattr(train, attribut))
+            setattr(train, attribut, valeur)
+            if getattr(train, origine) == valeur:
+                delattr(train, origine)
+        self._compter_train(train, 1)
+
+    def _compter_attente(self, depot, train, debut, signe):
+        attente = max(0, (debut - train.arrivee).total_seconds() / 60)
+        attentes = self.agregats["attente_par_depot"]
+        attentes[depot] = attentes.get(depot, 0) + signe * attente
+        attentes_ressources = self.agregats["attente_ressources_par_depot"]
+        attentes_ressources[depot] = attentes_ressources.get(depot, 0) + signe * getattr(train, "attente_ressources", 0)
+        return attente
+
+    def _esquisse(self, depot, type_train):
+        cle = (depot, type_train)
+        if cle not in self.esquisses:
+            self.esquisses[cle] = EsquisseKLL()
+        return self.esquisses[cle]
+
+    def esquisse_attente(self, depot=None, type_train=None):
+        """
+        FR: Esquisse KLL des temps d'attente (min) des trains placés, fusionnée sur les dépôts et types demandés.
+        EN: KLL sketch of the waiting times (min) of placed trains, merged over the requested depots and types.
+
+        Args:
+            depot (str|None): FR: Dépôt (None = tous). / EN: Depot (None = all).
+            type_train (str|None): FR: Type de train (None = tous). / EN: Train type (None = all).
+
+        Returns:
+            EsquisseKLL: FR: Nouvelle esquisse (les esquisses internes ne sont pas modifiées). / EN: New sketch (internal sketches are left unchanged).
+        """
+        # FR: Une suppression isolée ne peut pas être retirée d'une esquisse : on reconstruit le dépôt
+        # EN: A single removal cannot be taken out of a sketch: rebuild the depot
+        for nom in list(self.esquisses_perimees):
+            for cle in [cle for cle in self.esquisses if cle[0] == nom]:
+                del self.esquisses[cle]
+            for _, debut, _, train in self.depots.get(nom, {}).get("occupation", []):
+                self._esquisse(nom, train.type).ajouter(max(0, (debut - train.arrivee).total_seconds() / 60))
+            self.esquisses_perimees.discard(nom)
+        resultat = EsquisseKLL()
+        for (nom, type_esquisse), esquisse in self.esquisses.items():
+            if (depot is None or nom == depot) and (type_train is None or type_esquisse == type_train):
+                resultat.fusionner(esquisse)
+        return resultat
+
+    # --- Mutations des occupations (point unique pour invalider les caches) ---
+    # --- Occupation mutations (single point to invalidate caches) ---
+    def _occuper(self, depot, voie, debut, fin, train):
+        """
+        FR: Enregistre l'occupation d'une voie par un train et marque le dépôt comme modifié.
+        EN: Record a track occupation by a train and mark the depot as modified.
+        """
+        self.depots[depot]["occupation"].append((voie, debut, fin, train))
+        self._empreinte_voie(depot, (voie, debut, fin, train), 1)
+        self.depots[depot]["index"][voie].inserer(debut, fin)
+        for ressource, quantite in self._ressources_requises(train).items():
+            self.depots[depot]["ressources"][ressource].inserer(debut, fin, quantite)
+        attente = self._compter_attente(depot, train, debut, 1)
+        if depot not in self.esquisses_perimees:
+            self._esquisse(depot, train.type).ajouter(attente)
+        self.versions[depot] = self.versions.get(depot, 0) + 1
+
+    def _liberer(self, depot, entree):
+        """
+        FR: Retire une occupation (voie, debut, fin, train) d'un dépôt et marque le dépôt comme modifié.
+        EN: Remove an occupation (track, start, end, train) from a depot and mark the depot as modified.
+        """
+        voie, debut, fin, train = entree
+        self.depots[depot]["occupation"].remove(entree)
+        self._empreinte_voie(depot, entree, -1)
+        self.depots[depot]["index"][voie].retirer(debut, fin)
+        for ressource, quantite in self._ressources_requises(train).items():
+            self.depots[depot]["ressources"][ressource].retirer(debut, fin, quantite)
+        self._compter_attente(depot, train, debut, -1)
+        self.esquisses_perimees.add(depot)
+        self.versions[depot] = self.versions.get(depot, 0) + 1
+
+    def _vider_occupations(self, depot):
+        """
+        FR: Efface toutes les occupations d'un dépôt et marque le dépôt comme modifié.
+        EN: Clear all occupations of a depot and mark the depot as modified.
+        """
+        self.depots[depot]["occupation"].clear()
+        self.empreintes[depot] = [0] * len(self.depots[depot]["numeros_voies"])
+        for index_voie in self.depots[depot]["index"]:
+            index_voie.vider()
+        for index_ressource in self.depots[depot]["ressources"].values():
+            index_ressource.vider()
+        self.agregats["attente_par_depot"][depot] = 0
+        self.agregats["attente_ressources_par_depot"][depot] = 0
+        for cle in [cle for cle in self.esquisses if cle[0] == depot]:
+            del self.esquisses[cle]
+        self.esquisses_perimees.discard(depot)
+        self.versions[depot] = self.versions.get(depot, 0) + 1
+
+    def index_presence(self, depot=None, occupations=False):
+        """
+        FR: Index « présents à l'instant T » d'un dépôt (ou de tous), mis en cache selon l'empreinte.
+            occupations=False : trains sur [arrivée, départ] ; True : tuples d'occupation sur [début, fin] de voie.
+        EN: "Present at time T" index of a depot (or of all), cached against the fingerprint.
+            occupations=False: trains over [arrival, departure]; True: occupation tuples over their track [start, end].
+
+        Returns:
+            IndexIntervalles
+        """
+        cle = ("presence", depot, occupations)
+        if occupations:
+            empreinte = self.empreinte(depot)
+        else:
+            empreinte = self.empreinte_trains
+        en_cache = self.cache.get(cle)
+        if en_cache is not None and en_cache[0] == empreinte:
+            return en_cache[1]
+        if occupations:
+            depots = [depot] if depot is not None else list(self.depots)
+            index = IndexIntervalles(
+                (entree[1], entree[2], entree) for nom in depots for entree in self.depots[nom]["occupation"]
+            )
+        else:
+            index = IndexIntervalles(
+                (train.arrivee, train.depart, train) for train in self.trains if depot is None or train.depot == depot
+            )
+        self.cache[cle] = (empreinte, index)
+        return index
+
+    def taux_occupation(self, depot, debut, fin, voie=None):
+        """
+        FR: Taux d'occupation (%) d'un dépôt ou d'une de ses voies sur la fenêtre [debut, fin],
+            calculé en O(log n) par voie grâce aux sommes préfixes.
+        EN: Occupancy rate (%) of a depot or one of its tracks over the window [debut, fin],
+            computed in O(log n) per track using prefix sums.
+
+        Args:
+            depot (str): FR: Nom du dépôt. / EN: Depot name.
+            debut (datetime): FR: Début de la fenêtre. / EN: Window start.
+            fin (datetime): FR: Fin de la fenêtre. / EN: Window end.
+            voie (int|None): FR: Index de voie (optionnel, sinon tout le dépôt). / EN: Track index (optional, otherwise the whole depot).
+
+        Returns:
+            float: FR: Pourcentage d'occupation. / EN: Occupation percentage.
+        """
+        if fin <= debut:
+            return 0
+        index = self.depots[depot]["index"]
+        voies = index if voie is None else [index[voie]]
+        if not voies:
+            return 0
+        occupe = sum(index_voie.temps_occupe(debut, fin) for index_voie in voies)
+        return round(occupe / ((fin - debut).total_seconds() * len(voies)) * 100, 2)
+
+    def definir_ressources(self, depot, capacites):
+        """
+        FR: Fixe la taille des pools de ressources d'un dépôt puis replace tous les trains.
+        EN: Set the size of a depot's resource pools, then re-place every train.
+
+        Args:
+            depot (str): FR: Nom du dépôt. / EN: Depot name.
+            capacites (dict): FR: {"test_drivers": n, "locomotives": m}, None = illimité. / EN: {"test_drivers": n, "locomotives": m}, None = unlimited.
+
+        Returns:
+            str|None: FR: Message d'erreur si échec, sinon None. / EN: Error message if failed, else None.
+        """
+        if depot not in self.depots:
+            return f"Dépôt {depot} inconnu."
+        ressources = self.depots[depot]["ressources"]
+        for ressource, capacite in capacites.items():
+            if ressource in ressources:
+                ressources[ressource].capacite = capacite
+        self.recalculer()
+        return None
+
+    def _debut_ressources(self, depot, train, debut):
+        """
+        FR: Premier début >= `debut` pour lequel toutes les ressources du train sont libres jusqu'au départ.
+        EN: Earliest start >= `debut` at which all of the train's resources are free until departure.
+
+        Returns:
+            datetime|None: FR: None si les pools ne peuvent jamais servir le train. / EN: None if the pools can never serve the train.
+        """
+        requises = self._ressources_requises(train)
+        ressources = self.depots[depot]["ressources"]
+        while True:
+            precedent = debut
+            for ressource, quantite in requises.items():
+                debut = ressources[ressource].premier_debut_possible(debut, train.depart, quantite)
+                if debut is None:
+                    return None
+            if debut == precedent:
+                return debut
+
+    def chercher_placement(self, train, depot, optimiser=False):
+        """
+        FR: Cherche une voie et un début où la voie ET les ressources du dépôt sont libres.
+            Alterne recherche de voie et recherche de ressources jusqu'à un point fixe (les deux ne font qu'avancer le début).
+        EN: Find a track and a start where both the track AND the depot resources are free.
+            Alternates track search and resource search until a fixed point (both only move the start forward).
+
+        Returns:
+            tuple: FR: (index_voie, debut, debut_voie) où debut_voie est le début possible sans contrainte de ressources.
+                       (None, None, debut_voie) si les ressources manquent, (None, None, None) si aucune voie.
+                   EN: (track_index, start, track_start) where track_start is the start possible without resource constraint.
+                       (None, None, track_start) if resources are short, (None, None, None) if no track.
+        """
+        depot_data = self.depots[depot]
+        occupation = depot_data["occupation"]
+        longueurs_voies = depot_data["longueurs_voies"]
+        voie, debut = self.chercher_voie_disponible(train, train.arrivee, occupation, longueurs_voies, optimiser)
+        debut_voie = debut
+        while voie is not None:
+            debut_ressources = self._debut_ressources(depot, train, debut)
+            if debut_ressources is None:
+                return None, None, debut_voie
+            if debut_ressources == debut:
+                break
+            voie, debut = self.chercher_voie_disponible(train, debut_ressources, occupation, longueurs_voies, optimiser)
+        return voie, debut, debut_voie
 
     def ajouter_train(self, train, depot, optimiser=False, ajouter_a_liste=True):
         """
@@ -215,32 +669,34 @@ class Simulation:
                         debut_possible = max(occ[2] for occ in conflits) + timedelta(minutes=self.delai_securite)
                     else:
                         break
-                if debut_possible > train.arrivee:
-                    train.en_attente = True
-                    train.debut_attente = train.arrivee
-                    train.fin_attente = debut_possible
-                else:
-                    train.en_attente = False
-                    train.debut_attente = train.arrivee
-                    train.fin_attente = debut_possible
-                train.voie = voie9_idx
-                occupation.append((voie9_idx, debut_possible, train.depart, train))
-                if ajouter_a_liste:
-                    self.trains.append(train)
-                    self.trains.sort(key=lambda t: t.arrivee)
-                    self.historique.append({
-                        "action": "ajout",
-                        "train_id": train.id,
-                        "etat_avant": None,
-                        "etat_apres": train.__dict__.copy()
-                    })
-                return
+                # FR: Voie 9 seulement si les ressources sont libres sur ce créneau
+                # EN: Track 9 only if resources are free for this slot
+                if self._debut_ressources(depot, train, debut_possible) == debut_possible:
+                    if debut_possible > train.arrivee:
+                        train.en_attente = True
+                        train.debut_attente = train.arrivee
+                        train.fin_attente = debut_possible
+                    else:
+                        train.en_attente = False
+                        train.debut_attente = train.arrivee
+                        train.fin_attente = debut_possible
+                    train.voie = voie9_idx
+                    train.attente_ressources = 0
+                    self._occuper(depot, voie9_idx, debut_possible, train.depart, train)
+                    if ajouter_a_liste:
+                        self._enregistrer_train(train)
+                        self.trains.sort(key=lambda t: t.arrivee)
+                        self.historique.append({
+                            "action": "ajout",
+                            "train_id": train.id,
+                            "etat_avant": None,
+                            "etat_apres": train.__dict__.copy()
+                        })
+                    return
 
         # FR: Sinon, chercher la meilleure voie et le meilleur créneau
         # EN: Otherwise, find the best track and slot
-        meilleure_voie, meilleur_debut = self.chercher_voie_disponible(
-            train, train.arrivee, occupation, longueurs_voies, optimiser
-        )
+        meilleure_voie, meilleur_debut, debut_voie = self.chercher_placement(train, depot, optimiser)
         if meilleure_voie is not None:
             if meilleur_debut > train.arrivee:
                 train.en_attente = True
@@ -251,9 +707,10 @@ class Simulation:
                 train.debut_attente = train.arrivee
                 train.fin_attente = meilleur_debut
             train.voie = meilleure_voie
-            occupation.append((meilleure_voie, meilleur_debut, train.depart, train))
+            train.attente_ressources = max(0, (meilleur_debut - debut_voie).total_seconds() / 60)
+            self._occuper(depot, meilleure_voie, meilleur_debut, train.depart, train)
             if ajouter_a_liste:
-                self.trains.append(train)
+                self._enregistrer_train(train)
                 self.trains.sort(key=lambda t: t.arrivee)
                 self.historique.append({
                     "action": "ajout",
@@ -269,7 +726,7 @@ class Simulation:
         train.debut_attente = train.arrivee
         train.fin_attente = None
         if ajouter_a_liste:
-            self.trains.append(train)
+            self._enregistrer_train(train)
             self.trains.sort(key=lambda t: t.arrivee)
             self.historique.append({
                                 "action": "ajout",
@@ -278,46 +735,109 @@ class Simulation:
                                 "etat_apres": train.__dict__.copy()
                             })
             self.recalculer()
+        if debut_voie is not None:
+            return "Ressources insuffisantes (conducteurs de test ou locomotives) dans le dépôt."
         return "Le train n'a pas pu être placé dans le dépôt."
-    
-    def gerer_voie_9(self, train, occupation, numeros_voies, longueurs_voies):
-        """
-        FR: Gère le placement d'un train électrique sur la voie 9 (Glostrup).
-        EN: Handle placement of an electric train on track 9 (Glostrup).
 
-        Args:
-            train (Train): FR: Le train à placer. / EN: Train to place.
-            occupation (list): FR: Occupations actuelles. / EN: Current occupations.
-            numeros_voies (list): FR: Numéros des voies. / EN: Track numbers.
-            longueurs_voies (list): FR: Longueurs des voies. / EN: Track lengths.
+    def ajouter_trains(self, trains, optimiser=False, recalcul=True):
+        """
+        FR: Ajoute un lot de trains (import) avec un seul recalcul au lieu d'un recalcul par train.
+            Chaque train garde son entrée d'historique ; les placements suivent les mêmes règles que recalculer.
+            recalcul=False enregistre seulement les trains : l'appelant recalcule lui-même.
+        EN: Add a batch of trains (import) with a single recalculation instead of one per train.
+            Each train keeps its own history entry; placements follow the same rules as recalculer.
+            recalcul=False only registers the trains: the caller recalculates itself.
 
         Returns:
-            bool: FR: True si placement réussi, False sinon. / EN: True if placed, False otherwise.
+            dict: FR: {id du train: message d'erreur} pour les trains refusés. / EN: {train id: error message} for rejected trains.
         """
-        voie9_idx = numeros_voies.index(9)
-        if longueurs_voies[voie9_idx] < train.longueur:
-            return False
+        refuses = {}
+        for train in trains:
+            if train.arrivee >= train.depart:
+                refuses[train.id] = "L'heure d'arrivée doit être antérieure à l'heure de départ."
+            elif train.longueur <= 0:
+                refuses[train.id] = "La longueur du train doit être positive."
+            elif train.depot not in self.depots:
+                refuses[train.id] = f"Dépôt {train.depot} inconnu."
+            else:
+                self._enregistrer_train(train)
+                self.historique.append({
+                    "action": "ajout",
+                    "train_id": train.id,
+                    "etat_avant": None,
+                    "etat_apres": train.__dict__.copy()
+                })
+        if recalcul and len(refuses) < len(trains):
+            self.trains.sort(key=lambda t: t.arrivee)
+            self.recalculer(optimiser=optimiser)
+        return refuses
 
-        debut = train.arrivee
-        while True:
-            conflit = False
-            for v, occ_debut, occ_fin, _ in occupation:
-                if v == voie9_idx and (debut - timedelta(minutes=self.delai_securite) < occ_fin and train.depart + timedelta(minutes=self.delai_securite) > occ_debut):
-                    conflit = True
-                    debut = occ_fin + timedelta(minutes=self.delai_securite)
-                    break
-            if not conflit:
-                break
+    def fusionner_trains(self, trains, optimiser=False):
+        """
+        FR: Import idempotent (upsert) : un train déjà présent (même clé naturelle) est ignoré, une ligne de même
+            identité (nom, dépôt, arrivée) mais d'horaire ou de composition différents met à jour le train existant,
+            les autres sont ajoutés. Détection en O(1) par train grâce aux index ; un seul recalcul pour le lot.
+            Une modification qui empêche de placer un train jusque-là placé est annulée et signalée dans "refuses".
+        EN: Idempotent import (upsert): a train already present (same natural key) is skipped, a row with the same
+            identity (name, depot, arrival) but a different schedule or composition updates the existing train,
+            the others are added. O(1) detection per train through the indexes; a single recalculation for the batch.
+            A change that leaves a previously placed train unplaced is rolled back and reported in "refuses".
 
-        duree = (train.depart - train.arrivee)
-        if debut + duree <= train.depart:
-            train.en_attente = (debut != train.arrivee)
-            train.fin_attente = debut
-            train.voie = voie9_idx
-            occupation.append((voie9_idx, debut, train.depart, train))
-            self.trains.append(train)
-            return True
-        return False
+        Returns:
+            dict: FR: {"ajoutes", "modifies", "doublons": nombres, "refuses": {id: message}}.
+                  EN: {"ajoutes", "modifies", "doublons": counts, "refuses": {id: message}}.
+        """
+        nouveaux, vus, modifications, doublons = [], set(), [], 0
+        for train in trains:
+            cle = self.cle_naturelle(train)
+            if cle in self.index_naturel or cle in vus:
+                doublons += 1
+                continue
+            vus.add(cle)
+            existants = self.index_identite.get(self.cle_identite(train)) if train.nom else None
+            if not existants or train.depart <= train.arrivee or train.longueur <= 0:
+                nouveaux.append(train)
+                continue
+            existant = existants[0]
+            etat_avant = existant.__dict__.copy()
+            self._compter_train(existant, -1)
+            for attribut in ("depart", "wagons", "locomotives", "type", "electrique", "locomotive_cote"):
+                setattr(existant, attribut, getattr(train, attribut))
+            existant.longueur = existant.calculer_longueur()
+            self._compter_train(existant, 1)
+            modifications.append((train.id, existant, etat_avant))
+        refuses = self.ajouter_trains(nouveaux, optimiser=optimiser, recalcul=False) if nouveaux else {}
+        ajoutes = len(nouveaux) - len(refuses)
+        if not (ajoutes or modifications):
+            return {"ajoutes": 0, "modifies": 0, "doublons": doublons, "refuses": refuses}
+        # FR: Un seul placement pour les ajouts et les modifications / EN: A single placement for additions and changes
+        self.trains.sort(key=lambda t: t.arrivee)
+        self.recalculer(optimiser=optimiser)
+        # FR: Comme modifier_train : un train qui ne peut plus être placé retrouve son état précédent
+        # EN: Like modifier_train: a train that can no longer be placed gets its previous state back
+        annules = [(ligne, existant, etat_avant) for ligne, existant, etat_avant in modifications
+                   if existant.voie is None and etat_avant.get("voie") is not None]
+        for ligne, existant, etat_avant in annules:
+            self._compter_train(existant, -1)
+            for k, v in etat_avant.items():
+                setattr(existant, k, v)
+            self._compter_train(existant, 1)
+            refuses[ligne] = "Modification impossible : conflit détecté."
+        if annules:
+            self.trains.sort(key=lambda t: t.arrivee)
+            self.recalculer(optimiser=optimiser)
+        modifies = 0
+        for ligne, existant, etat_avant in modifications:
+            if ligne in refuses:
+                continue
+            self.historique.append({
+                "action": "modification",
+                "train_id": existant.id,
+                "etat_avant": etat_avant,
+                "etat_apres": existant.__dict__.copy()
+            })
+            modifies += 1
+        return {"ajoutes": ajoutes, "modifies": modifies, "doublons": doublons, "refuses": refuses}
 
     def chercher_voie_disponible(self, train, ref, occupation, longueurs_voies, optimiser):
         """
@@ -361,9 +881,12 @@ class Simulation:
         FR: Réinitialise la simulation : efface toutes les occupations et tous les trains.
         EN: Reset the simulation: clear all occupations and trains.
         """
-        for depot in self.depots.values():
-            depot["occupation"].clear()
+        for depot in self.depots:
+            self._vider_occupations(depot)
         self.trains.clear()
+        self.agregats = self._agregats_vides()
+        self.empreinte_trains = 0
+        self.index_naturel, self.index_identite = {}, {}
 
     def recalculer(self, optimiser=False):
         """
@@ -376,8 +899,8 @@ class Simulation:
             optimiser (bool): FR: Si True, cherche le meilleur créneau possible. / EN: If True, search for best slot.
         """
         # FR: Réinitialiser les occupations / EN: Reset occupations
-        for depot in self.depots.values():
-            depot["occupation"].clear()
+        for depot in self.depots:
+            self._vider_occupations(depot)
 
         # FR: Réinitialiser les voies des trains / EN: Reset train tracks
         for train in self.trains:
@@ -385,6 +908,7 @@ class Simulation:
             train.en_attente = False
             train.debut_attente = train.arrivee
             train.fin_attente = None
+            train.attente_ressources = 0
 
         # FR: Replacer les trains dans chaque dépôt / EN: Re-place trains in each depot
         for depot_nom in self.depots:
@@ -424,38 +948,178 @@ class Simulation:
         if priorite_voie_9 and 9 in numeros_voies:
             voie9_idx = numeros_voies.index(9)
             if longueurs_voies[voie9_idx] >= train.longueur:
-                if not verifier_conflit(voie9_idx, train.arrivee, train.depart, occupation, self.delai_securite):
+                if (not verifier_conflit(voie9_idx, train.arrivee, train.depart, occupation, self.delai_securite)
+                        and self._debut_ressources(depot, train, train.arrivee) == train.arrivee):
                     train.voie = voie9_idx
                     train.fin_attente = train.arrivee
-                    occupation.append((voie9_idx, train.arrivee, train.depart, train))
+                    self._occuper(depot, voie9_idx, train.arrivee, train.depart, train)
                     return
     
         # FR: Sinon, chercher une autre voie disponible / EN: Otherwise, find another available track
-        meilleure_voie, meilleur_debut = self.chercher_voie_disponible(train, train.arrivee, occupation, longueurs_voies, optimiser)
+        meilleure_voie, meilleur_debut, debut_voie = self.chercher_placement(train, depot, optimiser)
         if meilleure_voie is not None:
             train.voie = meilleure_voie
             train.fin_attente = meilleur_debut
-            occupation.append((meilleure_voie, meilleur_debut, train.depart, train))
+            train.attente_ressources = max(0, (meilleur_debut - debut_voie).total_seconds() / 60)
+            self._occuper(depot, meilleure_voie, meilleur_debut, train.depart, train)
         else:
             train.en_attente = True
 
-    def ajouter_train_multi_depot(self, train, optimiser=False):
+    # --- Proximité des dépôts (débordement) / Depot proximity (overflow) ---
+    def matrice_distances(self):
+        """
+        FR: Distances de haversine (km) entre tous les dépôts géolocalisés, calculées d'un bloc (NumPy)
+            et mises en cache selon leurs coordonnées.
+        EN: Haversine distances (km) between every geolocated depot, computed in one block (NumPy)
+            and cached against their coordinates.
+
+        Returns:
+            tuple: FR: (noms des dépôts, matrice n × n des distances). / EN: (depot names, n × n distance matrix).
         """
-        FR: Essaye d'abord dans le dépôt d'origine, puis dans les autres dépôts si besoin.
-        EN: Try first in the original depot, then in other depots if needed.
+        positions = tuple(
+            (nom, d["lat"], d["lon"]) for nom, d in self.depots.items()
+            if d.get("lat") is not None and d.get("lon") is not None
+        )
+        en_cache = self.cache.get(("distances",))
+        if en_cache is not None and en_cache[0] == positions:
+            return en_cache[1]
+        lat = np.radians([p[1] for p in positions])
+        lon = np.radians([p[2] for p in positions])
+        a = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+             + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2)
+        resultat = ([p[0] for p in positions], 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1))))
+        self.cache[("distances",)] = (positions, resultat)
+        return resultat
+
+    def depots_proches(self, depot, k=None):
+        """
+        FR: Autres dépôts classés par temps de transfert depuis `depot` (distance / vitesse_transfert).
+            Avec k, seuls les k plus proches sont sélectionnés (argpartition) puis triés.
+            Les dépôts sans coordonnées viennent ensuite, dans l'ordre de configuration.
+        EN: Other depots ranked by transfer time from `depot` (distance / vitesse_transfert).
+            With k, only the k nearest are selected (argpartition), then sorted.
+            Depots without coordinates come next, in configuration order.
+
+        Returns:
+            list[tuple]: FR: (dépôt, distance en km, temps de transfert) ; None si inconnus.
+                         EN: (depot, distance in km, transfer time); None when unknown.
+        """
+        noms, distances = self.matrice_distances()
+        sans_position = [(nom, None, None) for nom in self.depots if nom != depot and nom not in noms]
+        if depot not in noms:
+            classement = [(nom, None, None) for nom in noms if nom != depot] + sans_position
+            return classement[:k] if k is not None else classement
+        i = noms.index(depot)
+        ligne = distances[i].copy()
+        ligne[i] = np.inf  # FR: Exclut le dépôt lui-même / EN: Excludes the depot itself
+        candidats = np.arange(len(noms))
+        if k is not None and k < len(noms) - 1:
+            candidats = np.argpartition(ligne, k)[:k]
+        candidats = candidats[np.argsort(ligne[candidats], kind="stable")]
+        classement = [
+            (noms[j], float(ligne[j]), timedelta(hours=float(ligne[j]) / self.vitesse_transfert))
+            for j in candidats if j != i
+        ] + sans_position
+        return classement[:k] if k is not None else classement
+
+    def ajouter_train_multi_depot(self, train, optimiser=False, k=None):
+        """
+        FR: Essaye d'abord dans le dépôt d'origine, puis dans les autres dépôts du plus proche au plus éloigné
+            (limité aux k plus proches si k est donné). Dans un dépôt de repli, l'arrivée est décalée du temps
+            de transfert ; un dépôt atteint après le départ du train est écarté.
+        EN: Try first in the original depot, then in the other depots from nearest to farthest
+            (limited to the k nearest when k is given). In a fallback depot, the arrival is shifted by the
+            transfer time; a depot reached after the train's departure is skipped.
         """
         erreur = self.ajouter_train(train, train.depot, optimiser=optimiser)
         if not erreur:
             return None
-        # FR: Sinon, tente dans les autres dépôts / EN: Otherwise, try in other depots
-        for depot in self.depots:
-            if depot != train.depot:
-                erreur2 = self.ajouter_train(train, depot, optimiser=optimiser)
-                if not erreur2:
-                    train.depot = depot
-                    return None
+        # FR: Sinon, tente dans les autres dépôts (le train est déjà dans la liste)
+        # EN: Otherwise, try in other depots (the train is already in the list)
+        depot_avant, arrivee = train.depot, train.arrivee
+        for depot, _, transfert in self.depots_proches(depot_avant, k):
+            if depot == depot_avant:
+                continue
+            # FR: Sans coordonnées, le temps de transfert est inconnu : pas de décalage
+            # EN: Without coordinates the transfer time is unknown: no shift
+            arrivee_depot = arrivee + transfert if transfert is not None else arrivee
+            if arrivee_depot >= train.depart:
+                continue
+            # FR: Dépôt et arrivée décalée fixés avant le placement (empreintes calculées sur l'état final),
+            #     rétablis si le dépôt refuse le train
+            # EN: Depot and shifted arrival set before placement (fingerprints hashed on the final state),
+            #     restored if the depot rejects the train
+            self._changer_depot(train, depot, arrivee_depot)
+            if not self.ajouter_train(train, depot, optimiser=optimiser, ajouter_a_liste=False):
+                return None
+            self._changer_depot(train, depot_avant, arrivee)
         return "Aucun dépôt ne peut accueillir ce train."
 
+    def modifier_train(self, train_id, arrivee, depart):
+        """
+        FR: Modifie les horaires d'un train, replace tous les trains et l'enregistre dans l'historique.
+            L'ancien état est restauré si le train ne peut plus être placé. L'arrivée saisie devient celle
+            de la clé naturelle (arrivee_origine d'un débordement est effacée) ; le dépôt importé est conservé.
+        EN: Change a train's schedule, re-place every train and record it in the history.
+            The previous state is restored if the train can no longer be placed. The entered arrival becomes
+            the natural-key one (an overflow's arrivee_origine is cleared); the imported depot is kept.
+
+        Returns:
+            str|None: FR: Message d'erreur si échec, sinon None. / EN: Error message if failed, else None.
+        """
+        train = next((t for t in self.trains if t.id == train_id), None)
+        if train is None:
+            return "Train inconnu."
+        if arrivee >= depart:
+            return "L'heure d'arrivée doit être antérieure à l'heure de départ."
+        etat_avant = train.__dict__.copy()
+        self._compter_train(train, -1)
+        train.arrivee = arrivee
+        train.depart = depart
+        train.__dict__.pop("arrivee_origine", None)
+        self._compter_train(train, 1)
+        self.trains.sort(key=lambda t: t.arrivee)
+        self.recalculer(optimiser=True)
+        if train.voie is None:
+            self._compter_train(train, -1)
+            for k, v in etat_avant.items():
+                setattr(train, k, v)
+            self._compter_train(train, 1)
+            self.trains.sort(key=lambda t: t.arrivee)
+            self.recalculer()
+            return "Modification impossible : conflit détecté."
+        self.historique.append({
+            "action": "modification",
+            "train_id": train.id,
+            "etat_avant": etat_avant,
+            "etat_apres": train.__dict__.copy()
+        })
+        return None
+
+    def supprimer_train(self, train_id):
+        """
+        FR: Supprime un train de tous les dépôts et de la liste, l'enregistre dans l'historique puis recalcule.
+        EN: Remove a train from every depot and from the list, record it in the history, then recalculate.
+
+        Returns:
+            str|None: FR: Message d'erreur si le train est inconnu, sinon None. / EN: Error message if the train is unknown, else None.
+        """
+        train_suppr = next((train for train in self.trains if train.id == train_id), None)
+        if train_suppr is None:
+            return "Train inconnu."
+        for depot, depot_data in self.depots.items():
+            for entree in [occ for occ in depot_data["occupation"] if occ[3].id == train_id]:
+                self._liberer(depot, entree)
+        self._retirer_train(train_suppr)
+        self.historique.append({
+            "action": "suppression",
+            "train_id": train_id,
+            "etat_avant": train_suppr.__dict__.copy(),
+            "etat_apres": None
+        })
+        self.recalculer()
+        return None
+
     def undo(self):
         """
         FR: Annule la dernière action (ajout, suppression, modification).
@@ -466,19 +1130,22 @@ class Simulation:
         last = self.historique.pop()
         if last["action"] == "ajout":
             # FR: Supprimer le train ajouté / EN: Remove the added train
-            self.trains = [t for t in self.trains if t.id != last["train_id"]]
+            for train in [t for t in self.trains if t.id == last["train_id"]]:
+                self._retirer_train(train)
         elif last["action"] == "suppression":
             # FR: Restaurer le train supprimé / EN: Restore the removed train
             from copy import deepcopy
             train = Train(**{k: v for k, v in last["etat_avant"].items() if k in Train.__init__.__code__.co_varnames})
             for k, v in last["etat_avant"].items():
                 setattr(train, k, v)
-            self.trains.append(train)
+            self._enregistrer_train(train)
         elif last["action"] == "modification":
             # FR: Restaurer l'état avant modification / EN: Restore state before modification
             train = next((t for t in self.trains if t.id == last["train_id"]), None)
             if train:
+                self._compter_train(train, -1)
                 for k, v in last["etat_avant"].items():
                     setattr(train, k, v)
+                self._compter_train(train, 1)
         self.recalculer()
         return None
\ No newline at end of file
@@ -5,6 +5,8 @@ Created on Fri May  2 10:59:53 2025
 @author: andre
 """
 from datetime import timedelta
+import numpy as np
+import pandas as pd
 from Traduction import t, get_translation
 
 def calculer_temps_attente(train):
@@ -53,10 +55,287 @@ def calculer_taux_occupation(occupation, numeros_voies):
 
     return round((duree_occupee / (duree_totale * nb_voies)) * 100, 2)
 
+def calculer_profil_occupation(occupation, voie=None):
+    """
+    FR : Calcule par balayage (sweep-line) le profil de concurrence des occupations en O(n log n) :
+         nombre de voies occupées et longueur occupée au cours du temps.
+    EN : Compute the occupation concurrency profile with a sweep line in O(n log n):
+         number of occupied tracks and occupied length over time.
+    Args:
+        FR : occupation: Liste des tuples (voie, début, fin, train)
+        EN : occupation: List of tuples (track, start, end, train)
+        voie:
+            FR : Index de voie à isoler (optionnel, sinon tout le dépôt)
+            EN : Track index to isolate (optional, otherwise the whole depot)
+    Returns:
+        FR : Dictionnaire de fonctions en escalier ; la valeur i est valable sur [temps[i], temps[i+1])
+        EN : Dictionary of step functions; value i holds on [temps[i], temps[i+1])
+    """
+    # Les occupations de durée nulle ou inversées n'occupent rien
+    # Zero-length or inverted occupations occupy nothing
+    occs = [occ for occ in occupation if (voie is None or occ[0] == voie) and occ[2] > occ[1]]
+    if not occs:
+        return {
+            "temps": np.array([], dtype="datetime64[s]"),
+            "voies_occupees": np.array([], dtype=np.int64),
+            "longueur_occupee": np.array([], dtype=np.int64),
+        }
+    debuts = np.array([debut for _, debut, _, _ in occs], dtype="datetime64[s]")
+    fins = np.array([fin for _, _, fin, _ in occs], dtype="datetime64[s]")
+    longueurs = np.array([train.longueur for _, _, _, train in occs], dtype=np.int64)
+    un = np.ones(len(occs), dtype=np.int64)
+
+    temps = np.concatenate([debuts, fins])
+    deltas = np.concatenate([un, -un])
+    deltas_longueur = np.concatenate([longueurs, -longueurs])
+
+    # Tri des événements ; à instant égal, les fins passent avant les débuts
+    # Sort events; at equal times, ends come before starts
+    ordre = np.lexsort((deltas, temps))
+    temps = temps[ordre]
+    voies_occupees = np.cumsum(deltas[ordre])
+    longueur_occupee = np.cumsum(deltas_longueur[ordre])
+
+    # Ne garde que l'état final de chaque instant
+    # Keep only the final state of each instant
+    dernier = np.r_[temps[1:] != temps[:-1], True]
+    return {
+        "temps": temps[dernier],
+        "voies_occupees": voies_occupees[dernier],
+        "longueur_occupee": longueur_occupee[dernier],
+    }
+
+def profil_occupation(simulation, depot, voie=None):
+    """
+    FR : Retourne le profil d'occupation d'un dépôt (ou d'une voie), mis en cache selon l'empreinte du dépôt.
+    EN : Return the occupation profile of a depot (or a track), cached against the depot fingerprint.
+    """
+    cle = ("profil", depot, voie)
+    empreinte = simulation.empreinte(depot)
+    en_cache = simulation.cache.get(cle)
+    if en_cache is not None and en_cache[0] == empreinte:
+        return en_cache[1]
+    profil = calculer_profil_occupation(simulation.depots[depot]["occupation"], voie)
+    simulation.cache[cle] = (empreinte, profil)
+    return profil
+
+def integrer_profil(profil, instants, serie="voies_occupees"):
+    """
+    FR : Intègre un profil d'occupation jusqu'à chaque instant donné (vectorisé avec NumPy).
+    EN : Integrate an occupation profile up to each given instant (vectorised with NumPy).
+    Args:
+        FR : instants: Tableau datetime64 trié (par ex. les bornes de classes d'une heatmap)
+        EN : instants: Sorted datetime64 array (e.g. heatmap bin edges)
+    Returns:
+        FR : Tableau des intégrales (valeur × secondes) depuis le premier événement
+        EN : Array of integrals (value × seconds) since the first event
+    """
+    temps = profil["temps"]
+    instants = np.asarray(instants, dtype="datetime64[s]")
+    if len(temps) == 0:
+        return np.zeros(len(instants))
+    valeurs = profil[serie].astype(np.float64)
+    durees = np.diff(temps).astype(np.float64)
+    cumul = np.concatenate([[0.0], np.cumsum(valeurs[:-1] * durees)])
+    k = np.searchsorted(temps, instants, side="right") - 1
+    avant = k < 0
+    k = np.clip(k, 0, None)
+    integrales = cumul[k] + valeurs[k] * (instants - temps[k]).astype(np.float64)
+    integrales[avant] = 0.0
+    return integrales
+
+def calculer_matrice_utilisation(simulation, pas="hour"):
+    """
+    FR : Calcule la matrice d'utilisation (%) dépôt × heure (ou jour) sur toute l'étendue des occupations,
+         par intégration vectorisée des profils (pas de boucle sur les trains). Mise en cache selon l'état.
+    EN : Compute the depot × hour (or day) utilisation matrix (%) over the whole occupation span,
+         by vectorised integration of the profiles (no per-train loop). Cached against the state.
+    Returns:
+        FR : Tuple (liste des dépôts, bornes des classes en datetime64, matrice n_depots × n_classes)
+        EN : Tuple (list of depots, bin edges as datetime64, n_depots × n_classes matrix)
+    """
+    cle = ("matrice_utilisation", pas)
+    empreinte = tuple(simulation.empreinte(depot) for depot in simulation.depots)
+    en_cache = simulation.cache.get(cle)
+    if en_cache is not None and en_cache[0] == empreinte:
+        return en_cache[1]
+
+    depots = list(simulation.depots)
+    profils = [profil_occupation(simulation, depot) for depot in depots]
+    temps = [profil["temps"] for profil in profils if len(profil["temps"])]
+    if not temps:
+        resultat = (depots, np.array([], dtype="datetime64[s]"), np.zeros((len(depots), 0)))
+    else:
+        unite = "h" if pas == "hour" else "D"
+        debut = min(t[0] for t in temps).astype(f"datetime64[{unite}]")
+        fin = max(t[-1] for t in temps).astype(f"datetime64[{unite}]") + np.timedelta64(1, unite)
+        bornes = np.arange(debut, fin + np.timedelta64(1, unite), np.timedelta64(1, unite)).astype("datetime64[s]")
+        largeurs = np.diff(bornes).astype(np.float64)
+        matrice = np.zeros((len(depots), len(bornes) - 1))
+        for i, (depot, profil) in enumerate(zip(depots, profils)):
+            nb_voies = len(simulation.depots[depot]["numeros_voies"])
+            if nb_voies:
+                matrice[i] = np.diff(integrer_profil(profil, bornes)) / (largeurs * nb_voies) * 100
+        resultat = (depots, bornes, matrice.round(1))
+    simulation.cache[cle] = (empreinte, resultat)
+    return resultat
+
+def interroger_profil(profil, debut, fin):
+    """
+    FR : Résume un profil d'occupation sur la fenêtre [debut, fin].
+    EN : Summarise an occupation profile over the window [debut, fin].
+    Returns:
+        FR : Pic et moyenne pondérée dans le temps des voies occupées et de la longueur occupée
+        EN : Peak and time-weighted mean of occupied tracks and occupied length
+    """
+    resultat = {"pic_voies": 0, "voies_moyennes": 0.0, "pic_longueur": 0, "longueur_moyenne": 0.0}
+    temps = profil["temps"]
+    debut = np.datetime64(debut, "s")
+    fin = np.datetime64(fin, "s")
+    if fin <= debut or len(temps) == 0:
+        return resultat
+
+    # Segments de la fonction en escalier recoupant la fenêtre
+    # Step-function segments overlapping the window
+    i0 = np.searchsorted(temps, debut, side="right") - 1
+    i1 = np.searchsorted(temps, fin, side="left")
+    bornes = np.concatenate([[debut], temps[i0 + 1:i1], [fin]])
+    durees = np.diff(bornes).astype(np.float64)
+
+    for cle_pic, cle_moy, serie in (
+        ("pic_voies", "voies_moyennes", profil["voies_occupees"]),
+        ("pic_longueur", "longueur_moyenne", profil["longueur_occupee"]),
+    ):
+        valeurs = np.concatenate([[serie[i0] if i0 >= 0 else 0], serie[i0 + 1:i1]])
+        resultat[cle_pic] = int(valeurs.max())
+        resultat[cle_moy] = round(float((valeurs * durees).sum() / durees.sum()), 2)
+    return resultat
+
+def periodes_saturation(profil, nb_voies, debut=None, fin=None):
+    """
+    FR : Liste les périodes où toutes les voies du dépôt sont occupées.
+    EN : List the periods during which every track of the depot is occupied.
+    Returns:
+        FR : Liste de tuples (début, fin) en datetime, limitée à la fenêtre si fournie
+        EN : List of (start, end) datetime tuples, clipped to the window if given
+    """
+    temps = profil["temps"]
+    if len(temps) == 0 or nb_voies <= 0:
+        return []
+    sature = (profil["voies_occupees"] >= nb_voies).astype(np.int8)
+    transitions = np.diff(np.r_[0, sature])
+    debuts = temps[transitions == 1]
+    # Le dernier état est toujours 0 : chaque saturation a une fin
+    # The last state is always 0: every saturation has an end
+    fins = temps[np.flatnonzero(transitions == -1)]
+    if debut is not None:
+        debut = np.datetime64(debut, "s")
+        garder = fins > debut
+        debuts, fins = np.maximum(debuts[garder], debut), fins[garder]
+    if fin is not None:
+        fin = np.datetime64(fin, "s")
+        garder = debuts < fin
+        debuts, fins = debuts[garder], np.minimum(fins[garder], fin)
+    return list(zip(debuts.astype(object), fins.astype(object)))
+
+# Quantiles d'attente affichés (p50, p90, p95, p99)
+# Displayed waiting-time quantiles (p50, p90, p95, p99)
+QUANTILES_ATTENTE = (0.5, 0.9, 0.95, 0.99)
+
+def resumer_esquisse(esquisse):
+    """
+    FR : Résume une esquisse d'attente : nombre de trains et quantiles p50/p90/p95/p99 (en minutes).
+    EN : Summarise a waiting-time sketch: train count and p50/p90/p95/p99 quantiles (in minutes).
+    """
+    resume = {"trains": esquisse.n}
+    for q, valeur in zip(QUANTILES_ATTENTE, esquisse.quantiles(QUANTILES_ATTENTE)):
+        resume[f"p{int(q * 100)}"] = round(valeur, 1) if valeur is not None else None
+    return resume
+
+def calculer_percentiles_attente(simulation):
+    """
+    FR : Calcule les quantiles d'attente par dépôt, par type de train et au global, en fusionnant les esquisses KLL.
+    EN : Compute waiting-time quantiles per depot, per train type and overall, by merging the KLL sketches.
+    Returns:
+        FR : Dictionnaire {"par_depot", "par_type", "global"}
+        EN : Dictionary {"par_depot", "par_type", "global"}
+    """
+    types = sorted({type_train for _, type_train in simulation.esquisses} | set(simulation.agregats["trains_par_type"]))
+    return {
+        "par_depot": {depot: resumer_esquisse(simulation.esquisse_attente(depot=depot)) for depot in simulation.depots},
+        "par_type": {type_train: resumer_esquisse(simulation.esquisse_attente(type_train=type_train)) for type_train in types},
+        "global": resumer_esquisse(simulation.esquisse_attente()),
+    }
+
+def calculer_histogramme_attente(simulation, depot=None, type_train=None, nb_classes=20):
+    """
+    FR : Histogramme approché des temps d'attente (min) à partir de l'esquisse, sans conserver les échantillons.
+    EN : Approximate histogram of waiting times (min) from the sketch, without keeping the samples.
+    Returns:
+        FR : Tuple (bornes des classes, effectifs)
+        EN : Tuple (bin edges, counts)
+    """
+    esquisse = simulation.esquisse_attente(depot=depot, type_train=type_train)
+    if not esquisse.n:
+        return [], []
+    maximum = esquisse.maximum if esquisse.maximum > 0 else 1
+    bornes = np.linspace(0, maximum, nb_classes + 1).tolist()
+    return bornes, esquisse.histogramme(bornes)
+
+# Durée des périodes pour les taux d'occupation par période
+# Period lengths for per-period occupancy rates
+PERIODES = {
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "shift": timedelta(hours=8),
+    "hour": timedelta(hours=1),
+}
+
+def calculer_taux_par_periode(simulation, debut, fin, periode="day"):
+    """
+    FR : Calcule le taux d'occupation de chaque dépôt par période (jour, semaine ou poste de 8 h)
+         à partir des index de sommes préfixes, sans reparcourir les occupations.
+    EN : Compute the occupancy rate of every depot per period (day, week or 8 h shift)
+         from the prefix-sum indexes, without re-scanning the occupations.
+    Returns:
+        FR : Liste de dictionnaires {"Depot", "Periode", "Taux"}
+        EN : List of dicts {"Depot", "Periode", "Taux"}
+    """
+    pas = PERIODES[periode]
+    resultats = []
+    debut_periode = debut
+    while debut_periode < fin:
+        fin_periode = min(debut_periode + pas, fin)
+        for depot in simulation.depots:
+            resultats.append({
+                "Depot": depot,
+                "Periode": debut_periode,
+                "Taux": simulation.taux_occupation(depot, debut_periode, fin_periode),
+            })
+        debut_periode = fin_periode
+    return resultats
+
+def calculer_taux_occupation_index(simulation, depots):
+    """
+    FR : Calcule le taux d'occupation d'un ou plusieurs dépôts à partir des index par voie, en O(nombre de voies).
+         Même définition que calculer_taux_occupation : durée occupée / (étendue totale * nombre de voies).
+    EN : Compute the occupation rate of one or more depots from the per-track indexes, in O(number of tracks).
+         Same definition as calculer_taux_occupation: occupied time / (total span * number of tracks).
+    """
+    index = [index_voie for depot in depots for index_voie in simulation.depots[depot]["index"]]
+    non_vides = [index_voie for index_voie in index if len(index_voie)]
+    if not non_vides:
+        return 0
+    duree_occupee = sum(index_voie.cumul[-1] for index_voie in non_vides)
+    debut = min(index_voie.debuts[0] for index_voie in non_vides)
+    fin = max(index_voie.fins[-1] for index_voie in non_vides)
+    duree_totale = (fin - debut).total_seconds()
+    return round((duree_occupee / (duree_totale * len(index))) * 100, 2)
+
 def calculer_statistiques_globales(simulation):
     """
-    FR : Calcule les statistiques globales pour la simulation.
-    EN : Compute global statistics for the simulation.
+    FR : Lit les statistiques globales tenues à jour par la simulation (sans reparcourir les trains).
+    EN : Read the global statistics kept up to date by the simulation (without re-scanning the trains).
     Args:
         simulation: 
             FR : Objet Simulation
@@ -65,33 +344,27 @@ def calculer_statistiques_globales(simulation):
         FR : Dictionnaire des statistiques
         EN : Dictionary of statistics
     """
-    trains = simulation.trains
+    agregats = simulation.agregats
     depots = simulation.depots.keys()
     stats_par_depot = {}
     for depot in depots:
-        trains_depot = [train for train in trains if train.depot == depot]
         stats_par_depot[depot] = {
-            "trains": len(trains_depot),
-            "taux_occupation": calculer_taux_occupation(
-                simulation.depots[depot]["occupation"],
-                simulation.depots[depot]["numeros_voies"]
-            )
+            "trains": agregats["trains_par_depot"].get(depot, 0),
+            "taux_occupation": calculer_taux_occupation_index(simulation, [depot])
         }
-    trains_electriques = [train for train in trains if train.electrique]
-    temps_moyen_attente = calculer_temps_moyen_attente(trains)
-    # Taux d'occupation global
-    all_occupations = []
-    all_voies = []
-    for depot in depots:
-        all_occupations += simulation.depots[depot]["occupation"]
-        all_voies += simulation.depots[depot]["numeros_voies"]
-    taux_occupation_global = calculer_taux_occupation(all_occupations, all_voies)
+    nb_trains = len(simulation.trains)
+    attente_totale = sum(agregats["attente_par_depot"].values())
+    temps_moyen_attente = round(attente_totale / nb_trains, 2) if nb_trains else 0
+    attente_ressources = sum(agregats.get("attente_ressources_par_depot", {}).values())
+    temps_moyen_attente_ressources = round(attente_ressources / nb_trains, 2) if nb_trains else 0
 
     return {
-        "total_trains": len(trains),  # Nombre total de trains / Total number of trains
-        "trains_electriques": len(trains_electriques),  # Trains électriques / Electric trains
+        "total_trains": nb_trains,  # Nombre total de trains / Total number of trains
+        "trains_electriques": agregats["trains_electriques"],  # Trains électriques / Electric trains
         "temps_moyen_attente": temps_moyen_attente,  # Temps moyen d'attente / Average waiting time
-        "taux_occupation_global": taux_occupation_global,  # Taux d'occupation global / Global occupation rate
+        "temps_moyen_attente_ressources": temps_moyen_attente_ressources,  # Part due aux ressources / Share caused by resources
+        "taux_occupation_global": calculer_taux_occupation_index(simulation, depots),  # Taux d'occupation global / Global occupation rate
+        "trains_par_type": dict(agregats["trains_par_type"]),  # Trains par type / Trains per type
         "stats_par_depot": stats_par_depot
     }
 
@@ -125,49 +398,130 @@ def calculer_requirements(trains, t, lang):
             requirements["by_depot"][train.depot]["trains"].append(train.nom)
     return requirements
 
-def regrouper_requirements_par_jour(trains, t, lang):
+# Ressources nécessaires pour chaque train de type Testing
+# Resources needed by each Testing train
+BESOINS_TESTING = {"test_drivers": 1, "locomotives": 2}
+
+def _bornes_periodes(debut, fin, periode):
+    """
+    FR : Bornes des périodes (datetime64[s]) couvrant [debut, fin], alignées sur minuit.
+    EN : Period edges (datetime64[s]) covering [debut, fin], aligned on midnight.
+    """
+    pas = np.timedelta64(int(PERIODES[periode].total_seconds()), "s")
+    origine = debut.astype("datetime64[D]").astype("datetime64[s]")
+    nb = max(1, int(np.ceil((fin - origine) / pas)))
+    return origine + pas * np.arange(nb + 1)
+
+def _pics_par_periode(profil, bornes):
+    """
+    FR : Maximum d'un profil en escalier sur chaque période [bornes[i], bornes[i+1]) (vectorisé).
+    EN : Maximum of a step profile over each period [bornes[i], bornes[i+1]) (vectorised).
+    """
+    temps = profil["temps"]
+    valeurs = profil["voies_occupees"]
+    pics = np.zeros(len(bornes) - 1, dtype=np.int64)
+    if len(temps) == 0:
+        return pics
+    # Valeur en vigueur au début de chaque période, puis à chaque événement
+    # Value in force at the start of each period, then at each event
+    k = np.searchsorted(temps, bornes[:-1], side="right") - 1
+    valeurs_bornes = np.where(k >= 0, valeurs[np.clip(k, 0, None)], 0)
+    points = np.concatenate([temps, bornes[:-1]])
+    valeurs_points = np.concatenate([valeurs, valeurs_bornes])
+    periodes = np.searchsorted(bornes, points, side="right") - 1
+    valides = (periodes >= 0) & (periodes < len(pics))
+    np.maximum.at(pics, periodes[valides], valeurs_points[valides])
+    return pics
+
+def calculer_pics_requirements(trains, periode="day"):
+    """
+    FR : Calcule la demande simultanée maximale en conducteurs de test et locomotives (trains Testing),
+         par balayage des intervalles en O(n log n) : globalement, par dépôt et par période (jour ou poste).
+    EN : Compute the peak concurrent demand for test drivers and locomotives (Testing trains)
+         with an O(n log n) interval sweep: overall, per depot and per period (day or shift).
+    Returns:
+        FR : Dictionnaire {"pic", "par_depot", "par_periode"} ; "par_periode" est une liste de lignes
+             {"Depot", "Periode", "test_drivers", "locomotives"} où Depot vaut None pour l'ensemble du réseau.
+        EN : Dictionary {"pic", "par_depot", "par_periode"}; "par_periode" is a list of rows
+             {"Depot", "Periode", "test_drivers", "locomotives"} where Depot is None for the whole network.
+    """
+    def besoins(nombre):
+        return {ressource: int(nombre) * quantite for ressource, quantite in BESOINS_TESTING.items()}
+
+    testing = [train for train in trains if train.type == "testing"]
+    resultat = {"pic": besoins(0), "par_depot": {}, "par_periode": []}
+    if not testing:
+        return resultat
+
+    groupes = {None: testing}
+    for train in testing:
+        groupes.setdefault(train.depot, []).append(train)
+    debut = np.datetime64(min(train.arrivee for train in testing), "s")
+    fin = np.datetime64(max(train.depart for train in testing), "s")
+    bornes = _bornes_periodes(debut, fin, periode)
+
+    for depot, trains_groupe in groupes.items():
+        # Les intervalles des trains sont balayés comme des occupations
+        # Train intervals are swept like occupations
+        profil = calculer_profil_occupation([(None, train.arrivee, train.depart, train) for train in trains_groupe])
+        pic = int(profil["voies_occupees"].max()) if len(profil["temps"]) else 0
+        if depot is None:
+            resultat["pic"] = besoins(pic)
+        else:
+            resultat["par_depot"][depot] = besoins(pic)
+        for debut_periode, pic_periode in zip(bornes[:-1].astype(object), _pics_par_periode(profil, bornes)):
+            if pic_periode:
+                resultat["par_periode"].append({"Depot": depot, "Periode": debut_periode, **besoins(pic_periode)})
+    return resultat
+
+# Libellés "HH:MM" des 1440 minutes d'une journée / "HH:MM" labels of the 1440 minutes of a day
+HEURES_MINUTES = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+
+def regrouper_requirements_par_jour(trains, t=None, lang=None):
     """
     FR : Regroupe les besoins en ressources par jour, en tenant compte des trains qui s'étendent sur plusieurs jours.
+         Vectorisé : chaque intervalle est éclaté en jours par arithmétique sur les indices de jour, puis agrégé par groupby.
     EN : Group resource requirements per day, considering trains spanning several days.
+         Vectorised: each interval is exploded into days with day-index arithmetic, then aggregated with groupby.
     Args:
         trains: Liste des trains / List of trains
-        t: Fonction de traduction / Translation function
-        lang: Langue / Language
+        t: Fonction de traduction (inutilisée, compatibilité) / Translation function (unused, compatibility)
+        lang: Langue (inutilisée, compatibilité) / Language (unused, compatibility)
     Returns:
-        FR : Dictionnaire avec les besoins par jour, incluant les détails des trains.
-        EN : Dictionary with requirements per day, including train details.
+        FR : DataFrame « tidy », une ligne par (jour, train) : Date, Depot, Train, Début, Fin ("--:--" si le train
+             déborde du jour) et besoins totaux du jour (test_drivers, locomotives). Vide s'il n'y a aucun train Testing.
+        EN : Tidy DataFrame, one row per (day, train): Date, Depot, Train, Début, Fin ("--:--" when the train
+             spills over the day) and the day's total needs (test_drivers, locomotives). Empty if there is no Testing train.
     """
-    requirements_par_jour = {}
+    colonnes = ["Date", "Depot", "Train", "Début", "Fin"] + list(BESOINS_TESTING)
+    testing = [train for train in trains if train.type == "testing"]
+    if not testing:
+        return pd.DataFrame(columns=colonnes)
 
-    for train in trains:
-        if train.type == "testing":
-            jour_courant = train.arrivee.date()
-            dernier_jour = train.depart.date()
-
-            # Boucle sur chaque jour couvert par le train
-            # Loop over each day covered by the train
-            while jour_courant <= dernier_jour:
-                if jour_courant not in requirements_par_jour:
-                    requirements_par_jour[jour_courant] = {
-                        "test_drivers": 0,
-                        "locomotives": 0,
-                        "details": []
-                    }
-                requirements_par_jour[jour_courant]["test_drivers"] += 1
-                requirements_par_jour[jour_courant]["locomotives"] += 2
-                # Ajoute le détail du train pour ce jour / Add train detail for this day
-                requirements_par_jour[jour_courant]["details"].append({
-                    "train_name": train.nom,
-                    "start_time": train.arrivee.strftime("%H:%M") if train.arrivee.date() == jour_courant else "--:--",
-                    "end_time": train.depart.strftime("%H:%M") if train.depart.date() == jour_courant else "--:--"
-                })
-                jour_courant += timedelta(days=1)
-
-    # Supprimer les jours sans besoins réels (au cas où)
-    # Remove days without actual requirements (just in case)
-    requirements_par_jour = {
-        jour: besoins for jour, besoins in requirements_par_jour.items()
-        if besoins["test_drivers"] > 0 or besoins["locomotives"] > 0
-    }
+    arrivees = pd.to_datetime([train.arrivee for train in testing]).values.astype("datetime64[m]")
+    departs = pd.to_datetime([train.depart for train in testing]).values.astype("datetime64[m]")
+    premiers_jours = arrivees.astype("datetime64[D]")
+    derniers_jours = departs.astype("datetime64[D]")
+    nb_jours = np.maximum((derniers_jours - premiers_jours).astype(np.int64) + 1, 1)
+
+    # Indice du train et rang du jour pour chaque ligne éclatée
+    # Train index and day rank for each exploded row
+    lignes = np.repeat(np.arange(len(testing)), nb_jours)
+    rangs = np.arange(nb_jours.sum()) - np.repeat(np.cumsum(nb_jours) - nb_jours, nb_jours)
+    jours = premiers_jours[lignes] + rangs
 
-    return requirements_par_jour
\ No newline at end of file
+    # Heures "HH:MM" lues dans une table indexée par la minute du jour (pas de strftime par ligne)
+    # "HH:MM" times read from a table indexed by minute of day (no per-row strftime)
+    debuts = HEURES_MINUTES[(arrivees - premiers_jours).astype(np.int64)][lignes]
+    fins = HEURES_MINUTES[(departs - derniers_jours).astype(np.int64)][lignes]
+    df = pd.DataFrame({
+        "Date": jours,
+        "Depot": np.array([train.depot for train in testing], dtype=object)[lignes],
+        "Train": np.array([train.nom for train in testing], dtype=object)[lignes],
+        "Début": np.where(jours == premiers_jours[lignes], debuts, "--:--"),
+        "Fin": np.where(jours == derniers_jours[lignes], fins, "--:--"),
+    })
+    trains_par_jour = df.groupby("Date")["Train"].transform("size")
+    for ressource, quantite in BESOINS_TESTING.items():
+        df[ressource] = trains_par_jour * quantite
+    return df.sort_values("Date", kind="stable").reset_index(drop=True)[colonnes]
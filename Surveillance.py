@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Surveillance.py
+===============
+
+FR: Surveillance d'un dossier de dépôt : les fichiers d'horaires nouveaux ou complétés sont ingérés au fil de l'eau.
+EN: Drop-directory watcher: new or extended timetable files are ingested incrementally.
+FR: Un thread scrute le dossier, ne lit que les octets ajoutés à un CSV depuis le dernier passage (seek au
+    décalage + somme de contrôle de blocs témoins de taille fixe) et dépose les lots normalisés dans une file.
+    La simulation n'est pas partagée avec le thread : la file est vidée dans le fil principal (à chaque rerun),
+    et le lot est placé par Simulation.fusionner_trains (import idempotent).
+EN: A thread polls the directory, reads only the bytes appended to a CSV since the last pass (seek to the
+    offset + checksum of fixed-size sample blocks) and puts the normalised batches in a queue.
+    The simulation is not shared with the thread: the queue is drained on the main thread (on every rerun),
+    and the batch is placed by Simulation.fusionner_trains (idempotent import).
+
+Auteur : andre
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from hashlib import blake2b
+import pandas as pd
+from Importation import lire_fichier_import, normaliser_import, creer_trains, est_excel
+
+EXTENSIONS = (".csv", ".xlsx", ".xls")
+DELAI_STABILITE = 60  # FR: Secondes sans écriture avant de lire une dernière ligne incomplète / EN: Seconds without writes before reading an incomplete last line
+TAILLE_TEMOIN = 4096  # FR: Octets du témoin (début et fin de la partie lue) / EN: Sample bytes (start and end of the read part)
+
+
+class SurveillanceDossier:
+    """
+    FR: Scrute un dossier et prépare des lots de trains à partir des fichiers nouveaux ou modifiés.
+    EN: Poll a directory and prepare train batches from new or changed files.
+
+    Attributs / Attributes :
+        dossier (str) : FR: Dossier surveillé. / EN: Watched directory.
+        intervalle (float) : FR: Secondes entre deux passages. / EN: Seconds between two passes.
+        etats (dict) : FR: Nom du fichier -> taille, date, décalage lu, lignes lues, témoin, en-tête. / EN: File name -> size, date, read offset, lines read, sample, header.
+        file (queue.Queue) : FR: Lots prêts à placer. / EN: Batches ready to be placed.
+        erreurs (deque) : FR: Dernières erreurs de lecture (fichier, message). / EN: Last read errors (file, message).
+    """
+
+    def __init__(self, dossier, depots_connus, intervalle=5.0, depot_defaut="Glostrup"):
+        self.dossier = dossier
+        self.depots_connus = list(depots_connus)
+        self.depot_defaut = depot_defaut
+        self.intervalle = intervalle
+        self.etats = {}
+        self.file = queue.Queue()
+        self.erreurs = deque(maxlen=20)
+        self._arret = threading.Event()
+        self._thread = None
+
+    # --- Thread ---
+    def demarrer(self):
+        """
+        FR: Lance le thread de surveillance (sans effet s'il tourne déjà).
+        EN: Start the watcher thread (no effect if already running).
+        """
+        if self.actif:
+            return
+        self._arret.clear()
+        self._thread = threading.Thread(target=self._boucle, name=f"surveillance:{self.dossier}", daemon=True)
+        self._thread.start()
+
+    def arreter(self):
+        """
+        FR: Arrête le thread ; les lots déjà en file restent disponibles.
+        EN: Stop the thread; batches already queued stay available.
+        """
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.intervalle + 1)
+        self._thread = None
+
+    @property
+    def actif(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _boucle(self):
+        while True:
+            self.scruter()
+            if self._arret.wait(self.intervalle):
+                return
+
+    # --- Lecture incrémentale / Incremental read ---
+    @staticmethod
+    def _temoin(f, fin):
+        """
+        FR: Somme de contrôle du premier et du dernier bloc (TAILLE_TEMOIN octets) de la partie déjà lue :
+            détecte un fichier réécrit en ne lisant que ces deux blocs.
+        EN: Checksum of the first and last block (TAILLE_TEMOIN bytes) of the already-read part:
+            detects a rewritten file by reading only those two blocks.
+        """
+        f.seek(0)
+        tete = f.read(min(TAILLE_TEMOIN, fin))
+        f.seek(max(0, fin - TAILLE_TEMOIN))
+        return blake2b(tete + f.read(fin - max(0, fin - TAILLE_TEMOIN)), digest_size=16).digest()
+
+    def scruter(self):
+        """
+        FR: Un passage sur le dossier : met en file un lot par fichier ayant de nouvelles lignes.
+        EN: One pass over the directory: queue one batch per file with new rows.
+
+        Returns:
+            int: FR: Nombre de lots mis en file. / EN: Number of batches queued.
+        """
+        try:
+            entrees = [e for e in os.scandir(self.dossier)
+                       if e.is_file() and e.name.lower().endswith(EXTENSIONS) and not e.name.startswith((".", "~$"))]
+        except OSError as e:
+            self.erreurs.append((self.dossier, str(e)))
+            return 0
+        lots = 0
+        for entree in sorted(entrees, key=lambda e: e.name):
+            try:
+                infos = entree.stat()
+            except OSError as e:
+                self.erreurs.append((entree.name, str(e)))
+                continue
+            etat = self.etats.get(entree.name)
+            if etat is not None and (etat["taille"], etat["date"]) == (infos.st_size, infos.st_mtime_ns):
+                continue
+            try:
+                lot = self._lire_fichier(entree.path, entree.name, etat, infos)
+            except (OSError, ValueError) as e:
+                # FR: Échec mémorisé pour cette taille et cette date : nouvel essai (et nouveau message)
+                #     seulement quand le fichier change ; le décalage déjà lu est conservé.
+                # EN: Failure recorded against this size and date: retried (and reported again)
+                #     only when the file changes; the offset already read is kept.
+                self.erreurs.append((entree.name, str(e)))
+                if etat is None:
+                    etat = {"decalage": 0, "lignes": 0, "temoin": None, "entete": b""}
+                self.etats[entree.name] = dict(etat, taille=infos.st_size, date=infos.st_mtime_ns)
+                continue
+            if lot is not None:
+                self.file.put(lot)
+                lots += 1
+        return lots
+
+    def _lire_fichier(self, chemin, nom, etat, infos):
+        debut = time.perf_counter()
+        with open(chemin, "rb") as f:
+            if est_excel(nom):
+                # FR: Pas de décalage dans un classeur : relu entièrement s'il a changé / EN: No offset in a workbook: fully re-read if changed
+                contenu = f.read()
+                temoin = blake2b(contenu, digest_size=16).digest()
+                nouveau = {"taille": infos.st_size, "date": infos.st_mtime_ns, "decalage": len(contenu), "lignes": 0,
+                           "temoin": temoin, "entete": b""}
+                if etat is not None and etat["temoin"] == temoin:
+                    self.etats[nom] = nouveau
+                    return None
+                a_lire, decalage_lignes = contenu, 0
+            else:
+                # FR: Suite d'un fichier déjà lu : seek au décalage, seule la fin ajoutée est lue
+                # EN: Continuation of an already-read file: seek to the offset, only the appended tail is read
+                suite = (etat is not None and etat["entete"] and 0 < etat["decalage"] <= infos.st_size
+                         and self._temoin(f, etat["decalage"]) == etat["temoin"])
+                depart = etat["decalage"] if suite else 0
+                f.seek(depart)
+                contenu = f.read()
+                # FR: Seules les lignes complètes sont consommées ; une dernière ligne sans fin de ligne l'est
+                #     quand le fichier n'a plus bougé depuis DELAI_STABILITE.
+                # EN: Only complete lines are consumed; a last line without a line ending is
+                #     once the file has not changed for DELAI_STABILITE.
+                fin = contenu.rfind(b"\n") + 1
+                if fin < len(contenu) and time.time() - infos.st_mtime > DELAI_STABILITE:
+                    fin = len(contenu)
+                if suite:
+                    entete = etat["entete"]
+                    a_lire, decalage_lignes = entete + contenu[:fin], etat["lignes"] - 1
+                    lignes = etat["lignes"] + contenu.count(b"\n", 0, fin)
+                else:
+                    entete = contenu[:contenu.find(b"\n") + 1]
+                    a_lire, decalage_lignes, lignes = contenu[:fin], 0, contenu.count(b"\n", 0, fin)
+                # FR: Taille lue (et non totale) : une ligne incomplète fait relire la fin au passage suivant
+                # EN: Read size (not total): an incomplete line makes the next pass read the tail again
+                nouveau = {"taille": depart + fin, "date": infos.st_mtime_ns, "decalage": depart + fin, "lignes": lignes,
+                           "temoin": self._temoin(f, depart + fin), "entete": entete}
+                if fin == 0:
+                    self.etats[nom] = nouveau
+                    return None
+
+        trains, erreurs = normaliser_import(lire_fichier_import(a_lire, nom, cache=False), self.depots_connus, self.depot_defaut)
+        erreurs["Ligne"] += decalage_lignes
+        self.etats[nom] = nouveau
+        return {"Fichier": nom, "trains": trains, "erreurs": erreurs.assign(Fichier=nom)[["Fichier", "Ligne", "Erreur"]],
+                "Secondes": round(time.perf_counter() - debut, 3)}
+
+    # --- Fil principal / Main thread ---
+    def vider(self, simulation):
+        """
+        FR: Vide la file et place tous les lots en une fois dans la simulation (à appeler dans le fil principal).
+        EN: Drain the queue and place every batch at once into the simulation (to call on the main thread).
+
+        Returns:
+            tuple: FR: (lots vidés, résumé de fusionner_trains ou None, lignes écartées [Fichier, Ligne, Erreur]).
+                   EN: (drained batches, fusionner_trains summary or None, dropped rows [Fichier, Ligne, Erreur]).
+        """
+        lots = []
+        while True:
+            try:
+                lots.append(self.file.get_nowait())
+            except queue.Empty:
+                break
+        erreurs = pd.concat([lot["erreurs"] for lot in lots] or [pd.DataFrame(columns=["Fichier", "Ligne", "Erreur"])],
+                            ignore_index=True)
+        trains = [lot["trains"] for lot in lots if not lot["trains"].empty]
+        if not trains:
+            return lots, None, erreurs
+        premier_id = max((train.id for train in simulation.trains), default=-1) + 1
+        return lots, simulation.fusionner_trains(creer_trains(pd.concat(trains, ignore_index=True), premier_id)), erreurs
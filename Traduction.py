@@ -142,6 +142,7 @@ def get_translation(lang):
         "import_file": {"fr": "Importer un fichier CSV ou Excel","en": "Import a CSV or Excel file","da": "Importer en CSV- eller Excel-fil"},
         "add_imported_trains": {"fr": "Ajouter ces trains à la simulation","en": "Add these trains to the simulation","da": "Tilføj disse tog til simuleringen"},
         "import_success": {"fr": "Import terminé.","en": "Import finished.","da": "Import færdig."},
+        "import_summary": {"fr": "{ajoutes} trains ajoutés, {modifies} modifiés, {doublons} déjà présents.","en": "{ajoutes} trains added, {modifies} updated, {doublons} already present.","da": "{ajoutes} tog tilføjet, {modifies} opdateret, {doublons} allerede til stede."},
         "import_error_row": {"fr": "Erreur sur la ligne","en": "Error on row","da": "Fejl på række"},
         "import_example_title": {"fr": "Exemple de tableau à importer (Excel ou CSV)","en": "Example of table to import (Excel or CSV)","da": "Eksempel på tabel til import (Excel eller CSV)"},
         "import_example_help": {"fr": "Voici un exemple de tableau que vous pouvez importer. Les noms de colonnes doivent correspondre à ceux affichés.","en": "Here is an example of a table you can import. The column names must match those shown.","da": "Her er et eksempel på en tabel, du kan importere. Kolonnenavnene skal svare til dem, der vises."},
@@ -189,6 +190,45 @@ def get_translation(lang):
         "track_adding_coach" : {"fr": "Choisissez la voie sur laquelle ajouter le wagon.", "en": "Choose the track on which to add the coach.", "da": "Vælg det spor, hvor bilen skal tilføjes."},
         "wagon_type_to_add" : {"fr": "Type de wagon à ajouter (longueur 14m).", "en": "Type of coach to be added (length 14m).", "da": "Type vogn, der skal tilføjes (længde 14m)."},
         "track_choice_locomotive" : {"fr": "Choisissez la voie sur laquelle ajouter la locomotive.", "en": "Choose the track on which to add the locomotive.", "da": "Vælg det spor, hvor lokomotivet skal tilføjes."},
+        "occupancy_profile": {"fr": "Profil d'occupation", "en": "Occupancy profile", "da": "Belægningsprofil"},
+        "occupied_tracks": {"fr": "Voies occupées", "en": "Occupied tracks", "da": "Optagede spor"},
+        "peak_utilisation": {"fr": "Pic d'utilisation", "en": "Peak utilisation", "da": "Spidsbelastning"},
+        "saturated_hours": {"fr": "Heures saturées", "en": "Saturated hours", "da": "Mættede timer"},
+        "saturation_periods": {"fr": "Périodes de saturation", "en": "Saturation periods", "da": "Mætningsperioder"},
+        "window_start": {"fr": "Début de la fenêtre", "en": "Window start", "da": "Vinduets start"},
+        "window_end": {"fr": "Fin de la fenêtre", "en": "Window end", "da": "Vinduets slutning"},
+        "rate_period": {"fr": "Période", "en": "Period", "da": "Periode"},
+        "day": {"fr": "Jour", "en": "Day", "da": "Dag"},
+        "week": {"fr": "Semaine", "en": "Week", "da": "Uge"},
+        "shift": {"fr": "Poste (8 h)", "en": "Shift (8 h)", "da": "Vagt (8 t)"},
+        "waiting_distribution": {"fr": "Distribution des temps d'attente", "en": "Waiting time distribution", "da": "Fordeling af ventetider"},
+        "waiting_minutes": {"fr": "Attente (min)", "en": "Waiting (min)", "da": "Ventetid (min)"},
+        "all": {"fr": "Tous", "en": "All", "da": "Alle"},
+        "utilisation_heatmap": {"fr": "Carte de chaleur d'utilisation", "en": "Utilisation heatmap", "da": "Udnyttelsesvarmekort"},
+        "hour": {"fr": "Heure", "en": "Hour", "da": "Time"},
+        "peak_requirements": {"fr": "Besoin simultané maximal", "en": "Peak concurrent demand", "da": "Maksimalt samtidigt behov"},
+        "total": {"fr": "Total", "en": "Total", "da": "I alt"},
+        "roster": {"fr": "Roster conducteurs et locomotives", "en": "Driver and locomotive roster", "da": "Vagtplan for førere og lokomotiver"},
+        "turnaround_minutes": {"fr": "Battement minimal (min)", "en": "Minimum turnaround (min)", "da": "Minimum vendetid (min)"},
+        "loco_locality": {"fr": "Localité des locomotives", "en": "Locomotive locality", "da": "Lokomotivernes tilhørsforhold"},
+        "locality_None": {"fr": "Libre circulation", "en": "Free movement", "da": "Fri bevægelighed"},
+        "locality_stricte": {"fr": "Restent au dépôt", "en": "Stay at depot", "da": "Bliver på depotet"},
+        "locality_transfert": {"fr": "Transfert avec délai", "en": "Transfer with delay", "da": "Overførsel med forsinkelse"},
+        "transfer_minutes": {"fr": "Durée de transfert (min)", "en": "Transfer time (min)", "da": "Overførselstid (min)"},
+        "fleet_size": {"fr": "Taille de flotte", "en": "Fleet size", "da": "Flådestørrelse"},
+        "resource_pools": {"fr": "Ressources des dépôts", "en": "Depot resources", "da": "Depotressourcer"},
+        "resource_pools_tooltip": {"fr": "Nombre de conducteurs de test et de locomotives disponibles par dépôt (0 = illimité). Un train Testing n'est placé que si une voie et ses ressources sont libres.", "en": "Test drivers and locomotives available per depot (0 = unlimited). A Testing train is only placed when both a track and its resources are free.", "da": "Testførere og lokomotiver til rådighed pr. depot (0 = ubegrænset). Et Testing-tog placeres kun, når både et spor og dets ressourcer er ledige."},
+        "resource_wait": {"fr": "Attente due aux ressources", "en": "Wait due to resources", "da": "Ventetid pga. ressourcer"},
+        "pdf_engine": {"fr": "Moteur PDF", "en": "PDF engine", "da": "PDF-motor"},
+        "pdf_engine_vectoriel": {"fr": "Vectoriel (rapide)", "en": "Vector (fast)", "da": "Vektor (hurtig)"},
+        "pdf_engine_image": {"fr": "Images Plotly (Kaleido)", "en": "Plotly images (Kaleido)", "da": "Plotly-billeder (Kaleido)"},
+        "watch_folder": {"fr": "Dossier surveillé", "en": "Watched folder", "da": "Overvåget mappe"},
+        "watch_folder_path": {"fr": "Chemin du dossier", "en": "Folder path", "da": "Mappesti"},
+        "watch_folder_tooltip": {"fr": "Les fichiers CSV/Excel déposés dans ce dossier sont importés automatiquement ; seules les nouvelles lignes sont lues.", "en": "CSV/Excel files dropped in this folder are imported automatically; only new rows are read.", "da": "CSV/Excel-filer, der lægges i denne mappe, importeres automatisk; kun nye rækker læses."},
+        "watch_folder_active": {"fr": "Surveiller", "en": "Watch", "da": "Overvåg"},
+        "map_animation": {"fr": "Animation dans le navigateur", "en": "Animate in the browser", "da": "Animation i browseren"},
+        "map_animation_tooltip": {"fr": "Les présences sont calculées une fois ; le curseur de temps et la lecture tournent dans le navigateur, sans recharger la page.", "en": "Presences are computed once; the time slider and playback run in the browser, without reloading the page.", "da": "Tilstedeværelser beregnes én gang; tidsskyderen og afspilningen kører i browseren uden at genindlæse siden."},
+        "pdf_days_per_page": {"fr": "Jours par page", "en": "Days per page", "da": "Dage pr. side"},
 }
 def t(key, lang, **kwargs):
     translations = get_translation(lang)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+test_esquisse.py
+================
+
+FR: Esquisse KLL comparée aux quantiles exacts (tri complet).
+EN: KLL sketch checked against exact quantiles (full sort).
+"""
+
+import random
+from bisect import bisect_left, bisect_right
+
+from Esquisse import EsquisseKLL
+
+QS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+ERREUR_RANG = 0.02  # FR: Tolérance de rang pour k=200 (~1.7/k en théorie) / EN: Rank tolerance for k=200 (~1.7/k in theory)
+
+
+def _erreur_rang(triees, valeur, q):
+    """
+    FR: Écart entre q et le rang normalisé de la valeur (0 si q tombe dans la plage de rangs de la valeur).
+    EN: Gap between q and the normalised rank of the value (0 if q falls inside the value's rank range).
+    """
+    n = len(triees)
+    bas, haut = bisect_left(triees, valeur) / n, bisect_right(triees, valeur) / n
+    return max(0.0, bas - q, q - haut)
+
+
+def test_quantiles_dans_la_tolerance():
+    rng = random.Random(29)
+    valeurs = [rng.expovariate(1 / 30) for _ in range(20000)]
+    esquisse = EsquisseKLL()
+    for valeur in valeurs:
+        esquisse.ajouter(valeur)
+    triees = sorted(valeurs)
+
+    assert len(esquisse) == len(valeurs)
+    assert esquisse.quantiles([0, 1]) == [triees[0], triees[-1]]
+    for q, estimation in zip(QS, esquisse.quantiles(QS)):
+        assert _erreur_rang(triees, estimation, q) <= ERREUR_RANG
+    # FR: Le poids total est conservé par les compactages / EN: Total weight is preserved by compactions
+    assert sum(esquisse.histogramme([triees[0], triees[-1]])) == len(valeurs)
+
+
+def test_fusion_equivaut_a_une_seule_esquisse():
+    rng = random.Random(30)
+    lots = [[rng.gauss(100, 25) for _ in range(rng.randint(1000, 6000))] for _ in range(5)]
+    esquisse = EsquisseKLL()
+    for lot in lots:
+        partielle = EsquisseKLL()
+        for valeur in lot:
+            partielle.ajouter(valeur)
+        esquisse.fusionner(partielle)
+    triees = sorted(v for lot in lots for v in lot)
+
+    assert len(esquisse) == len(triees)
+    assert (esquisse.minimum, esquisse.maximum) == (triees[0], triees[-1])
+    for q, estimation in zip(QS, esquisse.quantiles(QS)):
+        assert _erreur_rang(triees, estimation, q) <= ERREUR_RANG
+
+
+def test_esquisse_vide():
+    assert EsquisseKLL().quantiles([0.5]) == [None]
+    assert EsquisseKLL().histogramme([0, 1, 2]) == [0, 0]
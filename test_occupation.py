@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+test_occupation.py
+==================
+
+FR: Index d'occupation (IndexVoie, IndexRessource, IndexIntervalles) comparés à un parcours linéaire.
+EN: Occupation indexes (IndexVoie, IndexRessource, IndexIntervalles) checked against a linear scan.
+"""
+
+import contextlib
+import io
+import random
+from datetime import datetime, timedelta
+
+from Occupation import IndexIntervalles, IndexRessource, IndexVoie
+from Simulation import Simulation, Train
+
+ORIGINE = datetime(2025, 6, 1)
+
+
+def _instant(minutes):
+    return ORIGINE + timedelta(minutes=minutes)
+
+
+def _temps_occupe_lineaire(intervalles, debut, fin):
+    return sum(max(0.0, (min(f, fin) - max(d, debut)).total_seconds()) for d, f in intervalles)
+
+
+def test_index_voie_temps_occupe():
+    """
+    FR: Insertions dans le désordre puis suppressions : temps occupé égal au parcours linéaire.
+    EN: Out-of-order inserts then removals: busy time equal to the linear scan.
+    """
+    rng = random.Random(26)
+    bornes = sorted(rng.sample(range(0, 20000), 400))
+    intervalles = [(_instant(bornes[i]), _instant(bornes[i + 1])) for i in range(0, len(bornes), 2)]
+    index = IndexVoie()
+    for debut, fin in rng.sample(intervalles, len(intervalles)):
+        index.inserer(debut, fin)
+    for debut, fin in rng.sample(intervalles, 60):
+        assert index.retirer(debut, fin)
+        intervalles.remove((debut, fin))
+    assert not index.retirer(_instant(-10), _instant(-5))
+
+    for _ in range(300):
+        a, b = sorted(rng.sample(range(-500, 20500), 2))
+        assert index.temps_occupe(_instant(a), _instant(b)) == _temps_occupe_lineaire(intervalles, _instant(a), _instant(b))
+
+
+def test_taux_occupation_apres_ajout_et_suppression():
+    """
+    FR: taux_occupation (sommes préfixes) suit les ajouts et suppressions de trains.
+    EN: taux_occupation (prefix sums) follows train additions and removals.
+    """
+    rng = random.Random(27)
+    simulation = Simulation()
+    with contextlib.redirect_stdout(io.StringIO()):
+        trains = []
+        for i in range(60):
+            arrivee = _instant(rng.randint(0, 3 * 24 * 60))
+            trains.append(Train(i, f"T{i}", rng.randint(1, 8), 1, arrivee, arrivee + timedelta(minutes=rng.randint(60, 900)), "Glostrup"))
+        simulation.ajouter_trains(trains)
+        for train in rng.sample(trains, 15):
+            simulation.supprimer_train(train.id)
+
+    depot = simulation.depots["Glostrup"]
+    nb_voies = len(depot["numeros_voies"])
+    for _ in range(50):
+        a, b = sorted(rng.sample(range(-600, 4 * 24 * 60), 2))
+        debut, fin = _instant(a), _instant(b)
+        voie = rng.randrange(nb_voies)
+        sur_voie = [(d, f) for v, d, f, _ in depot["occupation"] if v == voie]
+        tous = [(d, f) for _, d, f, _ in depot["occupation"]]
+        duree = (fin - debut).total_seconds()
+        assert simulation.taux_occupation("Glostrup", debut, fin, voie) == round(_temps_occupe_lineaire(sur_voie, debut, fin) / duree * 100, 2)
+        assert simulation.taux_occupation("Glostrup", debut, fin) == round(_temps_occupe_lineaire(tous, debut, fin) / (duree * nb_voies) * 100, 2)
+
+
+def _niveau(utilisations, instant):
+    return sum(q for d, f, q in utilisations if d <= instant < f)
+
+
+def test_index_ressource_pic_et_premier_debut():
+    """
+    FR: pic et premier_debut_possible comparés au niveau calculé instant par instant.
+    EN: pic and premier_debut_possible checked against the level computed instant by instant.
+    """
+    rng = random.Random(33)
+    index = IndexRessource(capacite=4)
+    utilisations = []
+    for _ in range(150):
+        a = rng.randrange(0, 3000, 10)
+        utilisations.append((_instant(a), _instant(a + rng.randrange(10, 300, 10)), rng.randint(1, 2)))
+        index.inserer(*utilisations[-1])
+    for utilisation in rng.sample(utilisations, 40):
+        index.retirer(*utilisation)
+        utilisations.remove(utilisation)
+    evenements = sorted({d for d, _, _ in utilisations} | {f for _, f, _ in utilisations})
+
+    for _ in range(300):
+        a, b = sorted(rng.sample(range(-100, 3400, 10), 2))
+        debut, fin, quantite = _instant(a), _instant(b), rng.randint(1, 3)
+        candidats = [debut] + [e for e in evenements if debut < e < fin]
+        assert index.pic(debut, fin) == max(_niveau(utilisations, t) for t in candidats)
+
+        attendu = None
+        for s in candidats:
+            if all(_niveau(utilisations, t) + quantite <= index.capacite for t in [s] + [e for e in evenements if s < e < fin]):
+                attendu = s
+                break
+        assert index.premier_debut_possible(debut, fin, quantite) == attendu
+
+
+def test_index_intervalles_chevauchant_et_presents():
+    """
+    FR: chevauchant et presents égaux au filtre linéaire (bornes incluses, ordre d'origine, intervalles inversés ignorés).
+    EN: chevauchant and presents equal to the linear filter (bounds included, original order, inverted intervals skipped).
+    """
+    rng = random.Random(49)
+    intervalles = []
+    for i in range(500):
+        a = rng.randint(0, 1000)
+        intervalles.append((a, a + rng.randint(-20, 80), i))
+    index = IndexIntervalles(intervalles)
+    assert index.instants == sorted({d for d, f, _ in intervalles if f >= d} | {f for d, f, _ in intervalles if f >= d})
+
+    for _ in range(500):
+        a, b = sorted((rng.randint(-50, 1100), rng.randint(-50, 1100)))
+        assert index.chevauchant(a, b) == [e for d, f, e in intervalles if d <= f and d <= b and f >= a]
+        assert index.presents(a) == [e for d, f, e in intervalles if d <= a <= f]
+    assert IndexIntervalles([]).presents(0) == []
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+test_simulation.py
+==================
+
+FR: Tests de non-régression de la simulation.
+EN: Simulation regression tests.
+"""
+
+import contextlib
+import io
+import pickle
+from datetime import datetime, timedelta
+
+from Simulation import MODULE_EMPREINTE, Simulation, Train
+
+
+def test_reset_vide_index_presence():
+    """
+    FR: Après un reset, l'index de présence ne doit plus renvoyer les trains supprimés.
+    EN: After a reset, the presence index must no longer return the deleted trains.
+    """
+    simulation = Simulation()
+    arrivee = datetime(2025, 6, 1, 8)
+    instant = arrivee + timedelta(hours=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulation.ajouter_train(Train(0, "T0", 4, 1, arrivee, arrivee + timedelta(hours=3), "Glostrup"), "Glostrup")
+    assert simulation.index_presence().presents(instant)
+
+    simulation.reset()
+
+    assert simulation.index_presence().presents(instant) == []
+    assert simulation.index_presence().instants == []
+
+
+def _empreintes_recalculees(simulation, depot):
+    """
+    FR: Empreintes de voie recalculées depuis les occupations (contrat « contenu seulement »).
+    EN: Track fingerprints recomputed from the occupations ("content only" contract).
+    """
+    empreintes = [0] * len(simulation.depots[depot]["numeros_voies"])
+    for voie, debut, fin, train in simulation.depots[depot]["occupation"]:
+        h = simulation._hacher((voie, debut, fin, simulation._contenu_train(train)))
+        empreintes[voie] = (empreintes[voie] + h) % MODULE_EMPREINTE
+    return empreintes
+
+
+def test_debordement_garde_empreintes_coherentes():
+    """
+    FR: Un train trop long pour son dépôt part vers le plus proche, arrive après le transfert,
+        et les empreintes de voie restent égales à celles recalculées depuis le contenu.
+    EN: A train too long for its depot goes to the nearest one, arrives after the transfer,
+        and track fingerprints stay equal to the ones recomputed from the content.
+    """
+    simulation = Simulation()
+    simulation.ajouter_depot("Mini", [1], [50], lat=55.2, lon=12.0)
+    arrivee = datetime(2025, 6, 1, 8)
+    train = Train(0, "T0", 8, 1, arrivee, arrivee + timedelta(hours=5), "Mini")
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert simulation.ajouter_train_multi_depot(train) is None
+
+    depot, _, transfert = simulation.depots_proches("Mini", 1)[0]
+    assert (train.depot, train.depot_origine) == (depot, "Mini")
+    assert train.arrivee == arrivee + transfert
+    for nom in simulation.depots:
+        assert simulation.empreintes[nom] == _empreintes_recalculees(simulation, nom)
+
+
+def test_modification_apres_debordement_suit_nouvelle_arrivee():
+    """
+    FR: Après modification d'un train débordé, la ligne modifiée réimportée est reconnue comme doublon.
+    EN: After editing an overflowed train, re-importing the edited row is recognised as a duplicate.
+    """
+    simulation = Simulation()
+    simulation.ajouter_depot("Mini", [1], [50], lat=55.2, lon=12.0)
+    arrivee = datetime(2025, 6, 1, 8)
+    depart = arrivee + timedelta(hours=5)
+    train = Train(0, "T0", 8, 1, arrivee, depart, "Mini")
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulation.ajouter_train_multi_depot(train)
+        assert simulation.modifier_train(0, arrivee + timedelta(hours=1), depart) is None
+        resume = simulation.fusionner_trains([Train(1, "T0", 8, 1, arrivee + timedelta(hours=1), depart, "Mini")])
+
+    assert not hasattr(train, "arrivee_origine")
+    assert (resume["ajoutes"], resume["modifies"], resume["doublons"]) == (0, 0, 1)
+
+
+def test_sauvegarde_sans_cache():
+    """
+    FR: Le cache (index de présence, couches de carte...) n'est pas sauvegardé et se reconstruit au chargement.
+    EN: The cache (presence indexes, map layers...) is not saved and is rebuilt after loading.
+    """
+    simulation = Simulation()
+    arrivee = datetime(2025, 6, 1, 8)
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulation.ajouter_train(Train(0, "T0", 4, 1, arrivee, arrivee + timedelta(hours=3), "Glostrup"), "Glostrup")
+    simulation.index_presence()
+    assert simulation.cache
+
+    chargee = pickle.loads(pickle.dumps(simulation))
+
+    assert chargee.cache == {}
+    assert [train.nom for train in chargee.index_presence().presents(arrivee + timedelta(hours=1))] == ["T0"]
+
+
+def test_fusion_annule_modification_impossible():
+    """
+    FR: Une ligne qui rend le train trop long pour toutes les voies est refusée et le train garde son état ;
+        une modification seule (sans ajout) est bien replacée.
+    EN: A row that makes the train too long for every track is rejected and the train keeps its state;
+        a change alone (no addition) is re-placed.
+    """
+    simulation = Simulation()
+    arrivee = datetime(2025, 6, 1, 8)
+    depart = arrivee + timedelta(hours=3)
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulation.fusionner_trains([Train(0, "T0", 4, 1, arrivee, depart, "Glostrup")])
+        train = simulation.trains[0]
+        resume = simulation.fusionner_trains([Train(1, "T0", 60, 1, arrivee, depart, "Glostrup")])
+        assert resume["modifies"] == 0 and 1 in resume["refuses"]
+        assert (train.wagons, train.voie is not None) == (4, True)
+
+        resume = simulation.fusionner_trains([Train(2, "T0", 4, 1, arrivee, depart + timedelta(hours=1), "Glostrup")])
+    assert resume["modifies"] == 1 and not resume["refuses"]
+    assert [occ[2] for occ in simulation.depots["Glostrup"]["occupation"]] == [depart + timedelta(hours=1)]
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+test_stats.py
+=============
+
+FR: Profil d'occupation (balayage) et roster (tas) comparés à un calcul exhaustif.
+EN: Occupation profile (sweep line) and roster (heap) checked against an exhaustive computation.
+"""
+
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from Affectation import affecter_ressource, calculer_roster
+from Simulation import Train
+from Stats import BESOINS_TESTING, calculer_profil_occupation
+
+ORIGINE = datetime(2025, 6, 1)
+
+
+def _occupations(rng, n):
+    occupations = []
+    for _ in range(n):
+        debut = ORIGINE + timedelta(minutes=rng.randrange(0, 5000, 15))
+        fin = debut + timedelta(minutes=rng.randrange(-60, 600, 15))
+        occupations.append((rng.randrange(4), debut, fin, SimpleNamespace(longueur=rng.randint(50, 400))))
+    return occupations
+
+
+def test_profil_occupation_egal_au_comptage():
+    """
+    FR: Chaque marche du profil vaut le nombre (et la longueur) d'occupations actives sur [debut, fin).
+    EN: Each profile step equals the number (and length) of occupations active over [debut, fin).
+    """
+    rng = random.Random(26)
+    occupations = _occupations(rng, 300)
+    for voie in (None, 2):
+        profil = calculer_profil_occupation(occupations, voie)
+        actives = [occ for occ in occupations if (voie is None or occ[0] == voie) and occ[2] > occ[1]]
+        instants = sorted({occ[1] for occ in actives} | {occ[2] for occ in actives})
+        assert list(profil["temps"]) == [np.datetime64(t, "s") for t in instants]
+        for t, voies, longueur in zip(instants, profil["voies_occupees"], profil["longueur_occupee"]):
+            presentes = [occ for occ in actives if occ[1] <= t < occ[2]]
+            assert (voies, longueur) == (len(presentes), sum(occ[3].longueur for occ in presentes))
+    assert len(calculer_profil_occupation([])["temps"]) == 0
+
+
+def _trains_testing(rng, n, depots=("Glostrup", "KAC")):
+    trains = []
+    for i in range(n):
+        arrivee = ORIGINE + timedelta(minutes=rng.randrange(0, 4000, 10))
+        depart = arrivee + timedelta(minutes=rng.randrange(30, 600, 10))
+        trains.append(Train(i, f"T{i}", 4, 1, arrivee, depart, rng.choice(depots), "testing"))
+    return trains
+
+
+def _pic_concurrent(trains, battement):
+    """
+    FR: Plus grand nombre de trains dont [arrivée, départ + battement) se chevauchent : flotte minimale.
+    EN: Largest number of trains whose [arrival, departure + turnaround) overlap: minimal fleet.
+    """
+    return max(sum(1 for u in trains if u.arrivee <= t.arrivee < u.depart + battement) for t in trains)
+
+
+def test_roster_flotte_minimale_sans_chevauchement():
+    """
+    FR: Sans localité, la flotte du tas égale le pic de concurrence, et aucune ressource n'a deux trains qui se chevauchent.
+    EN: Without locality, the heap fleet equals the concurrency peak, and no resource holds two overlapping trains.
+    """
+    rng = random.Random(32)
+    trains = _trains_testing(rng, 120)
+    battement = timedelta(minutes=20)
+    for quantite in (1, 2):
+        roster, flotte = affecter_ressource(trains, "locomotives", quantite, battement)
+        assert sum(flotte.values()) == quantite * _pic_concurrent(trains, battement)
+        assert len(roster) == quantite * len(trains)
+        par_ressource = {}
+        for ligne in roster:
+            par_ressource.setdefault(ligne["Ressource"], []).append((ligne["Début"], ligne["Fin"]))
+        for creneaux in par_ressource.values():
+            creneaux.sort()
+            assert all(fin + battement <= suivant for (_, fin), (suivant, _) in zip(creneaux, creneaux[1:]))
+
+
+def test_roster_localite_stricte_par_depot():
+    """
+    FR: En localité stricte, chaque dépôt a sa propre flotte minimale et une ressource ne change jamais de dépôt.
+    EN: With strict locality, each depot has its own minimal fleet and a resource never changes depot.
+    """
+    rng = random.Random(33)
+    trains = _trains_testing(rng, 100)
+    resultat = calculer_roster(trains, localite="stricte")
+    for depot in ("Glostrup", "KAC"):
+        du_depot = [train for train in trains if train.depot == depot]
+        attendu = BESOINS_TESTING["locomotives"] * _pic_concurrent(du_depot, timedelta(0))
+        assert resultat["par_depot"]["locomotives"][depot] == attendu
+    depots = {}
+    for ligne in resultat["roster"]:
+        if ligne["Type"] == "locomotives":
+            depots.setdefault(ligne["Ressource"], set()).add(ligne["Depot"])
+    assert all(len(d) == 1 for d in depots.values())
+    assert resultat["flotte"]["test_drivers"] == _pic_concurrent(trains, timedelta(0))